@@ -1,3 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MaxValueValidator
 from django.db import models
 from users.models import CustomUser
 
@@ -18,13 +21,50 @@ class Investor(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_verified = models.BooleanField(default=False)
+    # Денормализованные агрегаты отзывов и портфеля, поддерживаются сигналами (investors/signals.py)
+    rating = models.FloatField(default=0)
+    total_reviews = models.PositiveIntegerField(default=0)
+    total_investments = models.PositiveIntegerField(default=0)
+    total_amount_invested = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Просмотры профиля: инкременты копятся в буфере и сбрасываются пачкой (startup_platform/view_counters.py)
+    views_count = models.PositiveIntegerField(default=0)
+    # tsvector для полнотекстового поиска, обновляется сигналом (startup_platform/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Составные индексы (поле DESC, id DESC) для keyset-пагинации каталога — в направлении
+        # ORDER BY по умолчанию; восходящая сортировка читает их обратным сканом
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='investor_created_keyset_idx'),
+            models.Index(fields=['-rating', '-id'], name='investor_rating_keyset_idx'),
+            models.Index(fields=['-views_count', '-id'], name='investor_views_keyset_idx'),
+            GinIndex(fields=['search_vector'], name='investor_search_gin'),
+            models.Index(fields=['-total_investments', '-id'], name='investor_totals_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+
+class InvestorReview(models.Model):
+    investor = models.ForeignKey(Investor, on_delete=models.CASCADE, related_name='reviews')
+    startup = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='investor_reviews')
+    rating = models.PositiveSmallIntegerField(validators=[MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    # В rating/total_reviews инвестора учитываются только проверенные отзывы
+    is_verified = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('investor', 'startup')
+
+    def __str__(self):
+        return f"{self.startup} - {self.investor.name}: {self.rating}"
+
 class InvestorPortfolio(models.Model):
-    investor = models.ForeignKey(Investor, on_delete=models.CASCADE)
+    investor = models.ForeignKey(Investor, on_delete=models.CASCADE, related_name='portfolio_items')
     company_name = models.CharField(max_length=200)
     investment_amount = models.DecimalField(max_digits=12, decimal_places=2)
     investment_date = models.DateField()
@@ -1,6 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Investor, InvestmentPortfolio, InvestorReview
 from startups.serializers import IndustrySerializer
+from .services import write_portfolio
 
 class InvestmentPortfolioSerializer(serializers.ModelSerializer):
     industry_name = serializers.CharField(source='industry.name', read_only=True)
@@ -10,6 +12,10 @@ class InvestmentPortfolioSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('investor',)
 
+class NestedPortfolioItemSerializer(InvestmentPortfolioSerializer):
+    # id передается при обновлении профиля, чтобы изменить строку, а не пересоздать ее
+    id = serializers.IntegerField(required=False)
+
 class InvestorReviewSerializer(serializers.ModelSerializer):
     startup_name = serializers.CharField(source='startup.startup_profile.name', read_only=True)
     startup_avatar = serializers.ImageField(source='startup.avatar', read_only=True)
@@ -26,8 +32,10 @@ class InvestorReviewSerializer(serializers.ModelSerializer):
 
 class InvestorListSerializer(serializers.ModelSerializer):
     rating = serializers.FloatField(read_only=True)
-    reviews_count = serializers.IntegerField(source='reviews.count', read_only=True)
-    industries_list = serializers.SerializerMethodField()
+    reviews_count = serializers.IntegerField(source='total_reviews', read_only=True)
+    industries_list = serializers.SlugRelatedField(
+        source='industries', slug_field='name', many=True, read_only=True
+    )
     
     class Meta:
         model = Investor
@@ -36,9 +44,6 @@ class InvestorListSerializer(serializers.ModelSerializer):
             'check_size_max', 'location', 'rating', 'reviews_count', 'total_investments',
             'views_count', 'is_verified', 'created_at', 'industries_list'
         )
-    
-    def get_industries_list(self, obj):
-        return [industry.name for industry in obj.industries.all()]
 
 class InvestorDetailSerializer(serializers.ModelSerializer):
     industries = IndustrySerializer(many=True, read_only=True)
@@ -46,7 +51,7 @@ class InvestorDetailSerializer(serializers.ModelSerializer):
     reviews = InvestorReviewSerializer(many=True, read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     rating = serializers.FloatField(read_only=True)
-    reviews_count = serializers.IntegerField(source='reviews.count', read_only=True)
+    reviews_count = serializers.IntegerField(source='total_reviews', read_only=True)
     is_owner = serializers.SerializerMethodField()
     
     class Meta:
@@ -63,7 +68,7 @@ class InvestorDetailSerializer(serializers.ModelSerializer):
         return False
 
 class InvestorCreateSerializer(serializers.ModelSerializer):
-    portfolio_items = InvestmentPortfolioSerializer(many=True, required=False)
+    portfolio_items = NestedPortfolioItemSerializer(many=True, required=False)
     industries = serializers.ListField(child=serializers.IntegerField(), write_only=True)
     
     class Meta:
@@ -76,13 +81,13 @@ class InvestorCreateSerializer(serializers.ModelSerializer):
         portfolio_items_data = validated_data.pop('portfolio_items', [])
         industries_ids = validated_data.pop('industries', [])
         
-        investor = Investor.objects.create(**validated_data)
-        
-        # Add industries
-        investor.industries.set(industries_ids)
-        
-        for portfolio_data in portfolio_items_data:
-            InvestmentPortfolio.objects.create(investor=investor, **portfolio_data)
+        with transaction.atomic():
+            investor = Investor.objects.create(**validated_data)
+            
+            # Add industries
+            investor.industries.set(industries_ids)
+            
+            write_portfolio(investor, portfolio_items_data)
         
         return investor
     
@@ -90,19 +95,18 @@ class InvestorCreateSerializer(serializers.ModelSerializer):
         portfolio_items_data = validated_data.pop('portfolio_items', None)
         industries_ids = validated_data.pop('industries', None)
         
-        # Update investor fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update industries if provided
-        if industries_ids is not None:
-            instance.industries.set(industries_ids)
-        
-        # Update portfolio items if provided
-        if portfolio_items_data is not None:
-            instance.portfolio_items.all().delete()
-            for portfolio_data in portfolio_items_data:
-                InvestmentPortfolio.objects.create(investor=instance, **portfolio_data)
+        with transaction.atomic():
+            # Update investor fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            
+            # Update industries if provided
+            if industries_ids is not None:
+                instance.industries.set(industries_ids)
+            
+            # Портфель, если передан: изменения применяются пачками
+            if portfolio_items_data is not None:
+                write_portfolio(instance, portfolio_items_data)
         
         return instance
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Запись портфеля инвестора и пересчет денормализованных агрегатов: рейтинга
+по отзывам и итогов портфеля.
+
+Итоги (total_investments, total_amount_invested) пересчитываются по одному
+инвестору. Внутри deferred_portfolio_totals сигналы портфеля только копят
+id инвесторов, а пересчет выполняется один раз на выходе из блока.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Avg, Count, Sum
+
+from startup_platform import stats
+from startup_platform.nested_writes import write_children
+from startup_platform.response_cache import invalidate_tags
+
+from .models import Investor, InvestorPortfolio, InvestorReview
+
+
+def update_investor_rating(investor_id):
+    # Пересчитываем агрегаты только для затронутого инвестора (индекс по investor_id)
+    totals = InvestorReview.objects.filter(investor_id=investor_id, is_verified=True).aggregate(
+        rating=Avg('rating'),
+        total_reviews=Count('id')
+    )
+    Investor.objects.filter(id=investor_id).update(
+        rating=totals['rating'] or 0,
+        total_reviews=totals['total_reviews']
+    )
+
+
+def update_investor_portfolio_totals(investor_id):
+    totals = InvestorPortfolio.objects.filter(investor_id=investor_id).aggregate(
+        total_investments=Count('id'),
+        total_amount_invested=Sum('investment_amount')
+    )
+    Investor.objects.filter(id=investor_id).update(
+        total_investments=totals['total_investments'],
+        total_amount_invested=totals['total_amount_invested'] or 0
+    )
+
+
+_batch = threading.local()
+
+
+@contextmanager
+def deferred_portfolio_totals():
+    """Внутри блока сигналы портфеля копят id инвесторов, итоги считаются один раз на выходе."""
+    if getattr(_batch, 'investor_ids', None) is not None:
+        yield
+        return
+    _batch.investor_ids = set()
+    try:
+        yield
+        investor_ids = _batch.investor_ids
+    finally:
+        _batch.investor_ids = None
+    for investor_id in investor_ids:
+        update_investor_portfolio_totals(investor_id)
+        invalidate_tags('investors', f'investor:{investor_id}')
+    if investor_ids:
+        stats.invalidate(stats.INVESTOR_STATS_KEY)
+
+
+def defer_portfolio_totals(investor_id):
+    """Откладывает пересчет, если идет deferred_portfolio_totals; иначе возвращает False."""
+    investor_ids = getattr(_batch, 'investor_ids', None)
+    if investor_ids is None:
+        return False
+    investor_ids.add(investor_id)
+    return True
+
+
+def write_portfolio(investor, items):
+    # bulk_create/bulk_update сигналов не шлют, DELETE шлет по одному на строку —
+    # итоги пересчитываются один раз после записи
+    with deferred_portfolio_totals():
+        write_children(investor, 'portfolio_items', items)
+        defer_portfolio_totals(investor.pk)
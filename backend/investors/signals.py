@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from startup_platform import search, stats
+from startup_platform.response_cache import invalidate_tags
+
+from .models import Investor, InvestorPortfolio, InvestorReview
+from .services import defer_portfolio_totals, update_investor_portfolio_totals, update_investor_rating
+
+
+@receiver(post_save, sender=Investor)
+@receiver(post_delete, sender=Investor)
+def investor_changed(sender, instance, **kwargs):
+    stats.invalidate(stats.INVESTOR_STATS_KEY)
+    invalidate_tags('investors', f'investor:{instance.pk}')
+
+
+@receiver(post_save, sender=InvestorReview)
+@receiver(post_delete, sender=InvestorReview)
+def investor_review_changed(sender, instance, **kwargs):
+    update_investor_rating(instance.investor_id)
+    invalidate_tags('investors', f'investor:{instance.investor_id}')
+
+
+@receiver(post_save, sender=InvestorPortfolio)
+@receiver(post_delete, sender=InvestorPortfolio)
+def portfolio_item_changed(sender, instance, **kwargs):
+    if defer_portfolio_totals(instance.investor_id):
+        return
+    update_investor_portfolio_totals(instance.investor_id)
+    stats.invalidate(stats.INVESTOR_STATS_KEY)
+    invalidate_tags('investors', f'investor:{instance.investor_id}')
+
+
+search.register(Investor, {'name': 'A', 'preferred_industries': 'B'})
@@ -1,3 +1,77 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from users.models import CustomUser
+from .models import Investor, InvestorReview
+from .services import write_portfolio
+
+
+class PortfolioBulkWriteTests(TestCase):
+    """Запись портфеля профиля: число запросов не зависит от числа позиций."""
+
+    def make_investor(self, name):
+        user = CustomUser.objects.create_user(username=name, password='pass', user_type='investor')
+        return Investor.objects.create(created_by=user, name=name, investor_type='fund')
+
+    def items(self, count):
+        return [
+            {
+                'company_name': f'Company {index}',
+                'investment_amount': Decimal('1000.00'),
+                'investment_date': date(2023, 1, 1),
+                'investment_type': 'seed'
+            }
+            for index in range(count)
+        ]
+
+    def count_queries(self, investor, items):
+        with CaptureQueriesContext(connection) as context:
+            write_portfolio(investor, items)
+        return len(context.captured_queries)
+
+    def edited(self, investor):
+        # Половину позиций меняем, одну удаляем, две добавляем
+        rows = list(investor.portfolio_items.order_by('id').values(
+            'id', 'company_name', 'investment_amount', 'investment_date', 'investment_type'
+        ))
+        for row in rows[::2]:
+            row['investment_amount'] += 1
+        return rows[1:] + self.items(2)
+
+    def test_query_count_is_constant(self):
+        small, large = self.make_investor('small'), self.make_investor('large')
+
+        self.assertEqual(self.count_queries(small, self.items(3)), self.count_queries(large, self.items(30)))
+        self.assertEqual(
+            self.count_queries(small, self.edited(small)),
+            self.count_queries(large, self.edited(large))
+        )
+
+        large.refresh_from_db()
+        self.assertEqual(large.portfolio_items.count(), 31)
+        self.assertEqual(large.total_investments, 31)
+
+
+
+class RatingAggregateTests(TestCase):
+    """rating и total_reviews инвестора следуют за проверенными отзывами."""
+
+    def test_verified_reviews_update_rating(self):
+        owner = CustomUser.objects.create_user(username='fund', password='pass', user_type='investor')
+        investor = Investor.objects.create(created_by=owner, name='Fund', investor_type='fund')
+        authors = [
+            CustomUser.objects.create_user(username=f'startup{index}', password='pass', user_type='startup')
+            for index in range(2)
+        ]
+        first = InvestorReview.objects.create(investor=investor, startup=authors[0], rating=4, is_verified=True)
+        InvestorReview.objects.create(investor=investor, startup=authors[1], rating=1)
+        investor.refresh_from_db()
+        self.assertEqual((investor.rating, investor.total_reviews), (4, 1))
 
-# Create your tests here.
+        first.delete()
+        investor.refresh_from_db()
+        self.assertEqual((investor.rating, investor.total_reviews), (0, 0))
@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from matching.views import InvestorMatchesView
 
 urlpatterns = [
     path('', views.InvestorListView.as_view(), name='investor-list'),
@@ -8,6 +9,7 @@ urlpatterns = [
     path('<int:pk>/', views.InvestorDetailView.as_view(), name='investor-detail'),
     path('<int:pk>/update/', views.InvestorUpdateView.as_view(), name='investor-update'),
     path('<int:pk>/delete/', views.InvestorDeleteView.as_view(), name='investor-delete'),
+    path('<int:pk>/matches/', InvestorMatchesView.as_view(), name='investor-matches'),
     path('<int:investor_id>/reviews/', views.InvestorReviewCreateView.as_view(), name='investor-review-create'),
     path('portfolio/', views.PortfolioItemCreateView.as_view(), name='portfolio-create'),
     path('portfolio/<int:pk>/', views.PortfolioItemUpdateView.as_view(), name='portfolio-update'),
@@ -5,6 +5,12 @@ from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Avg, Sum
 from django.utils import timezone
+from startup_platform.pagination import CatalogPagination
+from startup_platform.query_planner import QueryPlannerMixin
+from startup_platform.response_cache import CachedResponseMixin
+from startup_platform import stats
+from startup_platform.search import FullTextSearchFilter
+from startup_platform.view_counters import get_view_counter
 from .models import Investor, InvestmentPortfolio, InvestorReview
 from .serializers import (
     InvestorListSerializer, InvestorDetailSerializer,
@@ -12,22 +18,22 @@ from .serializers import (
     InvestmentPortfolioSerializer
 )
 
-class InvestorListView(generics.ListAPIView):
+class InvestorListView(CachedResponseMixin, QueryPlannerMixin, generics.ListAPIView):
     serializer_class = InvestorListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['investor_type', 'location', 'is_verified']
-    search_fields = ['name', 'description', 'short_description']
+    search_fields = ['name', 'preferred_industries']
     ordering_fields = ['rating', 'created_at', 'total_investments', 'views_count']
     ordering = ['-created_at']
+    pagination_class = CatalogPagination
+    
+    def get_cache_tags(self):
+        return ['investors', 'industries']
     
     def get_queryset(self):
-        queryset = Investor.objects.filter(is_active=True).annotate(
-            rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews'),
-            total_investments=Count('portfolio_items'),
-            total_amount_invested=Sum('portfolio_items__investment_amount')
-        )
+        # Агрегаты отзывов и портфеля — денормализованные колонки, без JOIN
+        queryset = Investor.objects.filter(is_active=True)
         
         # Фильтрация по диапазону чеков
         min_check = self.request.query_params.get('min_check')
@@ -50,24 +56,26 @@ class InvestorListView(generics.ListAPIView):
         
         return queryset.distinct()
 
-class InvestorDetailView(generics.RetrieveAPIView):
+class InvestorDetailView(CachedResponseMixin, QueryPlannerMixin, generics.RetrieveAPIView):
     serializer_class = InvestorDetailSerializer
     permission_classes = [permissions.AllowAny]
     
+    def get_cache_tags(self):
+        return [f"investor:{self.kwargs['pk']}", 'industries']
+    
+    def on_cache_hit(self, request, *args, **kwargs):
+        # Ответ из кэша — просмотр все равно учитываем
+        get_view_counter(Investor).increment(kwargs['pk'])
+    
     def get_queryset(self):
-        return Investor.objects.filter(is_active=True).annotate(
-            rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews'),
-            total_investments=Count('portfolio_items'),
-            total_amount_invested=Sum('portfolio_items__investment_amount')
-        )
+        return Investor.objects.filter(is_active=True)
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        # Увеличиваем счетчик просмотров
-        instance.views_count += 1
-        instance.save()
+        # Увеличиваем счетчик просмотров: инкремент копится в буфере
+        # и сбрасывается в БД пачкой, строка профиля здесь не пишется
+        get_view_counter(Investor).increment(instance.pk)
         
         serializer = self.get_serializer(instance, context={'request': request})
         return Response(serializer.data)
@@ -108,29 +116,19 @@ class InvestorReviewCreateView(generics.CreateAPIView):
         if InvestorReview.objects.filter(investor=investor, startup=self.request.user).exists():
             raise serializers.ValidationError('Вы уже оставляли отзыв для этого инвестора')
         
+        # Рейтинг инвестора пересчитывают сигналы сохранения и удаления отзыва (investors/signals.py)
         serializer.save(startup=self.request.user, investor=investor)
-        
-        # Обновляем рейтинг инвестора
-        self.update_investor_rating(investor)
-    
-    def update_investor_rating(self, investor):
-        reviews = investor.reviews.filter(is_verified=True)
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-        investor.rating = avg_rating
-        investor.total_reviews = reviews.count()
-        investor.save()
 
-class UserInvestorsView(generics.ListAPIView):
+class UserInvestorsView(QueryPlannerMixin, generics.ListAPIView):
     serializer_class = InvestorListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['rating', 'created_at', 'total_investments', 'views_count']
+    ordering = ['-created_at']
+    pagination_class = CatalogPagination
     
     def get_queryset(self):
-        return Investor.objects.filter(user=self.request.user, is_active=True).annotate(
-            rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews'),
-            total_investments=Count('portfolio_items'),
-            total_amount_invested=Sum('portfolio_items__investment_amount')
-        )
+        return Investor.objects.filter(user=self.request.user, is_active=True)
 
 class PortfolioItemCreateView(generics.CreateAPIView):
     serializer_class = InvestmentPortfolioSerializer
@@ -158,20 +156,4 @@ class PortfolioItemDeleteView(generics.DestroyAPIView):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def investor_stats(request):
-    total_investors = Investor.objects.filter(is_active=True).count()
-    verified_investors = Investor.objects.filter(is_active=True, is_verified=True).count()
-    
-    by_type = Investor.objects.filter(is_active=True).values('investor_type').annotate(count=Count('id'))
-    
-    total_investments = InvestmentPortfolio.objects.count()
-    total_invested = InvestmentPortfolio.objects.aggregate(
-        total=Sum('investment_amount')
-    )['total'] or 0
-    
-    return Response({
-        'total_investors': total_investors,
-        'verified_investors': verified_investors,
-        'by_type': list(by_type),
-        'total_investments': total_investments,
-        'total_invested': float(total_invested)
-    })
\ No newline at end of file
+    return Response(stats.get_investor_stats())
\ No newline at end of file
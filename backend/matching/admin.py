@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Match
+
+
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    list_display = ['startup', 'investor', 'direction', 'score', 'computed_at']
+    list_filter = ['direction']
+    search_fields = ['startup__name', 'investor__name']
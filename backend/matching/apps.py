@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MatchingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'matching'
+    verbose_name = 'Подбор инвесторов'
+
+    def ready(self):
+        from . import signals
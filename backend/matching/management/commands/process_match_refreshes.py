@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from matching.services import BATCH_SIZE, process_refreshes
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает пары для профилей из очереди MatchRefresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=BATCH_SIZE,
+                            help='Сколько профилей пересчитать за один проход')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Опрашивать очередь каждые N секунд (0 — разобрать очередь и выйти)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                count = process_refreshes(options['limit'])
+                total += count
+                if count < options['limit']:
+                    break
+            if total:
+                self.stdout.write(f"Пересчитано профилей: {total}")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
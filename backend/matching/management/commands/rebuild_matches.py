@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from matching import services
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересобирает таблицу подобранных пар стартап–инвестор'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=services.TOP_N,
+                            help='Сколько пар хранить для каждого профиля')
+        parser.add_argument('--engine', choices=['numpy', 'python'], default='numpy',
+                            help='numpy — блочный векторизованный расчет, python — построчный')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Сколько стартапов оценивать за один блок (numpy)')
+
+    def handle(self, *args, **options):
+        if options['engine'] == 'numpy':
+            try:
+                from matching import vectorized
+            except ImportError:
+                raise CommandError('NumPy не установлен, используйте --engine python')
+            startups, investors = vectorized.rebuild_all(
+                top_n=options['top'], chunk_size=options['chunk_size']
+            )
+        else:
+            startups, investors = services.rebuild_all(top_n=options['top'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пары пересчитаны: {startups} стартапов × {investors} инвесторов'
+        ))
@@ -0,0 +1,48 @@
+from django.db import models
+from startups.models import Startup
+from investors.models import Investor
+
+
+class Match(models.Model):
+    """
+    Предвычисленная пара стартап–инвестор из топ-N одной из сторон.
+
+    direction='startup' — строка входит в топ инвесторов для стартапа,
+    direction='investor' — в топ стартапов для инвестора.
+    """
+    DIRECTIONS = [
+        ('startup', 'Investors for startup'),
+        ('investor', 'Startups for investor'),
+    ]
+    direction = models.CharField(max_length=10, choices=DIRECTIONS)
+    startup = models.ForeignKey(Startup, on_delete=models.CASCADE, related_name='matches')
+    investor = models.ForeignKey(Investor, on_delete=models.CASCADE, related_name='matches')
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['direction', 'startup', 'investor'], name='unique_match'),
+        ]
+        indexes = [
+            models.Index(fields=['direction', 'startup', '-score'], name='match_startup_top_idx'),
+            models.Index(fields=['direction', 'investor', '-score'], name='match_investor_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.startup_id} ↔ {self.investor_id}: {self.score}"
+
+
+class MatchRefresh(models.Model):
+    """Профиль, ожидающий пересчета своих пар (очередь воркера process_match_refreshes)."""
+    side = models.CharField(max_length=10, choices=Match.DIRECTIONS)
+    profile_id = models.BigIntegerField()
+    requested_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['side', 'profile_id'], name='unique_match_refresh'),
+        ]
+
+    def __str__(self):
+        return f"{self.side} {self.profile_id}"
@@ -0,0 +1,64 @@
+"""
+Оценка совместимости стартапа и инвестора (0–100).
+
+Учитываются отрасль, стадия, попадание запрашиваемой суммы в диапазон
+чека инвестора и география. Если у одной из сторон критерий не заполнен,
+он дает нейтральные NEUTRAL баллов, а не ноль.
+"""
+
+from collections import namedtuple
+
+
+WEIGHTS = {
+    'industry': 0.4,
+    'stage': 0.25,
+    'check_size': 0.25,
+    'location': 0.1,
+}
+NEUTRAL = 0.5
+
+StartupProfile = namedtuple('StartupProfile', 'id industry stage funding_amount location')
+InvestorProfile = namedtuple(
+    'InvestorProfile', 'id industries stages check_size_min check_size_max location'
+)
+
+
+def industry_score(startup, investor):
+    if startup.industry is None or not investor.industries:
+        return NEUTRAL
+    return 1.0 if startup.industry in investor.industries else 0.0
+
+
+def stage_score(startup, investor):
+    if not startup.stage or not investor.stages:
+        return NEUTRAL
+    return 1.0 if startup.stage in investor.stages else 0.0
+
+
+def check_size_score(startup, investor):
+    amount = startup.funding_amount
+    low, high = investor.check_size_min, investor.check_size_max
+    if not amount or (low is None and high is None):
+        return NEUTRAL
+    # За пределами диапазона балл убывает пропорционально отклонению
+    if low and amount < low:
+        return amount / low
+    if high and amount > high:
+        return high / amount
+    return 1.0
+
+
+def location_score(startup, investor):
+    if not startup.location or not investor.location:
+        return NEUTRAL
+    return 1.0 if startup.location == investor.location else 0.0
+
+
+def score(startup, investor):
+    total = (
+        WEIGHTS['industry'] * industry_score(startup, investor) +
+        WEIGHTS['stage'] * stage_score(startup, investor) +
+        WEIGHTS['check_size'] * check_size_score(startup, investor) +
+        WEIGHTS['location'] * location_score(startup, investor)
+    )
+    return round(100 * total, 2)
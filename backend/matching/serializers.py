@@ -0,0 +1,29 @@
+from rest_framework import serializers
+from .models import Match
+
+
+class StartupMatchSerializer(serializers.ModelSerializer):
+    """Инвестор, подобранный для стартапа."""
+    investor_name = serializers.CharField(source='investor.name', read_only=True)
+    investor_type = serializers.CharField(source='investor.investor_type', read_only=True)
+    rating = serializers.FloatField(source='investor.rating', read_only=True)
+
+    class Meta:
+        model = Match
+        fields = ('investor', 'investor_name', 'investor_type', 'rating',
+                  'score', 'computed_at')
+
+
+class InvestorMatchSerializer(serializers.ModelSerializer):
+    """Стартап, подобранный для инвестора."""
+    startup_name = serializers.CharField(source='startup.name', read_only=True)
+    stage = serializers.CharField(source='startup.stage', read_only=True)
+    funding_requested = serializers.DecimalField(
+        source='startup.funding_requested', max_digits=12, decimal_places=2, read_only=True
+    )
+    rating = serializers.FloatField(source='startup.rating', read_only=True)
+
+    class Meta:
+        model = Match
+        fields = ('startup', 'startup_name', 'stage', 'funding_requested', 'rating',
+                  'score', 'computed_at')
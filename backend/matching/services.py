@@ -0,0 +1,228 @@
+"""
+Построение и инкрементальное обновление таблицы Match.
+
+Для каждого профиля хранится топ-N пар противоположной стороны. Сохранение
+профиля с измененными полями оценки только ставит его в очередь
+MatchRefresh; пересчет выполняет воркер (process_match_refreshes) вне
+запроса. При пересчете обновляются собственный топ профиля и его место
+в топах контрагентов, остальные строки не трогаются.
+"""
+
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Window
+from django.db.models.functions import RowNumber
+
+from investors.models import Investor
+from startups.models import Startup
+from .models import Match, MatchRefresh
+from .scoring import InvestorProfile, StartupProfile, score
+
+
+TOP_N = getattr(settings, 'MATCHING_TOP_N', 50)
+BATCH_SIZE = 1000
+
+# Поля профилей, от которых зависит балл: изменение других полей пересчет не запускает
+STARTUP_FIELDS = ('industry', 'stage', 'funding_requested')
+INVESTOR_FIELDS = ('preferred_industries', 'preferred_stages', 'min_investment_amount', 'max_investment_amount')
+
+
+def _name(value):
+    value = (value or '').strip().lower()
+    return value or None
+
+
+def _names(value):
+    # Отрасли и стадии инвестора хранятся строкой через запятую
+    return frozenset(filter(None, (_name(part) for part in (value or '').split(','))))
+
+
+def _amount(value):
+    return float(value) if value is not None else None
+
+
+def load_startups(ids=None):
+    queryset = Startup.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    rows = queryset.values_list('id', *STARTUP_FIELDS)
+    # Локации у профилей нет — критерий дает нейтральный балл
+    return [
+        StartupProfile(pk, _name(industry), _name(stage), _amount(amount), None)
+        for pk, industry, stage, amount in rows.iterator(chunk_size=BATCH_SIZE)
+    ]
+
+
+def load_investors(ids=None):
+    queryset = Investor.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    rows = queryset.values_list('id', *INVESTOR_FIELDS)
+    return [
+        InvestorProfile(pk, _names(industries), _names(stages), _amount(low), _amount(high), None)
+        for pk, industries, stages, low, high in rows.iterator(chunk_size=BATCH_SIZE)
+    ]
+
+
+def _match(direction, startup_id, investor_id, value):
+    return Match(direction=direction, startup_id=startup_id, investor_id=investor_id, score=value)
+
+
+def replace_matches(direction, profile_ids, matches):
+    """Заменяет пары direction у профилей profile_ids одной короткой транзакцией."""
+    with transaction.atomic():
+        Match.objects.filter(direction=direction, **{f'{direction}_id__in': profile_ids}).delete()
+        Match.objects.bulk_create(matches, batch_size=BATCH_SIZE)
+
+
+def write_all(startup_tops, investor_tops):
+    """
+    Заменяет топы переданных профилей. Транзакция — на каждые BATCH_SIZE
+    профилей, а не на всю таблицу: полная пересборка не держит блокировки
+    до конца, а читатели видят старый или новый топ профиля целиком.
+    Пары удаленных профилей удаляются каскадом.
+    """
+    for own_side, other_side, tops in (
+        ('startup', 'investor', startup_tops), ('investor', 'startup', investor_tops)
+    ):
+        own_field, other_field = f'{own_side}_id', f'{other_side}_id'
+        profile_ids = list(tops)
+        for start in range(0, len(profile_ids), BATCH_SIZE):
+            chunk = profile_ids[start:start + BATCH_SIZE]
+            replace_matches(own_side, chunk, [
+                _match(own_side, **{own_field: profile_id, other_field: other_id}, value=value)
+                for profile_id in chunk
+                for value, other_id in tops[profile_id]
+            ])
+
+
+def rebuild_all(top_n=TOP_N):
+    startups = load_startups()
+    investors = load_investors()
+
+    startup_tops = {}
+    investor_heaps = defaultdict(list)
+    for startup in startups:
+        scored = [(score(startup, investor), investor.id) for investor in investors]
+        startup_tops[startup.id] = heapq.nlargest(top_n, scored)
+        for value, investor_id in scored:
+            heap = investor_heaps[investor_id]
+            if len(heap) < top_n:
+                heapq.heappush(heap, (value, startup.id))
+            elif value > heap[0][0]:
+                heapq.heapreplace(heap, (value, startup.id))
+
+    write_all(startup_tops, investor_heaps)
+    return len(startups), len(investors)
+
+
+def _refresh(own_side, other_side, own_id, scored, top_n):
+    """
+    own_side — 'startup' или 'investor' (сторона изменившегося профиля),
+    scored — [(балл, id контрагента)] для всех активных контрагентов.
+    """
+    own_field, other_field = f'{own_side}_id', f'{other_side}_id'
+
+    with transaction.atomic():
+        # 1. Собственный топ профиля пересобираем целиком
+        Match.objects.filter(direction=own_side, **{own_field: own_id}).delete()
+        Match.objects.bulk_create([
+            _match(own_side, **{own_field: own_id, other_field: other_id}, value=value)
+            for value, other_id in heapq.nlargest(top_n, scored)
+        ], batch_size=BATCH_SIZE)
+
+        # 2. Место профиля в топах контрагентов. Если профиль выпал из чужого
+        # топа, тот временно короче N — добирается полной пересборкой
+        Match.objects.filter(direction=other_side, **{own_field: own_id}).delete()
+
+        inserted, overflow = [], []
+        for start in range(0, len(scored), BATCH_SIZE):
+            chunk = scored[start:start + BATCH_SIZE]
+            # Границы топов только для оцененных контрагентов, по индексу (direction, контрагент, -score)
+            bounds = {
+                row[other_field]: (row['min_score'], row['total'])
+                for row in Match.objects.filter(
+                    direction=other_side, **{f'{other_field}__in': [other_id for _, other_id in chunk]}
+                )
+                .values(other_field)
+                .annotate(min_score=Min('score'), total=Count('id'))
+                .order_by()
+            }
+            for value, other_id in chunk:
+                min_score, total = bounds.get(other_id, (None, 0))
+                if total < top_n or value > min_score:
+                    inserted.append(_match(other_side, **{own_field: own_id, other_field: other_id}, value=value))
+                    if total >= top_n:
+                        overflow.append(other_id)
+        Match.objects.bulk_create(inserted, batch_size=BATCH_SIZE)
+
+        if overflow:
+            _trim(other_side, other_field, overflow, top_n)
+
+
+def _trim(side, field, profile_ids, top_n):
+    """Одним DELETE срезает переполнившиеся топы до top_n лучших строк."""
+    ranked = (
+        Match.objects.filter(direction=side, **{f'{field}__in': profile_ids})
+        .annotate(position=Window(
+            RowNumber(), partition_by=[F(field)], order_by=[F('score').desc(), F('id').asc()]
+        ))
+    )
+    Match.objects.filter(id__in=ranked.filter(position__gt=top_n).values('id')).delete()
+
+
+def remove_profile(side, profile_id):
+    Match.objects.filter(**{f'{side}_id': profile_id}).delete()
+
+
+def refresh_startup(startup_id, top_n=TOP_N):
+    profiles = load_startups(ids=[startup_id])
+    if not profiles:
+        remove_profile('startup', startup_id)
+        return
+    startup = profiles[0]
+    scored = [(score(startup, investor), investor.id) for investor in load_investors()]
+    _refresh('startup', 'investor', startup_id, scored, top_n)
+
+
+def refresh_investor(investor_id, top_n=TOP_N):
+    profiles = load_investors(ids=[investor_id])
+    if not profiles:
+        remove_profile('investor', investor_id)
+        return
+    investor = profiles[0]
+    scored = [(score(startup, investor), startup.id) for startup in load_startups()]
+    _refresh('investor', 'startup', investor_id, scored, top_n)
+
+
+def request_refresh(side, profile_id):
+    """Ставит профиль в очередь пересчета; повторные запросы до обработки схлопываются."""
+    MatchRefresh.objects.bulk_create([MatchRefresh(side=side, profile_id=profile_id)], ignore_conflicts=True)
+
+
+def process_refreshes(limit=BATCH_SIZE):
+    """
+    Пересчитывает профили из очереди, каждый в своей короткой транзакции;
+    параллельные воркеры разбирают разные профили (SKIP LOCKED).
+    Возвращает число обработанных профилей.
+    """
+    done = 0
+    while done < limit:
+        with transaction.atomic():
+            item = (
+                MatchRefresh.objects.select_for_update(skip_locked=True)
+                .order_by('requested_at', 'id')
+                .first()
+            )
+            if item is None:
+                break
+            if item.side == 'startup':
+                refresh_startup(item.profile_id)
+            else:
+                refresh_investor(item.profile_id)
+            item.delete()
+        done += 1
+    return done
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from investors.models import Investor
+from startups.models import Startup
+from . import services
+
+
+def _scoring_state(instance, fields):
+    # Только загруженные значения: обращение к отложенному полю стоило бы запроса
+    return tuple(instance.__dict__.get(field) for field in fields)
+
+
+def _scoring_changed(instance, created, update_fields, fields):
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return False
+    state = _scoring_state(instance, fields)
+    changed = created or state != getattr(instance, '_scoring_state', None)
+    instance._scoring_state = state
+    return changed
+
+
+@receiver(post_init, sender=Startup)
+@receiver(post_init, sender=Investor)
+def remember_scoring_state(sender, instance, **kwargs):
+    fields = services.STARTUP_FIELDS if sender is Startup else services.INVESTOR_FIELDS
+    instance._scoring_state = _scoring_state(instance, fields)
+
+
+@receiver(post_save, sender=Startup)
+def startup_saved(sender, instance, created, update_fields=None, **kwargs):
+    if _scoring_changed(instance, created, update_fields, services.STARTUP_FIELDS):
+        services.request_refresh('startup', instance.pk)
+
+
+@receiver(post_save, sender=Investor)
+def investor_saved(sender, instance, created, update_fields=None, **kwargs):
+    if _scoring_changed(instance, created, update_fields, services.INVESTOR_FIELDS):
+        services.request_refresh('investor', instance.pk)
@@ -0,0 +1,183 @@
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from investors.models import Investor
+from startups.models import Startup
+from users.models import CustomUser
+from . import services, vectorized
+from .models import Match, MatchRefresh
+from .scoring import InvestorProfile, StartupProfile, score
+
+
+class MatchingTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='owner', password='pass', user_type='startup')
+
+    def make_startup(self, name, industry='fintech', stage='idea', funding=Decimal('1000000')):
+        return Startup.objects.create(
+            name=name, description='', stage=stage, industry=industry,
+            funding_requested=funding, created_by=self.user
+        )
+
+    def make_investor(self, name, industries='fintech', stages='idea', low=None, high=None):
+        return Investor.objects.create(
+            name=name, investor_type='fund', preferred_industries=industries, preferred_stages=stages,
+            min_investment_amount=low, max_investment_amount=high, created_by=self.user
+        )
+
+
+class RefreshQueueTests(MatchingTestCase):
+    """Сохранение профиля только ставит его в очередь, пересчет — в воркере."""
+
+    def test_scoring_change_is_queued(self):
+        startup = self.make_startup('Alpha')
+        self.assertTrue(MatchRefresh.objects.filter(side='startup', profile_id=startup.pk).exists())
+
+        MatchRefresh.objects.all().delete()
+        startup.stage = 'growth'
+        startup.save()
+        self.assertEqual(MatchRefresh.objects.filter(side='startup', profile_id=startup.pk).count(), 1)
+
+    def test_unrelated_save_is_not_queued(self):
+        startup = self.make_startup('Alpha')
+        investor = self.make_investor('Fund')
+        MatchRefresh.objects.all().delete()
+
+        startup.description = 'Новое описание'
+        startup.save()
+        investor = Investor.objects.get(pk=investor.pk)
+        investor.name = 'Fund 2'
+        investor.save()
+        self.assertFalse(MatchRefresh.objects.exists())
+
+    def test_repeated_requests_collapse(self):
+        startup = self.make_startup('Alpha')
+        startup.stage = 'growth'
+        startup.save()
+        startup.stage = 'launch'
+        startup.save()
+        self.assertEqual(MatchRefresh.objects.filter(side='startup').count(), 1)
+
+    def test_worker_builds_matches(self):
+        startup = self.make_startup('Alpha')
+        investor = self.make_investor('Fund')
+
+        self.assertEqual(services.process_refreshes(), 2)
+        self.assertFalse(MatchRefresh.objects.exists())
+        self.assertTrue(Match.objects.filter(direction='startup', startup=startup, investor=investor).exists())
+        self.assertTrue(Match.objects.filter(direction='investor', startup=startup, investor=investor).exists())
+
+
+class IncrementalRefreshTests(MatchingTestCase):
+    def fill(self, top_n):
+        # Топы инвесторов заполнены слабыми стартапами
+        for index in range(top_n):
+            weak = self.make_startup(f'Weak {index}', industry='retail', stage='growth')
+            services.refresh_startup(weak.pk, top_n=top_n)
+
+    def refresh_queries(self, investor_count, top_n=2):
+        Match.objects.all().delete()
+        investors = [self.make_investor(f'Fund {investor_count}-{index}') for index in range(investor_count)]
+        self.fill(top_n)
+        strong = self.make_startup(f'Strong {investor_count}')
+
+        with CaptureQueriesContext(connection) as context:
+            services.refresh_startup(strong.pk, top_n=top_n)
+
+        for investor in investors:
+            top = Match.objects.filter(direction='investor', investor=investor)
+            self.assertEqual(top.count(), top_n)
+            self.assertTrue(top.filter(startup=strong).exists())
+        return len(context.captured_queries)
+
+    def test_overflow_is_trimmed_in_constant_queries(self):
+        self.assertEqual(self.refresh_queries(3), self.refresh_queries(30))
+
+    def test_scores_follow_profile_fields(self):
+        startup = self.make_startup('Alpha', funding=Decimal('500000'))
+        match = self.make_investor('Match', low=Decimal('100000'), high=Decimal('1000000'))
+        other = self.make_investor('Other', industries='retail, biotech', stages='growth')
+
+        services.refresh_startup(startup.pk)
+        scores = dict(
+            Match.objects.filter(direction='startup', startup=startup).values_list('investor_id', 'score')
+        )
+        self.assertEqual(scores[match.pk], 95.0)
+        # Отрасль и стадия не совпадают, чек и локация не заданы — нейтральные баллы
+        self.assertEqual(scores[other.pk], 17.5)
+
+
+class VectorizedScoreTests(SimpleTestCase):
+    """Блочный NumPy-расчет дает те же баллы, что и построчный scoring.score."""
+
+    def profiles(self):
+        stages = ['idea', 'prototype', 'growth', None]
+        # Больше 64 отраслей у стартапов, большинство — неизвестны инвесторам
+        startups = [
+            StartupProfile(
+                index, None if index % 11 == 0 else f'industry {index % 150}', stages[index % 4],
+                None if index % 7 == 0 else float(100000 * (index % 13 + 1)), None
+            )
+            for index in range(1, 301)
+        ]
+        investors = [
+            InvestorProfile(
+                index,
+                frozenset(f'industry {value}' for value in range(index % 5, 40, 9)) if index % 6 else frozenset(),
+                frozenset(stages[:index % 3]),
+                None if index % 4 == 0 else 200000.0,
+                None if index % 5 == 0 else 900000.0,
+                None
+            )
+            for index in range(1, 41)
+        ]
+        return startups, investors
+
+    def test_matches_scalar_scorer(self):
+        startup_profiles, investor_profiles = self.profiles()
+        stages, locations, industries = (vectorized._Vocabulary() for _ in range(3))
+        investors = vectorized.InvestorColumns(investor_profiles, stages, locations, industries)
+        startups = vectorized.StartupColumns(startup_profiles, stages, locations, industries)
+
+        matrix = vectorized.score_block(startups, investors, np.arange(len(startups)))
+        self.assertEqual(matrix.dtype, np.float64)
+        # Сохраняемые значения совпадают точно, без допуска
+        self.assertEqual(
+            [[round(float(value), 2) for value in row] for row in matrix],
+            [[score(startup, investor) for investor in investor_profiles] for startup in startup_profiles]
+        )
+
+
+class VectorizedRebuildTests(MatchingTestCase):
+    """Полная пересборка пишет те же баллы, что и инкрементальный пересчет."""
+
+    def test_rebuild_matches_incremental_scores(self):
+        startups = [
+            self.make_startup(f'Startup {index}', industry=['fintech', 'retail'][index % 2],
+                              funding=Decimal(137000 * (index + 1)))
+            for index in range(5)
+        ]
+        for index in range(4):
+            self.make_investor(f'Fund {index}', low=Decimal('150000'), high=Decimal(310000 * (index + 1)))
+        MatchRefresh.objects.all().delete()
+
+        for startup in startups:
+            services.refresh_startup(startup.pk)
+        incremental = set(Match.objects.values_list('direction', 'startup_id', 'investor_id', 'score'))
+
+        # Блоки меньше числа профилей — несколько транзакций
+        self.assertEqual(vectorized.rebuild_all(chunk_size=2), (5, 4))
+        self.assertEqual(set(Match.objects.values_list('direction', 'startup_id', 'investor_id', 'score')), incremental)
+
+    def test_rebuild_replaces_previous_tops(self):
+        startup = self.make_startup('Alpha')
+        investors = [self.make_investor(f'Fund {index}') for index in range(3)]
+        services.refresh_startup(startup.pk)
+
+        vectorized.rebuild_all(top_n=1, chunk_size=1)
+        self.assertEqual(Match.objects.filter(direction='startup').count(), 1)
+        self.assertEqual(Match.objects.filter(direction='investor').count(), len(investors))
@@ -0,0 +1,188 @@
+"""
+Векторизованный пересчет всех пар стартап–инвестор на NumPy.
+
+Активные профили загружаются в колоночные массивы (коды стадий, битсеты
+отраслей, суммы, коды локаций), матрица баллов считается блоками по
+chunk_size стартапов, так что память ограничена chunk_size × число
+инвесторов. Расчет идет в float64 в том же порядке операций, что и
+matching.scoring.score, и сохраняется как round(float(x), 2) — полная
+пересборка записывает те же баллы, что и инкрементальный пересчет.
+Пары пишутся короткими транзакциями на блок профилей (services.replace_matches).
+"""
+
+import numpy as np
+from .models import Match
+from .scoring import NEUTRAL, WEIGHTS
+from .services import TOP_N, load_investors, load_startups, replace_matches
+
+
+class _Vocabulary(dict):
+    def code(self, value):
+        if value is None or value == '':
+            return -1
+        return self.setdefault(value, len(self))
+
+
+def _amounts(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class StartupColumns:
+    def __init__(self, profiles, stages, locations, industries):
+        self.ids = np.array([p.id for p in profiles], dtype=np.int64)
+        self.stage = np.array([stages.code(p.stage) for p in profiles], dtype=np.int32)
+        self.industry = np.array([industries.code(p.industry) for p in profiles], dtype=np.int32)
+        self.funding = _amounts(p.funding_amount for p in profiles)
+        self.location = np.array([locations.code(p.location) for p in profiles], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class InvestorColumns:
+    def __init__(self, profiles, stages, locations, industries):
+        self.ids = np.array([p.id for p in profiles], dtype=np.int64)
+        for profile in profiles:
+            for industry in profile.industries:
+                industries.code(industry)
+            for stage in profile.stages:
+                stages.code(stage)
+
+        # Битсеты: отрасли — по 64 в слове uint64, стадий немного — одно слово
+        words = max(1, (len(industries) + 63) // 64)
+        self.industry_bits = np.zeros((len(profiles), words), dtype=np.uint64)
+        self.stage_bits = np.zeros(len(profiles), dtype=np.uint64)
+        for row, profile in enumerate(profiles):
+            for industry in profile.industries:
+                code = industries[industry]
+                self.industry_bits[row, code // 64] |= np.uint64(1) << np.uint64(code % 64)
+            for stage in profile.stages:
+                self.stage_bits[row] |= np.uint64(1) << np.uint64(stages[stage])
+
+        self.has_industries = np.array([bool(p.industries) for p in profiles])
+        self.has_stages = np.array([bool(p.stages) for p in profiles])
+        self.check_min = _amounts(p.check_size_min for p in profiles)
+        self.check_max = _amounts(p.check_size_max for p in profiles)
+        self.location = np.array([locations.code(p.location) for p in profiles], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_columns():
+    stages, locations, industries = _Vocabulary(), _Vocabulary(), _Vocabulary()
+    investors = InvestorColumns(load_investors(), stages, locations, industries)
+    startups = StartupColumns(load_startups(), stages, locations, industries)
+    return startups, investors
+
+
+def _bit(words, codes):
+    """words: (I,) uint64; codes: (C,) → (C, I) из 0/1."""
+    shifts = np.where(codes < 0, 0, codes).astype(np.uint64) % np.uint64(64)
+    return ((words[None, :] >> shifts[:, None]) & np.uint64(1)).astype(np.float64)
+
+
+def score_block(startups, investors, rows):
+    """Матрица баллов (len(rows) × число инвесторов), float64 без округления."""
+    industry_code = startups.industry[rows]
+    word = np.where(industry_code < 0, 0, industry_code) // 64
+    industry = _industry_match(investors, industry_code, word)
+    industry = np.where(
+        (industry_code[:, None] < 0) | ~investors.has_industries[None, :], NEUTRAL, industry
+    )
+
+    stage_code = startups.stage[rows]
+    stage = _bit(investors.stage_bits, stage_code)
+    stage = np.where((stage_code[:, None] < 0) | ~investors.has_stages[None, :], NEUTRAL, stage)
+
+    amount = startups.funding[rows][:, None]
+    low = investors.check_min[None, :]
+    high = investors.check_max[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        check = np.ones((len(rows), len(investors)), dtype=np.float64)
+        above = (high > 0) & (amount > high)
+        check = np.where(above, high / amount, check)
+        below = (low > 0) & (amount < low)
+        check = np.where(below, amount / low, check)
+    missing = (np.isnan(amount) | (amount == 0)) | (np.isnan(low) & np.isnan(high))
+    check = np.where(missing, NEUTRAL, check)
+
+    startup_location = startups.location[rows][:, None]
+    investor_location = investors.location[None, :]
+    location = (startup_location == investor_location).astype(np.float64)
+    location = np.where((startup_location < 0) | (investor_location < 0), NEUTRAL, location)
+
+    total = (
+        WEIGHTS['industry'] * industry +
+        WEIGHTS['stage'] * stage +
+        WEIGHTS['check_size'] * check +
+        WEIGHTS['location'] * location
+    )
+    return 100 * total
+
+
+def _industry_match(investors, industry_code, word):
+    result = np.zeros((len(industry_code), len(investors)), dtype=np.float64)
+    width = investors.industry_bits.shape[1]
+    for w in np.unique(word):
+        if w >= width:
+            # Отрасль появилась только у стартапов: ни у одного инвестора ее нет — несовпадение
+            continue
+        mask = word == w
+        result[mask] = _bit(investors.industry_bits[:, w], industry_code[mask])
+    return result
+
+
+def _top_k(scores, k, axis):
+    """Индексы k лучших значений вдоль оси (без полной сортировки)."""
+    size = scores.shape[axis]
+    if size <= k:
+        return np.indices(scores.shape)[axis]
+    return np.argpartition(-scores, k - 1, axis=axis).take(np.arange(k), axis=axis)
+
+
+def rebuild_all(top_n=TOP_N, chunk_size=1000):
+    startups, investors = load_columns()
+    if not len(startups) or not len(investors):
+        Match.objects.all().delete()
+        return len(startups), len(investors)
+
+    k_investors = min(top_n, len(investors))
+    k_startups = min(top_n, len(startups))
+
+    # Бегущий топ стартапов для каждого инвестора: (k × I)
+    best_scores = np.full((0, len(investors)), -np.inf, dtype=np.float64)
+    best_rows = np.zeros((0, len(investors)), dtype=np.int64)
+    columns = np.arange(len(investors))
+
+    for start in range(0, len(startups), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(startups)))
+        scores = score_block(startups, investors, rows)
+
+        # Топ инвесторов для каждого стартапа блока — сразу в БД
+        top = _top_k(scores, k_investors, axis=1)
+        replace_matches('startup', startups.ids[rows].tolist(), [
+            Match(direction='startup', startup_id=int(startups.ids[row]),
+                  investor_id=int(investors.ids[col]), score=round(float(scores[i, col]), 2))
+            for i, row in enumerate(rows)
+            for col in top[i]
+        ])
+
+        # Сливаем блок с бегущим топом инвесторов
+        merged_scores = np.vstack([best_scores, scores])
+        merged_rows = np.vstack([best_rows, np.broadcast_to(rows[:, None], scores.shape)])
+        keep = _top_k(merged_scores, k_startups, axis=0)
+        best_scores = merged_scores[keep, columns]
+        best_rows = merged_rows[keep, columns]
+
+    for start in range(0, len(investors), chunk_size):
+        cols = range(start, min(start + chunk_size, len(investors)))
+        replace_matches('investor', investors.ids[start:cols.stop].tolist(), [
+            Match(direction='investor', investor_id=int(investors.ids[col]),
+                  startup_id=int(startups.ids[best_rows[i, col]]),
+                  score=round(float(best_scores[i, col]), 2))
+            for col in cols
+            for i in range(best_scores.shape[0])
+        ])
+
+    return len(startups), len(investors)
@@ -0,0 +1,30 @@
+from rest_framework import generics, permissions
+from startup_platform.query_planner import QueryPlannerMixin
+from .models import Match
+from .serializers import StartupMatchSerializer, InvestorMatchSerializer
+
+
+class StartupMatchesView(QueryPlannerMixin, generics.ListAPIView):
+    serializer_class = StartupMatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        # Чтение по индексу (direction, startup, -score), без расчета на лету
+        return Match.objects.filter(
+            direction='startup',
+            startup_id=self.kwargs['pk']
+        ).order_by('-score')
+
+
+class InvestorMatchesView(QueryPlannerMixin, generics.ListAPIView):
+    serializer_class = InvestorMatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        # Чтение по индексу (direction, investor, -score), без расчета на лету
+        return Match.objects.filter(
+            direction='investor',
+            investor_id=self.kwargs['pk']
+        ).order_by('-score')
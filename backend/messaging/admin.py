@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message, Conversation
+from .models import Message, Conversation, ConversationUnread
 
 
 @admin.register(Message)
@@ -13,3 +13,9 @@ class MessageAdmin(admin.ModelAdmin):
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ['id', 'created_at']
     filter_horizontal = ['participants']
+
+
+@admin.register(ConversationUnread)
+class ConversationUnreadAdmin(admin.ModelAdmin):
+    list_display = ['user', 'conversation', 'count']
+    search_fields = ['user__username']
@@ -1,9 +1,15 @@
+import asyncio
 import json
+import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import AnonymousUser
-from .models import Conversation, Message
-from users.models import UserActivity
+from users.presence import HEARTBEAT_INTERVAL, get_presence
+from . import delivery, persistence
+from .receipts import ReadReceiptBuffer, apply_watermarks, message_conversation
+from .typing import TypingState
+
+logger = logging.getLogger(__name__)
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -13,27 +19,49 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
         
+        self.receipts = ReadReceiptBuffer(self.apply_read_receipts)
+        self.typing = TypingState(self.send_typing)
+        self.recipients = {}
+        
         # Join user group
         await self.channel_layer.group_add(
             f"user_{self.user.id}",
             self.channel_name
         )
         
-        # Update user online status
-        await self.update_user_online_status(True)
+        # Соединение учитывается в presence и продлевается серверным таймером,
+        # пока открыт сокет: от клиента heartbeat'ы не требуются
+        await database_sync_to_async(get_presence().connect)(self.user, self.channel_name)
+        self.heartbeat_task = asyncio.create_task(self.keep_alive())
         
         await self.accept()
 
     async def disconnect(self, close_code):
         if not self.user.is_anonymous:
+            heartbeat_task = getattr(self, 'heartbeat_task', None)
+            if heartbeat_task is not None:
+                heartbeat_task.cancel()
+            
+            # Применяем накопленные квитанции и гасим индикаторы набора до выхода
+            await self.receipts.flush()
+            await self.typing.stop_all()
+            
             # Remove from user group
             await self.channel_layer.group_discard(
                 f"user_{self.user.id}",
                 self.channel_name
             )
             
-            # Update user online status
-            await self.update_user_online_status(False)
+            await database_sync_to_async(get_presence().disconnect)(self.user, self.channel_name)
+
+    async def keep_alive(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await database_sync_to_async(get_presence().heartbeat)(self.user, self.channel_name)
+            except Exception:
+                # Сбой Redis не должен обрывать таймер: следующий тик повторит попытку
+                logger.exception("Presence heartbeat failed for user %s", self.user.id)
 
     async def receive(self, text_data):
         try:
@@ -51,87 +79,111 @@ class ChatConsumer(AsyncWebsocketConsumer):
             pass
 
     async def handle_chat_message(self, data):
-        conversation_id = data.get('conversation_id')
+        try:
+            conversation_id = int(data.get('conversation_id') or 0)
+        except (TypeError, ValueError):
+            return
         content = data.get('content')
         
         if conversation_id and content:
-            # Save message to database
-            message = await self.save_message(conversation_id, content)
+            recipient_ids = await self.get_recipients(conversation_id)
+            if recipient_ids is None:
+                return
+            # INSERT сообщения, UPDATE полей последнего сообщения и счетчики непрочитанных — одной транзакцией
+            message = await persistence.save_message(conversation_id, self.user.id, content, recipient_ids)
             
-            # Send to other participants
-            await self.channel_layer.group_send(
-                f"conversation_{conversation_id}",
-                {
-                    'type': 'chat_message',
-                    'message': await self.serialize_message(message)
-                }
+            # Кадр сериализуется один раз и рассылается в группы user_<id> участников
+            frame = await database_sync_to_async(delivery.encode_message)(message)
+            await delivery.fan_out(
+                self.channel_layer, recipient_ids, delivery.chat_event(frame, message.conversation_id)
             )
+            # Отправителю — тот же кадр как подтверждение
+            await self.send(text_data=frame)
+            await self.typing.stop(message.conversation_id)
 
     async def handle_typing(self, data):
-        conversation_id = data.get('conversation_id')
-        is_typing = data.get('is_typing')
-        
-        if conversation_id:
-            await self.channel_layer.group_send(
-                f"conversation_{conversation_id}",
-                {
-                    'type': 'typing_indicator',
-                    'user_id': self.user.id,
-                    'is_typing': is_typing
-                }
-            )
+        # Наружу уходят только переходы start/stop, см. messaging.typing
+        try:
+            conversation_id = int(data.get('conversation_id') or 0)
+        except (TypeError, ValueError):
+            return
+        if conversation_id and await self.get_recipients(conversation_id) is not None:
+            await self.typing.update(conversation_id, bool(data.get('is_typing')))
+
+    async def send_typing(self, conversation_id, is_typing):
+        await delivery.fan_out(self.channel_layer, self.recipients.get(conversation_id) or [], {
+            'type': 'typing_indicator',
+            'conversation_id': conversation_id,
+            'user_id': self.user.id,
+            'is_typing': is_typing
+        })
+
+    async def get_recipients(self, conversation_id):
+        # Состав диалога кэшируется на время соединения; None — пользователь не участник
+        if conversation_id not in self.recipients:
+            self.recipients[conversation_id] = await self.load_recipients(conversation_id)
+        return self.recipients[conversation_id]
 
     async def handle_read_receipt(self, data):
-        message_id = data.get('message_id')
-        if message_id:
-            await self.mark_message_as_read(message_id)
+        # Квитанция — отметка «прочитано до message_id»; пишется в БД пачкой
+        try:
+            message_id = int(data.get('message_id') or 0)
+            conversation_id = int(data.get('conversation_id') or 0)
+        except (TypeError, ValueError):
+            return
+        if not message_id:
+            return
+        if not conversation_id:
+            conversation_id = await database_sync_to_async(message_conversation)(message_id)
+        if conversation_id:
+            self.receipts.add(conversation_id, message_id)
+
+    async def apply_read_receipts(self, watermarks):
+        applied = await database_sync_to_async(apply_watermarks)(self.user.id, watermarks)
+        for conversation_id, (message_id, recipient_ids) in applied.items():
+            for recipient_id in recipient_ids:
+                await self.channel_layer.group_send(
+                    f"user_{recipient_id}",
+                    {
+                        'type': 'read_receipt',
+                        'conversation_id': conversation_id,
+                        'user_id': self.user.id,
+                        'message_id': message_id
+                    }
+                )
 
     async def chat_message(self, event):
+        # Кадр уже закодирован отправителем — пересылаем строку как есть
+        await self.send(text_data=event['frame'])
+
+    async def notification(self, event):
+        await self.send(text_data=event['frame'])
+
+    async def read_receipt(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'read_receipt',
+            'conversation_id': event['conversation_id'],
+            'user_id': event['user_id'],
+            'message_id': event['message_id']
+        }))
+
+    async def unread_update(self, event):
         await self.send(text_data=json.dumps({
-            'type': 'chat_message',
-            'message': event['message']
+            'type': 'unread_count',
+            'conversation_id': event['conversation_id'],
+            'count': event['count'],
+            'total': event['total']
         }))
 
     async def typing_indicator(self, event):
         await self.send(text_data=json.dumps({
             'type': 'typing',
+            'conversation_id': event['conversation_id'],
             'user_id': event['user_id'],
             'is_typing': event['is_typing']
         }))
 
-    @database_sync_to_async
-    def save_message(self, conversation_id, content):
-        conversation = Conversation.objects.get(id=conversation_id)
-        message = Message.objects.create(
-            conversation=conversation,
-            sender=self.user,
-            content=content
-        )
-        
-        # Update conversation
-        conversation.last_message = content
-        conversation.last_message_time = message.timestamp
-        conversation.save()
-        
-        return message
-
-    @database_sync_to_async
-    def serialize_message(self, message):
-        from .serializers import MessageSerializer
-        return MessageSerializer(message).data
-
-    @database_sync_to_async
-    def mark_message_as_read(self, message_id):
-        try:
-            message = Message.objects.get(id=message_id)
-            if message.sender != self.user:
-                message.is_read = True
-                message.save()
-        except Message.DoesNotExist:
-            pass
-
-    @database_sync_to_async
-    def update_user_online_status(self, is_online):
-        activity, created = UserActivity.objects.get_or_create(user=self.user)
-        activity.is_online = is_online
-        activity.save()
\ No newline at end of file
+    async def load_recipients(self, conversation_id):
+        if not await persistence.is_participant(conversation_id, self.user.id):
+            return None
+        return await persistence.recipient_ids(conversation_id, self.user.id)
@@ -0,0 +1,77 @@
+"""
+Доставка сообщений чата участникам диалога.
+
+Используется и REST-путем (SendMessageView), и WebSocket-путем
+(ChatConsumer). Сообщение сериализуется один раз в готовый JSON-кадр,
+который затем параллельно рассылается в группы user_<id> всех получателей;
+консьюмерам остается только отправить строку в сокет.
+"""
+
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+
+from startup_platform.query_planner import plan_queryset
+from .models import Message
+from .serializers import MessageSerializer
+
+
+def recipient_ids(conversation_id, sender_id):
+    return list(
+        get_user_model().objects.filter(conversations__id=conversation_id)
+        .exclude(id=sender_id)
+        .values_list('id', flat=True)
+    )
+
+
+def serialize_message(message):
+    """Данные MessageSerializer — одна сериализация на сообщение (кадр и ответ REST)."""
+    message = plan_queryset(Message.objects.filter(pk=message.pk), MessageSerializer).get()
+    return MessageSerializer(message).data
+
+
+def encode_frame(data, conversation_id):
+    frame = {
+        'type': 'chat_message',
+        'conversation_id': conversation_id,
+        'message': data
+    }
+    return JSONRenderer().render(frame).decode('utf-8')
+
+
+def encode_message(message):
+    """Готовый JSON-кадр chat_message."""
+    return encode_frame(serialize_message(message), message.conversation_id)
+
+
+async def fan_out(channel_layer, user_ids, event):
+    await asyncio.gather(*(
+        channel_layer.group_send(f"user_{user_id}", event) for user_id in user_ids
+    ))
+
+
+def chat_event(frame, conversation_id):
+    return {
+        'type': 'chat_message',
+        'conversation_id': conversation_id,
+        'frame': frame
+    }
+
+
+def deliver(message, user_ids=None):
+    """
+    Синхронная доставка (из WSGI-представлений). Возвращает сериализованное
+    сообщение из кадра — представление отдает его в ответе без повторной сериализации.
+    """
+    data = serialize_message(message)
+    frame = encode_frame(data, message.conversation_id)
+    if user_ids is None:
+        user_ids = recipient_ids(message.conversation_id, message.sender_id)
+    channel_layer = get_channel_layer()
+    if channel_layer is not None and user_ids:
+        async_to_sync(fan_out)(channel_layer, user_ids, chat_event(frame, message.conversation_id))
+    return data
+
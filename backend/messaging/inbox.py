@@ -0,0 +1,53 @@
+"""
+Read-модель списка диалогов (инбокса).
+
+Диалоги пользователя выбираются одним запросом: собеседник, отправитель
+последнего сообщения и счетчик непрочитанных подтягиваются коррелированными
+подзапросами по индексам. Вторым запросом загружаются краткие карточки
+всех собеседников страницы разом (вместе с аватаром из профиля).
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Conversation, ConversationUnread, Message
+
+
+def inbox_queryset(user):
+    participants = Conversation.participants.through.objects.filter(
+        conversation_id=OuterRef('pk')
+    ).exclude(**{f'{get_user_model()._meta.model_name}_id': user.id})
+
+    last_sender = Message.objects.filter(
+        conversation_id=OuterRef('pk')
+    ).order_by('-timestamp', '-id').values('sender_id')[:1]
+
+    unread = ConversationUnread.objects.filter(
+        conversation_id=OuterRef('pk'), user_id=user.id
+    ).values('count')[:1]
+
+    return (
+        Conversation.objects.filter(participants=user, is_active=True)
+        .annotate(
+            other_user_id=Subquery(
+                participants.values(f'{get_user_model()._meta.model_name}_id')[:1]
+            ),
+            last_message_sender_id=Subquery(last_sender),
+            unread_for_user=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+        )
+        .order_by(F('last_message_time').desc(nulls_last=True), '-id')
+    )
+
+
+def attach_participants(conversations):
+    """Проставляет conversation.other_user одним запросом на всю страницу."""
+    user_ids = {c.other_user_id for c in conversations if c.other_user_id}
+    # Аватар — в профиле пользователя, профиль подтягивается тем же запросом
+    users = get_user_model().objects.filter(id__in=user_ids).select_related('userprofile').only(
+        'id', 'username', 'first_name', 'last_name', 'user_type', 'is_verified', 'userprofile__avatar'
+    )
+    by_id = {user.id: user for user in users}
+    for conversation in conversations:
+        conversation.other_user = by_id.get(conversation.other_user_id)
+    return conversations
@@ -0,0 +1,79 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from messaging import delivery
+from messaging.models import Conversation, Message
+from users.models import CustomUser, UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку доставки сообщения в групповом диалоге через in-memory channel layer: '
+        'прежняя сериализация на каждого получателя против одного кадра с fan-out'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='2,10,50,200', help='Число участников, через запятую')
+        parser.add_argument('--rounds', type=int, default=50)
+        parser.add_argument('--content-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        # Настоящее сообщение в БД: сериализация читает его вместе с отправителем и вложениями
+        sender = CustomUser.objects.create_user(username=f'benchmark-{uuid.uuid4().hex}', user_type='startup')
+        UserProfile.objects.create(user=sender, bio='b' * 200)
+        conversation = Conversation.objects.create()
+        try:
+            conversation.participants.add(sender)
+            message = Message.objects.create(
+                conversation=conversation, sender=sender, content='x' * options['content_size']
+            )
+            self.stdout.write(f"{'участников':>10} {'по одному, мс':>14} {'fan-out, мс':>12}")
+            for size in sizes:
+                serial, fanned = asyncio.run(self.measure(size, options['rounds'], message))
+                self.stdout.write(f'{size:>10} {serial:>14.3f} {fanned:>12.3f}')
+        finally:
+            conversation.delete()
+            sender.delete()
+
+    async def measure(self, size, rounds, message):
+        layer = InMemoryChannelLayer(capacity=rounds * 2 + 10)
+        channels = []
+        for user_id in range(size):
+            channel = await layer.new_channel()
+            await layer.group_add(f'user_{user_id}', channel)
+            channels.append(channel)
+        user_ids = list(range(size))
+        conversation_id = message.conversation_id
+        serialize_message = database_sync_to_async(delivery.serialize_message)
+        encode_message = database_sync_to_async(delivery.encode_message)
+
+        async def serial():
+            # Прежний путь: для каждого получателя сообщение заново читается
+            # и прогоняется через MessageSerializer, group_send — по очереди
+            for user_id in user_ids:
+                data = await serialize_message(message)
+                frame = delivery.encode_frame(data, conversation_id)
+                await layer.group_send(f'user_{user_id}', delivery.chat_event(frame, conversation_id))
+
+        async def fanned():
+            frame = await encode_message(message)
+            await delivery.fan_out(layer, user_ids, delivery.chat_event(frame, conversation_id))
+
+        results = []
+        for send in (serial, fanned):
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                await send()
+                # Задержка — до получения кадра последним участником
+                await asyncio.gather(*(layer.receive(channel) for channel in channels))
+                timings.append((time.perf_counter() - started) * 1000)
+            results.append(statistics.median(timings))
+        return results
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from itertools import count
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import channel_layers
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext, override_settings, setup_databases, teardown_databases
+
+from messaging.models import Conversation
+
+
+# Клиент считает обмен законченным, если столько секунд не получал кадров
+IDLE_TIMEOUT = 5
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Client:
+    """
+    Имитация вкладки браузера: одно WebSocket-соединение с ws/chat/.
+
+    ASGI-события отправляются напрямую через asgiref: channels.testing
+    тянет за собой daphne, которого нет в зависимостях.
+    """
+
+    def __init__(self, application, user, conversation_id, session_key):
+        self.user = user
+        self.conversation_id = conversation_id
+        self.communicator = ApplicationCommunicator(application, {
+            'type': 'websocket',
+            'path': '/ws/chat/',
+            'query_string': b'',
+            'headers': [(b'cookie', f'sessionid={session_key}'.encode())],
+            'subprotocols': []
+        })
+        self.frames = 0
+
+    async def connect(self):
+        await self.communicator.send_input({'type': 'websocket.connect'})
+        response = await self.communicator.receive_output(IDLE_TIMEOUT)
+        if response['type'] != 'websocket.accept':
+            raise RuntimeError(f'Соединение пользователя {self.user.pk} отклонено')
+
+    async def send(self, payload):
+        await self.communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(payload)})
+
+    async def receive(self):
+        # receive_output по таймауту отменяет приложение, а тишина здесь — норма
+        response = await asyncio.wait_for(self.communicator.output_queue.get(), IDLE_TIMEOUT)
+        if response['type'] != 'websocket.send':
+            raise RuntimeError(f'Соединение пользователя {self.user.pk} закрыто: {response}')
+        return response['text']
+
+    async def listen(self, sent_at, deliveries, receipts):
+        while True:
+            try:
+                frame = json.loads(await self.receive())
+            except asyncio.TimeoutError:
+                return
+            self.frames += 1
+            if frame.get('type') != 'chat_message':
+                continue
+            message = frame['message']
+            if message.get('sender') == self.user.pk:
+                continue
+            started = sent_at.get(message['content'])
+            if started is not None:
+                received = time.perf_counter()
+                deliveries.append((received, (received - started) * 1000))
+            if receipts:
+                await self.send({
+                    'type': 'read_receipt',
+                    'conversation_id': self.conversation_id,
+                    'message_id': message['id']
+                })
+
+    async def disconnect(self):
+        await self.communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.communicator.wait(IDLE_TIMEOUT)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон ws/chat/: поднимает ASGI-приложение с in-memory channel layer '
+        'на тестовой БД, открывает N клиентов и обменивается сообщениями, typing и квитанциями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100)
+        parser.add_argument('--group-size', type=int, default=2, help='Участников в одном диалоге')
+        parser.add_argument('--messages', type=int, default=5, help='Сообщений от каждого клиента')
+        parser.add_argument('--no-receipts', action='store_true', help='Не отправлять квитанции о прочтении')
+
+    def handle(self, *args, **options):
+        # Отдельная тестовая БД: прогон не трогает рабочие данные
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER):
+                channel_layers.backends = {}
+                report = self.run(**options)
+        finally:
+            channel_layers.backends = {}
+            teardown_databases(old_config, verbosity=0)
+        self.print_report(report)
+
+    def create_fixtures(self, clients, group_size):
+        User = get_user_model()
+        sequence = count()
+        fixtures = []
+        for start in range(0, clients, group_size):
+            conversation = Conversation.objects.create()
+            members = []
+            for _ in range(min(group_size, clients - start)):
+                index = next(sequence)
+                user = User.objects.create_user(
+                    username=f'loadtest{index}', password=None,
+                    user_type='startup' if index % 2 else 'investor'
+                )
+                members.append(user)
+            conversation.participants.set(members)
+            fixtures.extend((user, conversation.pk, self.session_for(user)) for user in members)
+        return fixtures
+
+    def session_for(self, user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    def run(self, clients, group_size, messages, no_receipts, **options):
+        from startup_platform.asgi import application
+
+        fixtures = self.create_fixtures(clients, max(group_size, 2))
+        # Все sync-вызовы консьюмеров (thread_sensitive) выполняются в этом потоке,
+        # поэтому их запросы видны CaptureQueriesContext. Соединение берем явно:
+        # прокси django.db.connection в потоке event loop указал бы на другое
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            report = async_to_sync(self.exchange)(application, fixtures, messages, not no_receipts, queries)
+        return report
+
+    async def exchange(self, application, fixtures, messages, receipts, queries):
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        clients = [Client(application, *fixture) for fixture in fixtures]
+        connect_started = time.perf_counter()
+        await asyncio.gather(*(client.connect() for client in clients))
+        connect_time = time.perf_counter() - connect_started
+        connected = tracemalloc.take_snapshot()
+        memory = sum(stat.size_diff for stat in connected.compare_to(baseline, 'filename'))
+        tracemalloc.stop()
+
+        queries_before = len(queries)
+        sent_at, deliveries = {}, []
+        listeners = [
+            asyncio.ensure_future(client.listen(sent_at, deliveries, receipts)) for client in clients
+        ]
+
+        sent = 0
+        exchange_started = time.perf_counter()
+        for round_number in range(messages):
+            for client in clients:
+                content = f'loadtest:{client.user.pk}:{round_number}'
+                await client.send({'type': 'typing', 'conversation_id': client.conversation_id, 'is_typing': True})
+                sent_at[content] = time.perf_counter()
+                await client.send({'type': 'chat_message', 'conversation_id': client.conversation_id, 'content': content})
+                await client.send({'type': 'typing', 'conversation_id': client.conversation_id, 'is_typing': False})
+                sent += 1
+        await asyncio.gather(*listeners)
+        latencies = [latency for _, latency in deliveries]
+        finished = max((received for received, _ in deliveries), default=exchange_started)
+
+        await asyncio.gather(*(client.disconnect() for client in clients))
+        return {
+            'clients': len(clients),
+            'connect_time': connect_time,
+            'memory_per_connection': memory / max(len(clients), 1),
+            'messages': sent,
+            'deliveries': len(latencies),
+            'frames': sum(client.frames for client in clients),
+            'exchange_time': finished - exchange_started,
+            'p50': percentile(latencies, 0.5),
+            'p99': percentile(latencies, 0.99),
+            'mean': statistics.mean(latencies) if latencies else 0.0,
+            'queries_per_message': (len(queries) - queries_before) / max(sent, 1)
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f"Клиентов:                 {report['clients']}")
+        self.stdout.write(f"Подключение всех:         {report['connect_time']:.2f} с")
+        self.stdout.write(f"Память на соединение:     {report['memory_per_connection'] / 1024:.1f} КБ")
+        self.stdout.write(f"Отправлено сообщений:     {report['messages']}")
+        self.stdout.write(f"Доставлено получателям:   {report['deliveries']}")
+        self.stdout.write(f"Всего кадров клиентам:    {report['frames']}")
+        self.stdout.write(f"Обмен:                    {report['exchange_time']:.2f} с")
+        self.stdout.write(
+            f"Задержка доставки, мс:    p50 {report['p50']:.2f} / p99 {report['p99']:.2f} / "
+            f"среднее {report['mean']:.2f}"
+        )
+        self.stdout.write(f"Запросов к БД на сообщение: {report['queries_per_message']:.1f}")
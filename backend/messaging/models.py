@@ -3,20 +3,72 @@ from users.models import CustomUser
 
 
 class Message(models.Model):
+    conversation = models.ForeignKey(
+        'Conversation', on_delete=models.CASCADE, related_name='messages', null=True, blank=True
+    )
     sender = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_messages')
-    receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_messages')
+    # Сообщения диалога адресованы всем участникам, receiver — только у прямых сообщений
+    receiver = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='received_messages', null=True, blank=True
+    )
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # История диалога: последние N, «до курсора» и «после курсора»
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='message_history_idx'),
+        ]
 
     def __str__(self):
-        return f"From {self.sender.username} to {self.receiver.username}"
+        return f"From {self.sender.username} in {self.conversation_id}"
+
 
 
+class MessageAttachment(models.Model):
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='attachments')
+    file = models.FileField(upload_to='message_attachments/')
+    file_name = models.CharField(max_length=255, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.file_name or self.file.name
+
 class Conversation(models.Model):
     participants = models.ManyToManyField(CustomUser, related_name='conversations')
+    # Превью последнего сообщения для инбокса, обновляется при записи сообщения (messaging.persistence)
+    last_message = models.TextField(blank=True)
+    last_message_time = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         participants = self.participants.all()[:3]
         return "Conversation: " + ", ".join([p.username for p in participants]) + ("..." if self.participants.count() > 3 else "")
+
+
+class ConversationUnread(models.Model):
+    """Счетчик непрочитанных сообщений пользователя в одном диалоге."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='unread_counters')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='unread_counters')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation'], name='unique_conversation_unread'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} / {self.conversation_id}: {self.count}"
+
+
+class UnreadTotal(models.Model):
+    """Сумма непрочитанных по всем диалогам пользователя, поддерживается вместе с ConversationUnread."""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='unread_total')
+    total = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.total}"
@@ -0,0 +1,104 @@
+"""
+Курсорная пагинация истории сообщений.
+
+Без параметров отдаются последние N сообщений диалога, ?before=<курсор> —
+N сообщений старше курсора, ?since=<курсор> — сообщения новее курсора
+(догрузка после переподключения WebSocket). Внутри страницы сообщения
+идут по возрастанию времени. Курсор — сравнение строк (timestamp, id)
+со значением курсора, все выборки идут диапазоном по индексу
+(conversation_id, timestamp, id), без OFFSET.
+"""
+
+import base64
+from collections import OrderedDict
+
+from django.db.models import DateTimeField, F, Value
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from startup_platform.pagination import RowValueCompare
+
+
+class MessageHistoryPagination(BasePagination):
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        before = self.decode_cursor(request.query_params.get('before'))
+        since = self.decode_cursor(request.query_params.get('since'))
+        self.mode = 'since' if since else 'before'
+
+        if since:
+            queryset = queryset.filter(self.get_cursor_filter('>', *since)).order_by('timestamp', 'id')
+        else:
+            if before:
+                queryset = queryset.filter(self.get_cursor_filter('<', *before))
+            queryset = queryset.order_by('-timestamp', '-id')
+
+        rows = list(queryset[:self.limit + 1])
+        self.has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.mode == 'before':
+            rows.reverse()
+        self.page = rows
+        self.since_cursor = since
+        return rows
+
+    def get_cursor_filter(self, op, timestamp, pk):
+        # (timestamp, id) > (t, pk) — диапазон по хвосту индекса после conversation_id
+        return RowValueCompare(
+            [F('timestamp'), F('id')], op,
+            [Value(timestamp, output_field=DateTimeField()), Value(pk)]
+        )
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(limit, self.max_page_size))
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8')
+            timestamp, pk = raw.rsplit('|', 1)
+            parsed = parse_datetime(timestamp)
+            if parsed is None:
+                raise ValueError(timestamp)
+            return parsed, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, timestamp, pk):
+        raw = f'{timestamp.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def get_paginated_response(self, data):
+        oldest = self.page[0] if self.page else None
+        newest = self.page[-1] if self.page else None
+
+        before = None
+        if self.mode == 'before' and self.has_more and oldest:
+            before = self.encode_cursor(oldest.timestamp, oldest.id)
+
+        if newest:
+            since = self.encode_cursor(newest.timestamp, newest.id)
+        elif self.since_cursor:
+            # Пустая дельта — клиент продолжает с тем же курсором
+            since = self.encode_cursor(*self.since_cursor)
+        else:
+            since = None
+
+        return Response(OrderedDict([
+            ('before', before),
+            ('since', since),
+            ('has_more', self.has_more),
+            ('results', data),
+        ]))
@@ -0,0 +1,143 @@
+"""
+Запись сообщений чата из WebSocket-консьюмера.
+
+Сообщение — один INSERT, диалог — один UPDATE только полей последнего
+сообщения, без повторного чтения строки диалога, и атомарный инкремент
+счетчиков непрочитанных (messaging.unread) — все в одной транзакции:
+сообщение не бывает сохранено без счетчиков и наоборот. Если задан
+CHAT_GROUP_COMMIT_WINDOW (секунды), сообщения со всех сокетов процесса
+копятся это время и пишутся одной транзакцией: bulk INSERT, по одному
+UPDATE на каждый затронутый диалог и по инкременту на пару
+(диалог, отправитель). Если пачка падает, ее сообщения пишутся по одному:
+ошибку получает только отправитель плохого сообщения.
+
+Ограничение: async ORM Django (4.2) не поддерживает transaction.atomic,
+поэтому сама запись идет через database_sync_to_async — переход в поток
+остается на пути записи. Без group commit это один переход на сообщение,
+с ним — один на пачку со всех сокетов. Асинхронно, без потока, выполняются
+только проверки участника и выборка получателей.
+"""
+
+import asyncio
+import logging
+import weakref
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import unread
+from .models import Conversation, Message
+
+
+GROUP_COMMIT_WINDOW = getattr(settings, 'CHAT_GROUP_COMMIT_WINDOW', 0)
+
+logger = logging.getLogger(__name__)
+
+
+async def is_participant(conversation_id, user_id):
+    return await Conversation.objects.filter(id=conversation_id, participants__id=user_id).aexists()
+
+
+async def recipient_ids(conversation_id, sender_id):
+    queryset = (
+        get_user_model().objects.filter(conversations__id=conversation_id)
+        .exclude(id=sender_id)
+        .values_list('id', flat=True)
+    )
+    return [pk async for pk in queryset]
+
+
+def _last_message_fields(message):
+    return {
+        'last_message': message.content,
+        'last_message_time': message.timestamp,
+        'updated_at': message.timestamp
+    }
+
+
+def write_message(conversation_id, sender_id, content, recipient_ids=None):
+    with transaction.atomic():
+        message = Message.objects.create(
+            conversation_id=conversation_id, sender_id=sender_id, content=content
+        )
+        Conversation.objects.filter(id=conversation_id).update(**_last_message_fields(message))
+        unread.increment(conversation_id, sender_id, recipient_ids)
+    return message
+
+
+async def save_message(conversation_id, sender_id, content, recipient_ids=None):
+    if GROUP_COMMIT_WINDOW:
+        return await get_writer().submit(conversation_id, sender_id, content)
+    # Одна транзакция на INSERT, UPDATE диалога и счетчики — async ORM ее не поддерживает
+    return await database_sync_to_async(write_message)(conversation_id, sender_id, content, recipient_ids)
+
+
+def write_batch(messages):
+    with transaction.atomic():
+        Message.objects.bulk_create(messages)
+        # Последнее сообщение каждого диалога — в порядке поступления
+        latest = {message.conversation_id: message for message in messages}
+        for conversation_id, message in latest.items():
+            Conversation.objects.filter(id=conversation_id).update(**_last_message_fields(message))
+        senders = Counter((message.conversation_id, message.sender_id) for message in messages)
+        for (conversation_id, sender_id), count in senders.items():
+            unread.increment(conversation_id, sender_id, by=count)
+    return messages
+
+
+def write_each(messages):
+    """Запасной путь для упавшей пачки: каждое сообщение в своей транзакции."""
+    results = []
+    for message in messages:
+        try:
+            results.append(write_message(message.conversation_id, message.sender_id, message.content))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+class GroupCommitWriter:
+    def __init__(self, window=GROUP_COMMIT_WINDOW):
+        self.window = window
+        self.pending = []
+        self._task = None
+
+    async def submit(self, conversation_id, sender_id, content):
+        future = asyncio.get_running_loop().create_future()
+        message = Message(conversation_id=conversation_id, sender_id=sender_id, content=content)
+        self.pending.append((message, future))
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._commit_later())
+        return await future
+
+    async def _commit_later(self):
+        await asyncio.sleep(self.window)
+        batch, self.pending = self.pending, []
+        self._task = None
+        messages = [message for message, _ in batch]
+        try:
+            results = await database_sync_to_async(write_batch)(messages)
+        except Exception:
+            logger.warning("Group commit of %s messages failed, writing one by one", len(messages), exc_info=True)
+            results = await database_sync_to_async(write_each)(messages)
+        for result, (_, future) in zip(results, batch):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# Futures привязаны к циклу событий, поэтому писатель — свой на каждый цикл
+_writers = weakref.WeakKeyDictionary()
+
+
+def get_writer():
+    loop = asyncio.get_running_loop()
+    if loop not in _writers:
+        _writers[loop] = GroupCommitWriter()
+    return _writers[loop]
@@ -0,0 +1,79 @@
+"""
+Пакетная обработка квитанций о прочтении.
+
+Клиент шлет «прочитано до message_id» по диалогу. Квитанции одного
+соединения копятся RECEIPT_WINDOW секунд, от них остается по одной
+«отметке» (максимальный id) на диалог, которая применяется одним
+UPDATE и рассылается остальным участникам.
+"""
+
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .models import Message
+from . import unread
+
+
+RECEIPT_WINDOW = 0.5
+
+
+class ReadReceiptBuffer:
+    def __init__(self, apply, window=RECEIPT_WINDOW):
+        self._apply = apply
+        self.window = window
+        self.pending = {}
+        self._task = None
+
+    def add(self, conversation_id, message_id):
+        self.pending[conversation_id] = max(self.pending.get(conversation_id, 0), message_id)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.window)
+        self._task = None
+        await self._drain()
+
+    async def flush(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._drain()
+
+    async def _drain(self):
+        pending, self.pending = self.pending, {}
+        if pending:
+            await self._apply(pending)
+
+
+def apply_watermarks(user_id, watermarks):
+    """
+    Помечает прочитанными чужие сообщения до отметки в каждом диалоге.
+    Возвращает {conversation_id: (отметка, [id остальных участников])}
+    только для диалогов, где пользователь действительно участник.
+    """
+    User = get_user_model()
+    now = timezone.now()
+    applied = {}
+    for conversation_id, watermark in watermarks.items():
+        participant_ids = list(
+            User.objects.filter(conversations__id=conversation_id).values_list('id', flat=True)
+        )
+        if user_id not in participant_ids:
+            continue
+
+        Message.objects.filter(
+            conversation_id=conversation_id,
+            id__lte=watermark,
+            is_read=False
+        ).exclude(sender_id=user_id).update(is_read=True, read_at=now)
+        unread.sync(conversation_id, user_id)
+
+        applied[conversation_id] = (watermark, [pk for pk in participant_ids if pk != user_id])
+    return applied
+
+
+def message_conversation(message_id):
+    return Message.objects.filter(id=message_id).values_list('conversation_id', flat=True).first()
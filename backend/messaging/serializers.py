@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Conversation, Message, MessageAttachment
-from users.serializers import UserSerializer
+from users.serializers import UserSerializer, UserSummarySerializer
 
 class MessageAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,7 +9,8 @@ class MessageAttachmentSerializer(serializers.ModelSerializer):
         read_only_fields = ('message', 'uploaded_at')
 
 class MessageSerializer(serializers.ModelSerializer):
-    sender_info = UserSerializer(source='sender', read_only=True)
+    # Краткая карточка: сообщение уходит каждому участнику, полный профиль в кадре не нужен
+    sender_info = UserSummarySerializer(source='sender', read_only=True)
     attachments = MessageAttachmentSerializer(many=True, read_only=True)
     
     class Meta:
@@ -18,37 +19,25 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ('sender', 'conversation', 'timestamp', 'read_at')
 
 class ConversationListSerializer(serializers.ModelSerializer):
-    other_user = serializers.SerializerMethodField()
+    """Строка инбокса; ожидает queryset из messaging.inbox.inbox_queryset."""
+    other_user = UserSummarySerializer(read_only=True)
     last_message = serializers.SerializerMethodField()
-    unread_count = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField(source='unread_for_user', read_only=True)
     
     class Meta:
         model = Conversation
         fields = ('id', 'other_user', 'last_message', 'unread_count', 
                  'updated_at', 'is_active')
     
-    def get_other_user(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            other_user = obj.get_other_participant(request.user)
-            return UserSerializer(other_user, context=self.context).data
-        return None
-    
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
-        if last_message:
-            return {
-                'content': last_message.content,
-                'timestamp': last_message.timestamp,
-                'sender_id': last_message.sender.id
-            }
-        return None
-    
-    def get_unread_count(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.unread_count.get(str(request.user.id), 0)
-        return 0
+        # Превью берется из денормализованных полей диалога, без запроса к сообщениям
+        if obj.last_message_time is None:
+            return None
+        return {
+            'content': obj.last_message,
+            'timestamp': obj.last_message_time,
+            'sender_id': obj.last_message_sender_id
+        }
 
 class ConversationDetailSerializer(serializers.ModelSerializer):
     participants = UserSerializer(many=True, read_only=True)
@@ -74,7 +63,7 @@ class SendMessageSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Message
-        fields = ('content', 'message_type', 'attachments')
+        fields = ('content', 'attachments')
     
     def create(self, validated_data):
         attachments_data = validated_data.pop('attachments', [])
@@ -1,3 +1,361 @@
-from django.test import TestCase
+import asyncio
+import json
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from users.models import CustomUser, UserProfile
+from users.serializers import UserSummarySerializer
+from . import delivery, inbox, persistence
+from .models import Conversation, ConversationUnread, Message, MessageAttachment, UnreadTotal
+from .pagination import MessageHistoryPagination
+from .typing import TypingState
+
+
+class HistoryPaginationTests(TestCase):
+    """Курсоры истории: сравнение строк (timestamp, id), одинаковые timestamp не теряются."""
+
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(username='sender', password='pass', user_type='startup')
+        self.receiver = CustomUser.objects.create_user(username='receiver', password='pass', user_type='investor')
+        self.conversation = Conversation.objects.create()
+        self.messages = [
+            Message.objects.create(
+                conversation=self.conversation, sender=self.sender, receiver=self.receiver, content=str(index)
+            )
+            for index in range(7)
+        ]
+        # Пары сообщений с одинаковым временем
+        moment = timezone.now()
+        for index, message in enumerate(self.messages):
+            Message.objects.filter(pk=message.pk).update(timestamp=moment + timezone.timedelta(seconds=index // 2))
+
+    def page(self, **params):
+        paginator = MessageHistoryPagination()
+        request = Request(APIRequestFactory().get('/messages/', {'limit': 2, **params}))
+        rows = paginator.paginate_queryset(self.conversation.messages.all(), request)
+        return [row.pk for row in rows], paginator.get_paginated_response([]).data
+
+    def test_before_walks_history_backwards(self):
+        pages, params = [], {}
+        for _ in range(len(self.messages)):
+            ids, data = self.page(**params)
+            pages.insert(0, ids)
+            if not data['has_more']:
+                break
+            params = {'before': data['before']}
+        self.assertEqual(sum(pages, []), [message.pk for message in self.messages])
+
+    def test_since_returns_newer_messages(self):
+        _, data = self.page()
+        self.assertEqual(self.page(since=data['since'])[0], [])
+
+        # Сообщение 3 отправлено в ту же секунду, что и курсорное 2
+        anchor = Message.objects.get(pk=self.messages[2].pk)
+        cursor = MessageHistoryPagination().encode_cursor(anchor.timestamp, anchor.pk)
+        ids, _ = self.page(since=cursor)
+        self.assertEqual(ids, [message.pk for message in self.messages[3:5]])
+
+    @skipUnless(connection.vendor == 'postgresql', 'план запроса PostgreSQL')
+    def test_cursor_is_row_value_comparison(self):
+        paginator = MessageHistoryPagination()
+        queryset = self.conversation.messages.filter(
+            paginator.get_cursor_filter('<', timezone.now(), 10)
+        ).order_by('-timestamp', '-id')
+        self.assertIn('("messaging_message"."timestamp", "messaging_message"."id") < (', str(queryset.query))
+
+        with connection.cursor() as cursor:
+            # На семи строках планировщик иначе выберет seq scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            plan = queryset[:50].explain()
+        self.assertIn('message_history_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+
+class SaveMessageTests(TransactionTestCase):
+    """
+    Сообщение, превью диалога и счетчики непрочитанных пишутся одной транзакцией.
+    TransactionTestCase: database_sync_to_async закрывает соединение, открытое тестовой транзакцией.
+    """
+
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(username='sender', password='pass', user_type='startup')
+        self.receiver = CustomUser.objects.create_user(username='receiver', password='pass', user_type='investor')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.sender, self.receiver)
+
+    def counters(self, user):
+        count = ConversationUnread.objects.filter(user=user, conversation=self.conversation).values_list(
+            'count', flat=True
+        ).first()
+        total = UnreadTotal.objects.filter(user=user).values_list('total', flat=True).first()
+        return count, total
+
+    async def test_counters_are_incremented_with_message(self):
+        message = await persistence.save_message(self.conversation.id, self.sender.id, 'Привет', [self.receiver.id])
+        await persistence.save_message(self.conversation.id, self.sender.id, 'Еще раз')
+
+        conversation = await Conversation.objects.aget(pk=self.conversation.pk)
+        self.assertEqual(conversation.last_message, 'Еще раз')
+        self.assertEqual(await Message.objects.filter(conversation=self.conversation).acount(), 2)
+        self.assertEqual(message.content, 'Привет')
+
+        self.assertEqual(await self.async_counters(self.receiver), (2, 2))
+        self.assertEqual(await self.async_counters(self.sender), (None, None))
+
+    async def async_counters(self, user):
+        return await database_sync_to_async(self.counters)(user)
+
+    def test_failed_increment_rolls_back_message(self):
+        with mock.patch.object(persistence.unread, 'increment', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                persistence.write_message(self.conversation.id, self.sender.id, 'Привет')
+        self.assertFalse(Message.objects.exists())
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, '')
+
+    def test_group_commit_increments_per_sender(self):
+        persistence.write_batch([
+            Message(conversation=self.conversation, sender=self.sender, content=str(index)) for index in range(3)
+        ] + [Message(conversation=self.conversation, sender=self.receiver, content='Ответ')])
+
+        self.assertEqual(self.counters(self.receiver), (3, 3))
+        self.assertEqual(self.counters(self.sender), (1, 1))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, 'Ответ')
+
+    async def test_failed_batch_only_fails_bad_message(self):
+        writer = persistence.GroupCommitWriter(window=0.01)
+        good, bad = await asyncio.gather(
+            writer.submit(self.conversation.id, self.sender.id, 'Привет'),
+            writer.submit(self.conversation.id + 1000, self.sender.id, 'В никуда'),
+            return_exceptions=True
+        )
+
+        self.assertEqual(good.content, 'Привет')
+        self.assertIsNotNone(good.pk)
+        self.assertIsInstance(bad, IntegrityError)
+        self.assertEqual(
+            [message.content async for message in Message.objects.all()], ['Привет']
+        )
+        self.assertEqual(await self.async_counters(self.receiver), (1, 1))
+
+
+class InboxTests(TestCase):
+    """Инбокс: собеседник, превью последнего сообщения и непрочитанные — фиксированным числом запросов."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='me', password='pass', user_type='startup')
+        self.others = []
+
+    def conversation(self, messages=()):
+        other = CustomUser.objects.create_user(
+            username=f'other{len(self.others)}', password='pass', user_type='investor'
+        )
+        self.others.append(other)
+        UserProfile.objects.create(user=other, avatar=f'avatars/{other.username}.png')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.user, other)
+        for sender, content in messages:
+            sender = self.user if sender == 'me' else other
+            persistence.write_message(conversation.id, sender.id, content)
+        return conversation
+
+    def load(self):
+        conversations = inbox.attach_participants(list(inbox.inbox_queryset(self.user)))
+        return conversations, [UserSummarySerializer(c.other_user).data for c in conversations]
+
+    def test_rows(self):
+        empty = self.conversation()
+        older = self.conversation([('other', 'Привет'), ('other', 'Есть минута?')])
+        latest = self.conversation([('other', 'Добрый день'), ('me', 'Здравствуйте')])
+        foreign = Conversation.objects.create()
+        foreign.participants.add(*self.others[:2])
+
+        conversations, cards = self.load()
+        # Сначала свежие, диалоги без сообщений — в конце
+        self.assertEqual([c.pk for c in conversations], [latest.pk, older.pk, empty.pk])
+        self.assertEqual([c.other_user for c in conversations], [self.others[2], self.others[1], self.others[0]])
+        self.assertEqual(
+            [(c.last_message, c.last_message_sender_id) for c in conversations],
+            [('Здравствуйте', self.user.pk), ('Есть минута?', self.others[1].pk), ('', None)]
+        )
+        self.assertEqual([c.unread_for_user for c in conversations], [1, 2, 0])
+        self.assertEqual(cards[0]['username'], 'other2')
+        self.assertTrue(cards[0]['avatar'].endswith('avatars/other2.png'))
+
+    def test_missing_profile_has_no_avatar(self):
+        self.conversation([('other', 'Привет')])
+        UserProfile.objects.all().delete()
+        _, cards = self.load()
+        self.assertIsNone(cards[0]['avatar'])
+
+    def test_query_count_is_constant(self):
+        self.conversation([('other', 'Привет')])
+        with self.assertNumQueries(2):
+            self.load()
+
+        for index in range(10):
+            self.conversation([('other', f'Сообщение {index}'), ('me', 'Ответ')])
+        with self.assertNumQueries(2):
+            conversations, _ = self.load()
+        self.assertEqual(len(conversations), 11)
+
+
+class DeliveryTests(TestCase):
+    """Сообщение сериализуется один раз, тот же кадр получают все участники."""
+
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(username='sender', password='pass', user_type='startup')
+        UserProfile.objects.create(user=self.sender, avatar='avatars/sender.png')
+        self.recipients = [
+            CustomUser.objects.create_user(username=f'recipient{index}', password='pass', user_type='investor')
+            for index in range(3)
+        ]
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.sender, *self.recipients)
+        self.message = Message.objects.create(conversation=self.conversation, sender=self.sender, content='Привет')
+        MessageAttachment.objects.create(message=self.message, file='message_attachments/deck.pdf', file_name='deck.pdf')
+
+    def subscribe(self, user):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f'user_{user.pk}', channel)
+        return channel
+
+    def test_serialized_once_per_message(self):
+        # Сообщение, отправитель с профилем, вложения — число запросов не зависит от получателей
+        with self.assertNumQueries(2):
+            data = delivery.serialize_message(self.message)
+        self.assertEqual(data['content'], 'Привет')
+        self.assertEqual(data['sender_info']['username'], 'sender')
+        self.assertTrue(data['sender_info']['avatar'].endswith('avatars/sender.png'))
+        self.assertEqual([item['file_name'] for item in data['attachments']], ['deck.pdf'])
+
+    def test_deliver_fans_out_one_frame(self):
+        channels = [self.subscribe(user) for user in self.recipients]
+
+        with mock.patch.object(delivery, 'serialize_message', wraps=delivery.serialize_message) as serialize:
+            data = delivery.deliver(self.message)
+        serialize.assert_called_once()
+
+        layer = get_channel_layer()
+        frame = delivery.encode_frame(data, self.conversation.pk)
+        for channel in channels:
+            event = async_to_sync(layer.receive)(channel)
+            self.assertEqual(event, delivery.chat_event(frame, self.conversation.pk))
+        # Отправителю кадр по группе не рассылается
+        self.assertEqual(
+            sorted(delivery.recipient_ids(self.conversation.pk, self.sender.pk)),
+            [user.pk for user in self.recipients]
+        )
+
+
+class BenchmarkDeliveryTests(TransactionTestCase):
+    """Команда замера работает на настоящем сообщении и убирает его за собой."""
+
+    def test_runs_and_cleans_up(self):
+        out = StringIO()
+        call_command('benchmark_delivery', sizes='1,3', rounds=2, content_size=10, stdout=out)
+        self.assertEqual(len(out.getvalue().strip().splitlines()), 3)
+        self.assertFalse(Message.objects.exists())
+        self.assertFalse(CustomUser.objects.exists())
+
+
+class LoadtestClientTests(TransactionTestCase):
+    """Клиент нагрузочного прогона работает без channels.testing (и daphne)."""
+
+    def test_clients_exchange_message(self):
+        from startup_platform.asgi import application
+        from .management.commands.loadtest_chat import Client, Command
+
+        command = Command()
+        fixtures = command.create_fixtures(2, 2)
+
+        async def exchange():
+            sender, receiver = [Client(application, *fixture) for fixture in fixtures]
+            await asyncio.gather(sender.connect(), receiver.connect())
+            await sender.send({
+                'type': 'chat_message', 'conversation_id': sender.conversation_id, 'content': 'hello'
+            })
+            frame = json.loads(await receiver.receive())
+            while frame['type'] != 'chat_message':
+                frame = json.loads(await receiver.receive())
+            await asyncio.gather(sender.disconnect(), receiver.disconnect())
+            return frame
+
+        frame = async_to_sync(exchange)()
+        self.assertEqual(frame['message']['content'], 'hello')
+        self.assertEqual(Message.objects.get().content, 'hello')
+
+
+class TypingStateTests(SimpleTestCase):
+    """Наружу уходят только переходы start/stop в ожидаемые сроки."""
+
+    def run_typing(self, scenario, timeout=0.3, grace=0.05):
+        events = []
+
+        async def emit(conversation_id, is_typing):
+            events.append((round(loop.time() - started, 2), is_typing))
+
+        async def run():
+            nonlocal loop, started
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await scenario(TypingState(emit, timeout=timeout, grace=grace))
+
+        loop = started = None
+        async_to_sync(run)()
+        return events
+
+    def assertEvents(self, events, expected, delta=0.04):
+        self.assertEqual([is_typing for _, is_typing in events], [is_typing for _, is_typing in expected])
+        for (moment, _), (expected_moment, _) in zip(events, expected):
+            self.assertAlmostEqual(moment, expected_moment, delta=delta)
+
+    def test_typing_times_out(self):
+        async def scenario(typing):
+            await typing.update(1, True)
+            await asyncio.sleep(0.4)
+
+        self.assertEvents(self.run_typing(scenario), [(0, True), (0.3, False)])
+
+    def test_explicit_stop_fires_after_grace_not_timeout(self):
+        async def scenario(typing):
+            await typing.update(1, True)
+            await asyncio.sleep(0.1)
+            await typing.update(1, False)
+            await asyncio.sleep(0.3)
+
+        self.assertEvents(self.run_typing(scenario), [(0, True), (0.15, False)])
+
+    def test_repeated_start_extends_without_new_events(self):
+        async def scenario(typing):
+            for _ in range(4):
+                await typing.update(1, True)
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(0.4)
+
+        # Последнее нажатие в 0.3 — индикатор гаснет через timeout после него
+        self.assertEvents(self.run_typing(scenario), [(0, True), (0.6, False)])
+
+    def test_stop_then_resume_within_grace_sends_nothing(self):
+        async def scenario(typing):
+            await typing.update(1, True)
+            await typing.update(1, False)
+            await asyncio.sleep(0.02)
+            await typing.update(1, True)
+            await asyncio.sleep(0.1)
+            await typing.stop(1)
+
+        self.assertEvents(self.run_typing(scenario), [(0, True), (0.12, False)])
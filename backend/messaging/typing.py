@@ -0,0 +1,66 @@
+"""
+Состояние «печатает» для одного соединения.
+
+Клиент шлет typing на каждое нажатие клавиши; наружу уходят только
+переходы: start при начале набора и stop при его окончании. Остановка
+откладывается на STOP_GRACE секунд — если пользователь продолжил печатать,
+пара stop/start не отправляется вовсе. Без событий от клиента набор сам
+завершается через TYPING_TIMEOUT секунд (закрытая вкладка, потерянный stop).
+Так на пользователя и диалог приходится не больше одной пары start/stop
+за STOP_GRACE, сколько бы событий ни слал клиент.
+"""
+
+import asyncio
+import time
+
+
+TYPING_TIMEOUT = 6
+STOP_GRACE = 1.5
+
+
+class TypingState:
+    def __init__(self, emit, timeout=TYPING_TIMEOUT, grace=STOP_GRACE):
+        self._emit = emit
+        self.timeout = timeout
+        self.grace = grace
+        self.deadlines = {}   # conversation_id -> когда погасить индикатор
+        self._watchers = {}
+
+    async def update(self, conversation_id, is_typing):
+        # Нажатие клавиши стоит одной записи в словарь; задача-наблюдатель одна на набор
+        now = time.monotonic()
+        if is_typing:
+            self.deadlines[conversation_id] = now + self.timeout
+            if conversation_id not in self._watchers:
+                self._watchers[conversation_id] = asyncio.ensure_future(self._watch(conversation_id))
+                await self._emit(conversation_id, True)
+        elif conversation_id in self._watchers and now + self.grace < self.deadlines[conversation_id]:
+            # Наблюдатель спит до старого срока: переносим его на более ранний
+            self.deadlines[conversation_id] = now + self.grace
+            self._watchers[conversation_id].cancel()
+            self._watchers[conversation_id] = asyncio.ensure_future(self._watch(conversation_id))
+
+    async def stop(self, conversation_id):
+        """Немедленная остановка (например, сообщение уже отправлено)."""
+        watcher = self._watchers.pop(conversation_id, None)
+        if watcher is None:
+            return
+        watcher.cancel()
+        self.deadlines.pop(conversation_id, None)
+        await self._emit(conversation_id, False)
+
+    async def stop_all(self):
+        for conversation_id in list(self._watchers):
+            await self.stop(conversation_id)
+
+    async def _watch(self, conversation_id):
+        # Продление срока не будит наблюдателя — он досыпает и проверяет снова;
+        # сокращение срока перезапускает наблюдателя в update()
+        while True:
+            delay = self.deadlines[conversation_id] - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        self._watchers.pop(conversation_id, None)
+        self.deadlines.pop(conversation_id, None)
+        await self._emit(conversation_id, False)
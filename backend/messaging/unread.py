@@ -0,0 +1,135 @@
+"""
+Счетчики непрочитанных сообщений.
+
+Вместо перезаписи JSON-словаря Conversation.unread_count каждое изменение —
+атомарный UPDATE ... SET count = count + 1 по строкам (user, conversation)
+и по общей сумме пользователя. Новые значения рассылаются в группу
+user_<id> через channel layer.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import ConversationUnread, Message, UnreadTotal
+
+
+def _ensure_rows(conversation_id, user_ids):
+    ConversationUnread.objects.bulk_create(
+        [ConversationUnread(user_id=user_id, conversation_id=conversation_id) for user_id in user_ids],
+        ignore_conflicts=True
+    )
+    UnreadTotal.objects.bulk_create(
+        [UnreadTotal(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True
+    )
+
+
+def increment(conversation_id, sender_id, recipients=None, by=1):
+    """
+    Увеличивает на by счетчики всех участников диалога, кроме отправителя.
+    recipients — уже известные получатели (консьюмер держит их в памяти).
+    Вызывается в транзакции записи сообщения: счетчики фиксируются вместе с ним.
+    """
+    if recipients is None:
+        recipients = list(
+            get_user_model().objects.filter(conversations__id=conversation_id)
+            .exclude(id=sender_id)
+            .values_list('id', flat=True)
+        )
+    if not recipients:
+        return {}
+
+    with transaction.atomic():
+        _ensure_rows(conversation_id, recipients)
+        ConversationUnread.objects.filter(
+            conversation_id=conversation_id, user_id__in=recipients
+        ).update(count=F('count') + by)
+        UnreadTotal.objects.filter(user_id__in=recipients).update(total=F('total') + by)
+        counters = _read_counters(conversation_id, recipients)
+
+    transaction.on_commit(lambda: push(conversation_id, counters))
+    return counters
+
+
+def reset(conversation_id, user_id):
+    """Обнуляет счетчик пользователя в диалоге и вычитает его из общей суммы."""
+    with transaction.atomic():
+        counter = (
+            ConversationUnread.objects.select_for_update()
+            .filter(conversation_id=conversation_id, user_id=user_id)
+            .first()
+        )
+        if counter is None or counter.count == 0:
+            return
+        unread = counter.count
+        ConversationUnread.objects.filter(pk=counter.pk).update(count=0)
+        UnreadTotal.objects.filter(user_id=user_id).update(
+            total=Greatest(F('total') - unread, 0)
+        )
+        counters = _read_counters(conversation_id, [user_id])
+
+    transaction.on_commit(lambda: push(conversation_id, counters))
+
+
+def sync(conversation_id, user_id):
+    """Приводит счетчик к фактическому числу непрочитанных (после частичного прочтения)."""
+    with transaction.atomic():
+        _ensure_rows(conversation_id, [user_id])
+        counter = ConversationUnread.objects.select_for_update().get(
+            conversation_id=conversation_id, user_id=user_id
+        )
+        actual = Message.objects.filter(
+            conversation_id=conversation_id, is_read=False
+        ).exclude(sender_id=user_id).count()
+        delta = actual - counter.count
+        if delta == 0:
+            return
+        ConversationUnread.objects.filter(pk=counter.pk).update(count=actual)
+        UnreadTotal.objects.filter(user_id=user_id).update(
+            total=Greatest(F('total') + delta, 0)
+        )
+        counters = _read_counters(conversation_id, [user_id])
+
+    transaction.on_commit(lambda: push(conversation_id, counters))
+
+
+def clear(conversation_id):
+    """Обнуляет счетчики всех участников (диалог скрыт и не должен учитываться в сумме)."""
+    user_ids = ConversationUnread.objects.filter(
+        conversation_id=conversation_id, count__gt=0
+    ).values_list('user_id', flat=True)
+    for user_id in list(user_ids):
+        reset(conversation_id, user_id)
+
+
+def _read_counters(conversation_id, user_ids):
+    totals = dict(UnreadTotal.objects.filter(user_id__in=user_ids).values_list('user_id', 'total'))
+    counts = dict(
+        ConversationUnread.objects.filter(conversation_id=conversation_id, user_id__in=user_ids)
+        .values_list('user_id', 'count')
+    )
+    return {user_id: (counts.get(user_id, 0), totals.get(user_id, 0)) for user_id in user_ids}
+
+
+def get_total(user_id):
+    return UnreadTotal.objects.filter(user_id=user_id).values_list('total', flat=True).first() or 0
+
+
+def push(conversation_id, counters):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for user_id, (count, total) in counters.items():
+        async_to_sync(channel_layer.group_send)(
+            f"user_{user_id}",
+            {
+                'type': 'unread_update',
+                'conversation_id': conversation_id,
+                'count': count,
+                'total': total
+            }
+        )
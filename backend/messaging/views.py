@@ -3,9 +3,8 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
 from django.db.models import Q
+from django.db import transaction
 from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from .models import Conversation, Message, MessageAttachment
 from .serializers import (
     ConversationListSerializer, ConversationDetailSerializer,
@@ -13,21 +12,25 @@ from .serializers import (
     CreateConversationSerializer
 )
 from users.models import User
+from startup_platform.query_planner import QueryPlannerMixin
+from .pagination import MessageHistoryPagination
+from . import delivery, inbox, unread
 
 class ConversationListView(generics.ListAPIView):
     serializer_class = ConversationListSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Conversation.objects.filter(
-            participants=self.request.user,
-            is_active=True
-        ).prefetch_related('participants')
+        return inbox.inbox_queryset(self.request.user)
     
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['request'] = self.request
-        return context
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        conversations = inbox.attach_participants(list(page if page is not None else queryset))
+        serializer = self.get_serializer(conversations, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
 class ConversationDetailView(generics.RetrieveAPIView):
     serializer_class = ConversationDetailSerializer
@@ -49,9 +52,8 @@ class ConversationDetailView(generics.RetrieveAPIView):
         
         unread_messages.update(is_read=True, read_at=timezone.now())
         
-        # Обновляем счетчик непрочитанных
-        instance.unread_count[str(request.user.id)] = 0
-        instance.save()
+        # Обнуляем счетчик непрочитанных
+        unread.reset(instance.id, request.user.id)
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -119,55 +121,46 @@ class SendMessageView(APIView):
             message_data['conversation'] = conversation
             message_data['sender'] = request.user
             
-            message = Message.objects.create(**message_data)
-            
-            # Обновляем последнее сообщение в диалоге
-            conversation.last_message = message.content
-            conversation.last_message_time = message.timestamp
-            conversation.updated_at = timezone.now()
+            with transaction.atomic():
+                message = Message.objects.create(**message_data)
+                
+                # Обновляем последнее сообщение в диалоге
+                conversation.last_message = message.content
+                conversation.last_message_time = message.timestamp
+                conversation.updated_at = timezone.now()
+                conversation.save(update_fields=['last_message', 'last_message_time', 'updated_at'])
+                
+                # Счетчики непрочитанных — в той же транзакции, новые значения уходят по WebSocket после фиксации
+                unread.increment(conversation.id, request.user.id)
             
-            # Обновляем счетчики непрочитанных
-            for participant in conversation.participants.exclude(id=request.user.id):
-                participant_id = str(participant.id)
-                conversation.unread_count[participant_id] = conversation.unread_count.get(participant_id, 0) + 1
+            # Отправляем уведомление через WebSocket; та же сериализация уходит в ответ
+            data = delivery.deliver(message)
             
-            conversation.save()
-            
-            # Отправляем уведомление через WebSocket
-            self.send_websocket_notification(conversation, message)
-            
-            return Response(
-                MessageSerializer(message).data,
-                status=status.HTTP_201_CREATED
-            )
+            return Response(data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def send_websocket_notification(self, conversation, message):
-        channel_layer = get_channel_layer()
-        
-        for participant in conversation.participants.exclude(id=message.sender.id):
-            async_to_sync(channel_layer.group_send)(
-                f"user_{participant.id}",
-                {
-                    'type': 'chat_message',
-                    'message': MessageSerializer(message).data,
-                    'conversation_id': conversation.id
-                }
-            )
 
-class MessageListView(generics.ListAPIView):
+class MessageListView(QueryPlannerMixin, generics.ListAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageHistoryPagination
     
     def get_queryset(self):
-        conversation_id = self.kwargs['conversation_id']
-        return Message.objects.filter(
-            conversation_id=conversation_id,
-            conversation__participants=self.request.user
-        ).order_by('timestamp')
+        # Доступ проверяется один раз в list(), сама выборка идет только
+        # по индексу (conversation_id, timestamp, id) без JOIN участников
+        return Message.objects.filter(conversation_id=self.kwargs['conversation_id'])
     
     def list(self, request, *args, **kwargs):
+        is_participant = Conversation.objects.filter(
+            id=self.kwargs['conversation_id'],
+            participants=request.user
+        ).exists()
+        if not is_participant:
+            return Response(
+                {'error': 'Диалог не найден'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
         response = super().list(request, *args, **kwargs)
         
         # Помечаем сообщения как прочитанные
@@ -178,6 +171,7 @@ class MessageListView(generics.ListAPIView):
         ).exclude(sender=request.user)
         
         unread_messages.update(is_read=True, read_at=timezone.now())
+        unread.reset(conversation_id, request.user.id)
         
         return response
 
@@ -198,19 +192,11 @@ class DeleteConversationView(APIView):
         
         conversation.is_active = False
         conversation.save()
+        unread.clear(conversation.id)
         
         return Response({'detail': 'Диалог удален'})
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def unread_messages_count(request):
-    conversations = Conversation.objects.filter(
-        participants=request.user,
-        is_active=True
-    )
-    
-    total_unread = 0
-    for conversation in conversations:
-        total_unread += conversation.unread_count.get(str(request.user.id), 0)
-    
-    return Response({'unread_count': total_unread})
\ No newline at end of file
+    return Response({'unread_count': unread.get_total(request.user.id)})
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from users.models import CustomUser
 from startups.models import Startup
 from investors.models import Investor
@@ -23,3 +24,86 @@ class Complaint(models.Model):
 
     def __str__(self):
         return f"Complaint by {self.reporter.username}"
+
+
+class ModerationReport(models.Model):
+    REPORT_TYPES = [
+        ('fraud', 'Fraud'),
+        ('spam', 'Spam'),
+        ('inappropriate', 'Inappropriate Content'),
+        ('other', 'Other'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+        ('resolved', 'Resolved'),
+    ]
+    reporter = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='moderation_reports')
+    reported_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='reports_received')
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    resolution = models.TextField(blank=True)
+    moderator = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_reports'
+    )
+    # Аренда в очереди модерации (moderation.queue): кто взял жалобу и до какого времени
+    claimed_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_reports'
+    )
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Очередь модерации: только необработанные, в порядке поступления
+            models.Index(
+                fields=['created_at', 'id'], condition=Q(status='pending'),
+                name='moderation_report_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Report on {self.reported_user.username} ({self.status})"
+
+
+class VerificationRequest(models.Model):
+    VERIFICATION_TYPES = [
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+        ('government', 'Government ID'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    ]
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='verification_requests')
+    verification_type = models.CharField(max_length=20, choices=VERIFICATION_TYPES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    comments = models.TextField(blank=True)
+    moderator = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='processed_verifications'
+    )
+    claimed_by = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_verifications'
+    )
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Время решения модератора; updated_at меняют и правки, не относящиеся к обработке
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'], condition=Q(status='pending'),
+                name='verification_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.verification_type} ({self.status})"
@@ -0,0 +1,127 @@
+"""
+Очередь модерации: жалобы и запросы на верификацию.
+
+Модератор забирает пачку необработанных элементов (claim): строки
+выбираются по частичному индексу status='pending' с SELECT ... FOR UPDATE
+SKIP LOCKED и получают аренду claimed_by/claimed_until, поэтому два
+модератора никогда не получают один и тот же элемент. Аренда истекает через
+CLAIM_LEASE секунд — элементы, брошенные модератором, возвращаются в очередь
+без отдельной чистки. Обработка элемента (take) блокирует строку до конца
+транзакции и снимает аренду; элемент в аренде у другого модератора
+обработать нельзя (ClaimConflict, в API — 409).
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+
+
+CLAIM_LEASE = getattr(settings, 'MODERATION_CLAIM_LEASE', 300)
+CLAIM_LIMIT = 10
+MAX_CLAIM_LIMIT = 50
+LATENCY_WINDOW = timezone.timedelta(days=1)
+
+
+class ClaimConflict(Exception):
+    """Элемент в действующей аренде у другого модератора."""
+
+
+def get_queues():
+    from .models import ModerationReport, VerificationRequest
+
+    return {'reports': ModerationReport, 'verifications': VerificationRequest}
+
+
+def _lease_active(now):
+    return Q(claimed_until__gte=now)
+
+
+def claim(model, moderator, limit=CLAIM_LIMIT):
+    """
+    Элементы в аренде у модератора: ранее взятые и еще не истекшие плюс новые
+    из очереди до limit. Повторный вызов продлевает аренду уже взятых.
+    """
+    now = timezone.now()
+    lease_until = now + timezone.timedelta(seconds=CLAIM_LEASE)
+    with transaction.atomic():
+        held = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(_lease_active(now), status='pending', claimed_by=moderator)
+            .values_list('id', flat=True)
+        )
+        fresh = []
+        if len(held) < limit:
+            fresh = list(
+                model.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .exclude(_lease_active(now))
+                .order_by('created_at', 'id')
+                .values_list('id', flat=True)[:limit - len(held)]
+            )
+        ids = held + fresh
+        model.objects.filter(id__in=ids).update(claimed_by=moderator, claimed_until=lease_until)
+    return model.objects.filter(id__in=ids).order_by('created_at', 'id')
+
+
+def release(model, moderator, ids=None):
+    """Возвращает элементы модератора в очередь; без ids — все его элементы."""
+    queryset = model.objects.filter(claimed_by=moderator, status='pending')
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    return queryset.update(claimed_by=None, claimed_until=None)
+
+
+def held_by_other(item, moderator):
+    """Элемент в действующей аренде у другого модератора."""
+    return (
+        item.claimed_by_id is not None and item.claimed_by_id != moderator.id
+        and item.claimed_until is not None and item.claimed_until >= timezone.now()
+    )
+
+
+def take(model, pk, moderator):
+    """
+    Блокирует элемент для обработки до конца транзакции: два модератора не
+    решат его одновременно. DoesNotExist — элемента нет, ClaimConflict — его
+    держит другой модератор.
+    """
+    item = model.objects.select_for_update(of=('self',)).get(pk=pk)
+    if held_by_other(item, moderator):
+        raise ClaimConflict
+    return item
+
+
+def finish(item):
+    item.claimed_by = None
+    item.claimed_until = None
+
+
+def _metrics(model, resolved_field):
+    now = timezone.now()
+    pending = model.objects.filter(status='pending').aggregate(
+        depth=Count('id'),
+        claimed=Count('id', filter=_lease_active(now)),
+        oldest=Min('created_at')
+    )
+    latency = ExpressionWrapper(F(resolved_field) - F('created_at'), output_field=DurationField())
+    average = (
+        model.objects.exclude(status='pending')
+        .filter(**{f'{resolved_field}__gte': now - LATENCY_WINDOW})
+        .aggregate(value=Avg(latency))['value']
+    )
+    return {
+        'depth': pending['depth'],
+        'claimed': pending['claimed'],
+        'oldest_pending_seconds': int((now - pending['oldest']).total_seconds()) if pending['oldest'] else 0,
+        'avg_latency_seconds': int(average.total_seconds()) if average else None
+    }
+
+
+def metrics():
+    """Глубина очереди, элементы в аренде, возраст старейшего и среднее время обработки за сутки."""
+    queues = get_queues()
+    return {
+        'reports': _metrics(queues['reports'], 'resolved_at'),
+        'verifications': _metrics(queues['verifications'], 'processed_at')
+    }
@@ -12,7 +12,7 @@ class ModerationReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = ModerationReport
         fields = '__all__'
-        read_only_fields = ('reporter', 'created_at', 'updated_at', 'resolved_at')
+        read_only_fields = ('reporter', 'created_at', 'updated_at', 'resolved_at', 'claimed_by', 'claimed_until')
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -36,7 +36,7 @@ class VerificationRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = VerificationRequest
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'updated_at')
+        read_only_fields = ('user', 'created_at', 'updated_at', 'processed_at', 'claimed_by', 'claimed_until')
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -50,4 +50,7 @@ class ResolveReportSerializer(serializers.Serializer):
 
 class ProcessVerificationSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=['approved', 'rejected'])
-    comments = serializers.CharField(required=False, allow_blank=True)
\ No newline at end of file
+    comments = serializers.CharField(required=False, allow_blank=True)
+
+class ReleaseQueueSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
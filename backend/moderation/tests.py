@@ -1,3 +1,136 @@
-from django.test import TestCase
+import threading
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from users.models import CustomUser
+from . import queue
+from .models import ModerationReport, VerificationRequest
+
+
+class QueueTestMixin:
+    def make_users(self):
+        self.reporter = CustomUser.objects.create_user(username='reporter', password='pass', user_type='startup')
+        self.first = CustomUser.objects.create_user(username='first', password='pass', user_type='moderator')
+        self.second = CustomUser.objects.create_user(username='second', password='pass', user_type='moderator')
+
+    def report(self, **values):
+        return ModerationReport.objects.create(
+            reporter=self.reporter, reported_user=self.reporter, report_type='spam', description='', **values
+        )
+
+    def ids(self, items):
+        return [item.id for item in items]
+
+
+class ClaimTests(QueueTestMixin, TestCase):
+    def setUp(self):
+        self.make_users()
+        self.reports = [self.report() for _ in range(5)]
+
+    def test_moderators_get_disjoint_items_in_order(self):
+        first = self.ids(queue.claim(ModerationReport, self.first, limit=3))
+        second = self.ids(queue.claim(ModerationReport, self.second, limit=3))
+
+        self.assertEqual(first, self.ids(self.reports[:3]))
+        self.assertEqual(second, self.ids(self.reports[3:]))
+
+    def test_repeated_claim_extends_held_items(self):
+        held = self.ids(queue.claim(ModerationReport, self.first, limit=2))
+        ModerationReport.objects.filter(id__in=held).update(
+            claimed_until=timezone.now() + timezone.timedelta(seconds=5)
+        )
+
+        again = queue.claim(ModerationReport, self.first, limit=2)
+        self.assertEqual(self.ids(again), held)
+        extended = timezone.now() + timezone.timedelta(seconds=queue.CLAIM_LEASE - 5)
+        for item in again:
+            self.assertGreater(item.claimed_until, extended)
+
+    def test_expired_lease_returns_item_to_queue(self):
+        held = self.ids(queue.claim(ModerationReport, self.first, limit=2))
+        expired = timezone.now() - timezone.timedelta(seconds=1)
+        ModerationReport.objects.filter(id__in=held).update(claimed_until=expired)
+
+        second = self.ids(queue.claim(ModerationReport, self.second, limit=2))
+        self.assertEqual(second, held)
+        self.assertFalse(ModerationReport.objects.filter(claimed_by=self.first).exists())
+
+    def test_resolved_items_are_not_claimed(self):
+        ModerationReport.objects.filter(id=self.reports[0].id).update(status='resolved')
+        self.assertNotIn(self.reports[0].id, self.ids(queue.claim(ModerationReport, self.first, limit=5)))
+
+    def test_release(self):
+        held = self.ids(queue.claim(ModerationReport, self.first, limit=3))
+        self.assertEqual(queue.release(ModerationReport, self.second), 0)
+        self.assertEqual(queue.release(ModerationReport, self.first, held[:1]), 1)
+        self.assertEqual(queue.release(ModerationReport, self.first), 2)
+        self.assertFalse(ModerationReport.objects.filter(claimed_by__isnull=False).exists())
+
+
+class TakeTests(QueueTestMixin, TestCase):
+    """Обработка элемента: 409 (ClaimConflict), пока его держит другой модератор."""
+
+    def setUp(self):
+        self.make_users()
+        self.item = self.report()
+
+    def test_held_by_other_moderator_conflicts(self):
+        queue.claim(ModerationReport, self.first)
+        with self.assertRaises(queue.ClaimConflict):
+            queue.take(ModerationReport, self.item.id, self.second)
+        self.assertEqual(queue.take(ModerationReport, self.item.id, self.first), self.item)
+
+    def test_expired_or_unclaimed_item_can_be_taken(self):
+        self.assertEqual(queue.take(ModerationReport, self.item.id, self.second), self.item)
+        queue.claim(ModerationReport, self.first)
+        expired = timezone.now() - timezone.timedelta(seconds=1)
+        ModerationReport.objects.filter(id=self.item.id).update(claimed_until=expired)
+        self.assertEqual(queue.take(ModerationReport, self.item.id, self.second), self.item)
+
+    def test_missing_item(self):
+        with self.assertRaises(ModerationReport.DoesNotExist):
+            queue.take(ModerationReport, self.item.id + 1, self.first)
+
+    def test_verification_latency_uses_processed_at(self):
+        now = timezone.now()
+        request = VerificationRequest.objects.create(user=self.reporter, verification_type='email')
+        VerificationRequest.objects.filter(id=request.id).update(
+            status='approved', created_at=now - timezone.timedelta(minutes=10), processed_at=now
+        )
+        # Поздняя правка не меняет время обработки
+        VerificationRequest.objects.filter(id=request.id).update(updated_at=now + timezone.timedelta(hours=1))
+
+        self.assertEqual(queue.metrics()['verifications']['avg_latency_seconds'], 600)
+
+
+class SkipLockedTests(QueueTestMixin, TransactionTestCase):
+    """Строку, заблокированную другой транзакцией, claim пропускает, а не ждет."""
+
+    @skipUnless(connection.vendor == 'postgresql', 'SELECT ... FOR UPDATE SKIP LOCKED')
+    def test_locked_rows_are_skipped(self):
+        self.make_users()
+        reports = [self.report() for _ in range(3)]
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_first():
+            try:
+                with transaction.atomic():
+                    ModerationReport.objects.select_for_update().get(id=reports[0].id)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_first)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            claimed = self.ids(queue.claim(ModerationReport, self.first, limit=3))
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(claimed, self.ids(reports[1:]))
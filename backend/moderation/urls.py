@@ -8,6 +8,8 @@ urlpatterns = [
     path('verifications/', views.VerificationRequestListView.as_view(), name='verification-list'),
     path('verifications/create/', views.VerificationRequestCreateView.as_view(), name='verification-create'),
     path('verifications/<int:request_id>/process/', views.ProcessVerificationView.as_view(), name='verification-process'),
+    path('queue/<str:queue_name>/claim/', views.ClaimQueueView.as_view(), name='queue-claim'),
+    path('queue/<str:queue_name>/release/', views.ReleaseQueueView.as_view(), name='queue-release'),
     path('bans/', views.UserBanListView.as_view(), name='ban-list'),
     path('bans/<int:user_id>/unban/', views.UnbanUserView.as_view(), name='user-unban'),
     path('stats/', views.moderation_stats, name='moderation-stats'),
@@ -2,15 +2,18 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
+from django.db import transaction
 from django.db.models import Count, Q
 from django.utils import timezone
 from .models import ModerationReport, UserBan, VerificationRequest
 from .serializers import (
     ModerationReportSerializer, UserBanSerializer,
     VerificationRequestSerializer, ResolveReportSerializer,
-    ProcessVerificationSerializer
+    ProcessVerificationSerializer, ReleaseQueueSerializer
 )
 from users.models import User
+from startup_platform import stats
+from . import queue
 
 class ModerationReportCreateView(generics.CreateAPIView):
     serializer_class = ModerationReportSerializer
@@ -27,7 +30,11 @@ class ModerationReportListView(generics.ListAPIView):
         user = self.request.user
         
         if user.user_type == 'moderator':
-            return ModerationReport.objects.all().order_by('-created_at')
+            queryset = ModerationReport.objects.select_related('reporter', 'reported_user', 'moderator')
+            status_value = self.request.query_params.get('status')
+            if status_value:
+                queryset = queryset.filter(status=status_value)
+            return queryset.order_by('-created_at')
         
         # Обычные пользователи видят только свои жалобы
         return ModerationReport.objects.filter(reporter=user).order_by('-created_at')
@@ -42,16 +49,26 @@ class ResolveReportView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        try:
-            report = ModerationReport.objects.get(id=report_id)
-        except ModerationReport.DoesNotExist:
-            return Response(
-                {'error': 'Жалоба не найдена'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
         serializer = ResolveReportSerializer(data=request.data)
-        if serializer.is_valid():
+        
+        # Строка заблокирована до конца транзакции — параллельное решение ждет и видит результат
+        with transaction.atomic():
+            try:
+                report = queue.take(ModerationReport, report_id, request.user)
+            except ModerationReport.DoesNotExist:
+                return Response(
+                    {'error': 'Жалоба не найдена'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            except queue.ClaimConflict:
+                return Response(
+                    {'error': 'Жалобу обрабатывает другой модератор'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
             status_value = serializer.validated_data['status']
             resolution = serializer.validated_data['resolution']
             
@@ -59,15 +76,14 @@ class ResolveReportView(APIView):
             report.resolution = resolution
             report.moderator = request.user
             report.resolved_at = timezone.now()
+            queue.finish(report)
             report.save()
             
             # Если жалоба подтверждена, проверяем是否需要 банить пользователя
             if status_value == 'approved':
                 self.check_user_ban(report.reported_user)
-            
-            return Response(ModerationReportSerializer(report).data)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ModerationReportSerializer(report).data)
     
     def check_user_ban(self, user):
         # Проверяем количество подтвержденных жалоб
@@ -111,7 +127,11 @@ class VerificationRequestListView(generics.ListAPIView):
         user = self.request.user
         
         if user.user_type == 'moderator':
-            return VerificationRequest.objects.all().order_by('-created_at')
+            queryset = VerificationRequest.objects.select_related('user', 'moderator')
+            status_value = self.request.query_params.get('status')
+            if status_value:
+                queryset = queryset.filter(status=status_value)
+            return queryset.order_by('-created_at')
         
         # Обычные пользователи видят только свои запросы
         return VerificationRequest.objects.filter(user=user).order_by('-created_at')
@@ -126,22 +146,33 @@ class ProcessVerificationView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        try:
-            verification_request = VerificationRequest.objects.get(id=request_id)
-        except VerificationRequest.DoesNotExist:
-            return Response(
-                {'error': 'Запрос на верификацию не найден'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
         serializer = ProcessVerificationSerializer(data=request.data)
-        if serializer.is_valid():
+        
+        with transaction.atomic():
+            try:
+                verification_request = queue.take(VerificationRequest, request_id, request.user)
+            except VerificationRequest.DoesNotExist:
+                return Response(
+                    {'error': 'Запрос на верификацию не найден'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            except queue.ClaimConflict:
+                return Response(
+                    {'error': 'Запрос обрабатывает другой модератор'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
             status_value = serializer.validated_data['status']
             comments = serializer.validated_data.get('comments', '')
             
             verification_request.status = status_value
             verification_request.comments = comments
             verification_request.moderator = request.user
+            verification_request.processed_at = timezone.now()
+            queue.finish(verification_request)
             verification_request.save()
             
             # Обновляем статус пользователя
@@ -150,10 +181,62 @@ class ProcessVerificationView(APIView):
                 user.is_verified = True
                 user.verification_level = verification_request.verification_type
                 user.save()
-            
-            return Response(VerificationRequestSerializer(verification_request).data)
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(VerificationRequestSerializer(verification_request).data)
+
+class ClaimQueueView(APIView):
+    """Выдает модератору пачку элементов очереди в аренду (POST {'limit': N})."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_classes = {
+        'reports': ModerationReportSerializer,
+        'verifications': VerificationRequestSerializer
+    }
+    
+    def post(self, request, queue_name):
+        if request.user.user_type != 'moderator':
+            return Response(
+                {'error': 'Только модераторы могут брать элементы очереди'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        model = queue.get_queues().get(queue_name)
+        if model is None:
+            return Response({'error': 'Очередь не найдена'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            limit = min(int(request.data.get('limit', queue.CLAIM_LIMIT)), queue.MAX_CLAIM_LIMIT)
+        except (TypeError, ValueError):
+            return Response({'error': 'limit должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = queue.claim(model, request.user, max(limit, 1))
+        if queue_name == 'reports':
+            items = items.select_related('reporter', 'reported_user', 'moderator')
+        else:
+            items = items.select_related('user', 'moderator')
+        serializer = self.serializer_classes[queue_name](items, many=True)
+        return Response({'lease_seconds': queue.CLAIM_LEASE, 'items': serializer.data})
+
+class ReleaseQueueView(APIView):
+    """Возвращает взятые элементы в очередь (POST {'ids': [...]}, без ids — все)."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, queue_name):
+        if request.user.user_type != 'moderator':
+            return Response(
+                {'error': 'Только модераторы могут возвращать элементы очереди'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        model = queue.get_queues().get(queue_name)
+        if model is None:
+            return Response({'error': 'Очередь не найдена'}, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = ReleaseQueueSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        released = queue.release(model, request.user, serializer.validated_data.get('ids'))
+        return Response({'released': released})
 
 class UserBanListView(generics.ListAPIView):
     serializer_class = UserBanSerializer
@@ -197,17 +280,4 @@ def moderation_stats(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    pending_reports = ModerationReport.objects.filter(status='pending').count()
-    pending_verifications = VerificationRequest.objects.filter(status='pending').count()
-    active_bans = UserBan.objects.filter(is_active=True).count()
-    
-    reports_by_type = ModerationReport.objects.values('report_type').annotate(
-        count=Count('id')
-    )
-    
-    return Response({
-        'pending_reports': pending_reports,
-        'pending_verifications': pending_verifications,
-        'active_bans': active_bans,
-        'reports_by_type': list(reports_by_type)
-    })
\ No newline at end of file
+    return Response(stats.get_moderation_stats())
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+Служебные уведомления пользователям через слой каналов.
+
+Кадр {'type': 'notification', ...} уходит в группу user_<id>, откуда его
+отправляет в сокет ChatConsumer.notification. Модуль не зависит от
+сериализаторов приложений, поэтому его можно импортировать из сигналов.
+"""
+
+import asyncio
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from rest_framework.renderers import JSONRenderer
+
+
+def notify(payloads):
+    """{user_id: данные} — по кадру каждому пользователю, рассылка параллельная."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not payloads:
+        return
+
+    async def send_all():
+        await asyncio.gather(*(
+            channel_layer.group_send(f"user_{user_id}", {
+                'type': 'notification',
+                'frame': JSONRenderer().render({'type': 'notification', **data}).decode('utf-8')
+            })
+            for user_id, data in payloads.items()
+        ))
+
+    async_to_sync(send_all)()
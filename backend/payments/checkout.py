@@ -0,0 +1,78 @@
+"""
+Создание платежей у платежных систем вне запроса пользователя.
+
+CreatePaymentView только сохраняет Payment (pending, без confirmation_url)
+и сразу отвечает 202 — воркер запроса не ждет сетевого вызова провайдера
+с его таймаутами и повторами. Воркер (process_provider_payments) забирает
+платежи по одному с SELECT ... FOR UPDATE SKIP LOCKED, создает их через
+payments.providers и сохраняет external_id и confirmation_url; клиент
+получает ссылку опросом GET /api/payments/<id>/.
+
+Провайдер недоступен — платеж остается в очереди до следующего прохода
+(ключ идемпотентности тот же, второй платеж не появится). Провайдер
+отклонил запрос — платеж помечается failed.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from . import providers
+from .models import Payment
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'PAYMENT_CHECKOUT_BATCH_SIZE', 20)
+
+
+def pending():
+    return Payment.objects.filter(
+        status='pending', confirmation_url='', payment_method__in=list(providers.PROVIDERS)
+    )
+
+
+def create_at_provider(payment):
+    """Создает платеж у провайдера; без ключей — демо-ссылка, как раньше в представлении."""
+    frontend_url = getattr(settings, 'FRONTEND_URL', '')
+    provider = providers.get_provider(payment.payment_method)
+    if not provider.configured:
+        payment.confirmation_url = f"{frontend_url}/payment/demo/{payment.id}"
+        payment.save(update_fields=['confirmation_url', 'updated_at'])
+        return
+    try:
+        external_id, confirmation_url = providers.get_client(payment.payment_method).create_payment(
+            payment, return_url=f"{frontend_url}/payment/success"
+        )
+    except providers.ProviderUnavailable:
+        raise
+    except providers.ProviderError as exc:
+        payment.status = 'failed'
+        payment.metadata['provider_error'] = str(exc)
+        payment.save(update_fields=['status', 'metadata', 'updated_at'])
+        return
+    payment.external_id = external_id
+    payment.confirmation_url = confirmation_url
+    payment.save(update_fields=['external_id', 'confirmation_url', 'updated_at'])
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Обрабатывает до batch_size платежей; возвращает их число.
+
+    Каждый платеж — в своей транзакции: строка заблокирована только на время
+    вызова провайдера. Недоступность провайдера прерывает пачку.
+    """
+    processed = 0
+    while processed < batch_size:
+        with transaction.atomic():
+            payment = pending().select_for_update(skip_locked=True).order_by('created_at', 'id').first()
+            if payment is None:
+                break
+            try:
+                create_at_provider(payment)
+            except providers.ProviderUnavailable as exc:
+                logger.warning('Платеж %s отложен: %s', payment.id, exc)
+                break
+        processed += 1
+    return processed
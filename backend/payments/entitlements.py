@@ -0,0 +1,91 @@
+"""
+Права пользователя по подписке (entitlements).
+
+Набор возможностей пользователя вычисляется одним запросом и кэшируется
+по user_id; сигналы UserSubscription и Payment сбрасывают кэш. Срок жизни
+записи не выходит за end_date подписки, поэтому истекшая подписка
+перестает давать возможности без записи в БД на чтении — флаг is_active
+снимает плановый проход (payments.renewals).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import permissions
+
+
+ENTITLEMENTS_TTL = getattr(settings, 'ENTITLEMENTS_CACHE_TTL', 300)
+
+NO_SUBSCRIPTION = {'has_active_subscription': False, 'features': {}, 'expires_at': None}
+
+
+def _key(user_id):
+    return f'entitlements:{user_id}'
+
+
+def resolve(user_id):
+    from users.models import UserSubscription
+
+    row = (
+        UserSubscription.objects.filter(user_id=user_id, is_active=True)
+        .values('features', 'end_date')
+        .first()
+    )
+    if row is None or (row['end_date'] is not None and row['end_date'] <= timezone.now()):
+        return dict(NO_SUBSCRIPTION)
+    return {
+        'has_active_subscription': True,
+        'features': row['features'] or {},
+        'expires_at': row['end_date']
+    }
+
+
+def get_entitlements(user):
+    # В пределах запроса результат запоминается на объекте пользователя
+    cached = getattr(user, '_entitlements', None)
+    if cached is not None:
+        return cached
+
+    entitlements = cache.get(_key(user.pk))
+    if entitlements is None or _expired(entitlements):
+        entitlements = resolve(user.pk)
+        timeout = ENTITLEMENTS_TTL
+        if entitlements['expires_at'] is not None:
+            left = (entitlements['expires_at'] - timezone.now()).total_seconds()
+            timeout = max(1, min(timeout, int(left)))
+        cache.set(_key(user.pk), entitlements, timeout)
+    user._entitlements = entitlements
+    return entitlements
+
+
+def _expired(entitlements):
+    expires_at = entitlements['expires_at']
+    return expires_at is not None and expires_at <= timezone.now()
+
+
+def has_feature(user, name):
+    if not user.is_authenticated:
+        return False
+    entitlements = get_entitlements(user)
+    return entitlements['has_active_subscription'] and bool(entitlements['features'].get(name))
+
+
+def invalidate(user_id):
+    cache.delete(_key(user_id))
+
+
+def invalidate_many(user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def feature_required(name):
+    """Класс разрешения DRF: permission_classes = [feature_required('advanced_search')]."""
+    class HasFeature(permissions.BasePermission):
+        message = 'Эта возможность доступна только по подписке'
+
+        def has_permission(self, request, view):
+            return has_feature(request.user, name)
+
+    HasFeature.__name__ = f'HasFeature_{name}'
+    return HasFeature
+
@@ -0,0 +1,129 @@
+"""
+Локальный фейковый сервер платежных систем для тестов и нагрузочных прогонов.
+
+Понимает POST /payments (ЮKassa) и POST /Init (Т-Банк), соблюдает
+идемпотентность (Idempotence-Key / OrderId) и умеет имитировать сбои:
+первые fail_first запросов получают 503, каждый ответ задерживается
+на delay секунд. Клиенты направляются на него через base_url в
+PAYMENT_PROVIDERS.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        with state.lock:
+            state.requests += 1
+            fail = state.requests <= state.fail_first
+        if state.delay:
+            time.sleep(state.delay)
+        if fail:
+            return self._reply(503, {'type': 'error', 'description': 'unavailable'})
+
+        if self.path.rstrip('/').endswith('/payments'):
+            key = self.headers.get('Idempotence-Key')
+            if not key:
+                return self._reply(400, {'type': 'error', 'code': 'invalid_request'})
+            with state.lock:
+                if key not in state.created:
+                    payment_id = str(uuid.uuid4())
+                    state.created[key] = {
+                        'id': payment_id,
+                        'status': 'pending',
+                        'amount': payload.get('amount'),
+                        'metadata': payload.get('metadata', {}),
+                        'confirmation': {
+                            'type': 'redirect',
+                            'confirmation_url': f'{state.base_url}/confirm/{payment_id}'
+                        }
+                    }
+                return self._reply(200, state.created[key])
+
+        if self.path.rstrip('/').endswith('/Init'):
+            order_id = payload.get('OrderId')
+            with state.lock:
+                if order_id not in state.created:
+                    payment_id = str(uuid.uuid4().int % 10 ** 10)
+                    state.created[order_id] = {
+                        'Success': True,
+                        'ErrorCode': '0',
+                        'Status': 'NEW',
+                        'PaymentId': payment_id,
+                        'OrderId': order_id,
+                        'Amount': payload.get('Amount'),
+                        'PaymentURL': f'{state.base_url}/confirm/{payment_id}'
+                    }
+                return self._reply(200, state.created[order_id])
+
+        return self._reply(404, {'type': 'error', 'code': 'not_found'})
+
+
+class _State:
+    def __init__(self, fail_first, delay):
+        self.lock = threading.Lock()
+        self.fail_first = fail_first
+        self.delay = delay
+        self.requests = 0
+        self.created = {}
+        self.base_url = ''
+
+
+class FakeProviderServer:
+    """
+    with FakeProviderServer(fail_first=2) as server, override_settings(PAYMENT_PROVIDERS={
+        'yookassa': {'base_url': server.url, 'shop_id': 'shop', 'secret_key': 'secret'}
+    }):
+        ...
+
+    override_settings сбрасывает закэшированные клиенты (providers.reset_clients);
+    вне тестов после смены настроек reset_clients() вызывается явно.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, fail_first=0, delay=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = _State(fail_first, delay)
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+        self.httpd.state.base_url = self.url
+        self._thread = None
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from payments.fake_provider import FakeProviderServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает локальный фейковый сервер ЮKassa/Т-Банка для разработки и нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--fail-first', type=int, default=0, help='Сколько первых запросов ответить 503')
+        parser.add_argument('--delay', type=float, default=0, help='Задержка ответа в секундах')
+
+    def handle(self, *args, **options):
+        server = FakeProviderServer(port=options['port'], fail_first=options['fail_first'], delay=options['delay'])
+        self.stdout.write(f'Фейковый провайдер: {server.url} (base_url для PAYMENT_PROVIDERS)')
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
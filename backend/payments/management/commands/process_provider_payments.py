@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.checkout import BATCH_SIZE, process_batch
+
+
+class Command(BaseCommand):
+    help = 'Создает ожидающие платежи у платежных систем'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Опрашивать очередь каждые N секунд (0 — разобрать очередь и выйти)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Пачки подряд, пока очередь не опустеет или провайдер не станет недоступен
+            total = 0
+            while True:
+                count = process_batch(options['batch_size'])
+                total += count
+                if count < options['batch_size']:
+                    break
+            if total:
+                self.stdout.write(f"Создано платежей: {total}")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.renewals import BATCH_SIZE, run_once
+
+
+class Command(BaseCommand):
+    help = 'Создает платежи продления и деактивирует истекшие подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд (0 — один проход)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            renewed, expired = run_once(batch_size=options['batch_size'])
+            if renewed or expired:
+                self.stdout.write(f"Платежей продления: {renewed}, истекло подписок: {expired}")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
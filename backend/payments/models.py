@@ -0,0 +1,101 @@
+from django.db import models
+from django.db.models import Q
+from users.models import CustomUser
+
+
+class PaymentWebhook(models.Model):
+    """Входящий callback платежной системы в исходном виде; обрабатывается воркером."""
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+    provider = models.CharField(max_length=20, blank=True)
+    external_id = models.CharField(max_length=100, blank=True, db_index=True)
+    event = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # После ошибки запись не берется воркером до этого времени (экспоненциальная пауза)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Очередь воркера: только необработанные, в порядке поступления
+            models.Index(
+                fields=['received_at', 'id'], condition=Q(status='pending'),
+                name='payment_webhook_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider or 'callback'} {self.external_id} ({self.status})"
+
+
+class SubscriptionPlan(models.Model):
+    PLAN_TYPES = [
+        ('basic', 'Basic'),
+        ('pro', 'Pro'),
+    ]
+    USER_TYPES = [
+        ('startup', 'Startup'),
+        ('investor', 'Investor'),
+        ('both', 'Both'),
+    ]
+    name = models.CharField(max_length=100)
+    plan_type = models.CharField(max_length=20, choices=PLAN_TYPES)
+    user_type = models.CharField(max_length=20, choices=USER_TYPES, default='both')
+    price_monthly = models.DecimalField(max_digits=10, decimal_places=2)
+    price_yearly = models.DecimalField(max_digits=10, decimal_places=2)
+    features = models.JSONField(default=dict, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Payment(models.Model):
+    PAYMENT_METHODS = [
+        ('yookassa', 'ЮKassa'),
+        ('tbank', 'Т-Банк'),
+        ('card', 'Card'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='subscription_payments')
+    subscription_plan = models.ForeignKey(SubscriptionPlan, on_delete=models.PROTECT, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    external_id = models.CharField(max_length=100, blank=True, db_index=True)
+    description = models.CharField(max_length=255, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    # URL подтверждения у провайдера; пустой — платеж ждет воркера (payments.checkout)
+    confirmation_url = models.URLField(max_length=500, blank=True)
+    # Подписка, которую продлевает платеж (payments.renewals); FK — индексированный поиск дублей
+    renewal_of = models.ForeignKey(
+        'users.UserSubscription', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='renewal_payments'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Очередь воркера payments.checkout: платежи, еще не созданные у провайдера
+            models.Index(
+                fields=['created_at', 'id'], condition=Q(status='pending', confirmation_url=''),
+                name='payment_checkout_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.amount} ({self.status})"
@@ -0,0 +1,337 @@
+"""
+Клиенты API платежных систем (ЮKassa, Т-Банк).
+
+На каждого провайдера — одна долгоживущая сессия с пулом keep-alive
+соединений, таймауты на подключение и чтение, повторы с тем же ключом
+идемпотентности (повтор не создает второй платеж) и предохранитель:
+после FAILURE_THRESHOLD ошибок подряд запросы к провайдеру сразу
+отклоняются RESET_TIMEOUT секунд, а не занимают воркеры ожиданием.
+AsyncProviderClient — то же поверх httpx для ASGI.
+
+base_url берется из настроек, поэтому клиенты можно направить на
+локальный фейковый сервер (payments.fake_provider). Клиенты кэшируются на
+процесс: после смены PAYMENT_PROVIDERS вызывается reset_clients()
+(override_settings делает это сам).
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+MAX_RETRIES = 3
+BACKOFF = 0.3
+POOL_SIZE = 20
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Адреса, с которых ЮKassa шлет уведомления (документация API); за прокси —
+# переопределяются в PAYMENT_PROVIDERS['yookassa']['webhook_ips']
+YOOKASSA_WEBHOOK_IPS = (
+    '185.71.76.0/27', '185.71.77.0/27', '77.75.153.0/25', '77.75.156.11',
+    '77.75.156.35', '77.75.154.128/25', '2a02:5180::/32',
+)
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderUnavailable(ProviderError):
+    """Предохранитель разомкнут или провайдер не ответил после всех повторов."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Полуоткрытое состояние: после паузы пропускаем пробный запрос
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def _backoff(attempt):
+    return BACKOFF * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class Provider:
+    """Описание API провайдера: как построить запрос и разобрать ответ."""
+    name = None
+
+    def __init__(self, config):
+        self.config = config
+        self.base_url = config['base_url'].rstrip('/')
+
+    @property
+    def configured(self):
+        return all(self.config.get(key) for key in self.required_keys)
+
+    def headers(self, idempotence_key):
+        return {}
+
+    def auth(self):
+        return None
+
+    def verify_callback(self, payload, remote_addr):
+        """Подлинность входящего callback'а; непроверенному payload доверять нельзя."""
+        return False
+
+
+class YooKassaProvider(Provider):
+    name = 'yookassa'
+    required_keys = ('shop_id', 'secret_key')
+
+    def headers(self, idempotence_key):
+        return {'Idempotence-Key': idempotence_key}
+
+    def auth(self):
+        return (self.config['shop_id'], self.config['secret_key'])
+
+    def create_request(self, payment, return_url):
+        return 'POST', '/payments', {
+            'amount': {'value': str(payment.amount), 'currency': 'RUB'},
+            'capture': True,
+            'confirmation': {'type': 'redirect', 'return_url': return_url},
+            'description': payment.description,
+            'metadata': {'payment_id': payment.id, 'user_id': payment.user_id}
+        }
+
+    def parse_created(self, data):
+        return data['id'], data['confirmation']['confirmation_url']
+
+    def verify_callback(self, payload, remote_addr):
+        # Уведомления ЮKassa не подписаны — проверяется адрес отправителя
+        try:
+            address = ipaddress.ip_address(remote_addr or '')
+        except ValueError:
+            return False
+        networks = self.config.get('webhook_ips') or YOOKASSA_WEBHOOK_IPS
+        return any(address in ipaddress.ip_network(network) for network in networks)
+
+
+class TBankProvider(Provider):
+    name = 'tbank'
+    required_keys = ('terminal_key', 'password')
+
+    def token(self, payload):
+        # Подпись: SHA-256 от значений корневых полей и Password, отсортированных по ключу;
+        # сам Token не подписывается, булевы значения — как в JSON (true/false)
+        values = {**{k: v for k, v in payload.items() if k != 'Token' and not isinstance(v, (dict, list))},
+                  'Password': self.config['password']}
+        joined = ''.join(
+            str(values[key]).lower() if isinstance(values[key], bool) else str(values[key])
+            for key in sorted(values)
+        )
+        return hashlib.sha256(joined.encode('utf-8')).hexdigest()
+
+    def verify_callback(self, payload, remote_addr):
+        if not self.configured or payload.get('TerminalKey') != self.config['terminal_key']:
+            return False
+        return hmac.compare_digest(str(payload.get('Token', '')), self.token(payload))
+
+    def create_request(self, payment, return_url):
+        payload = {
+            'TerminalKey': self.config['terminal_key'],
+            'Amount': int(Decimal(payment.amount) * 100),
+            # OrderId уникален для платежа — повтор Init не создает второй заказ
+            'OrderId': str(payment.id),
+            'Description': payment.description[:140],
+            'SuccessURL': return_url,
+            'DATA': {'payment_id': str(payment.id)}
+        }
+        payload['Token'] = self.token(payload)
+        return 'POST', '/Init', payload
+
+    def parse_created(self, data):
+        if not data.get('Success'):
+            raise ProviderError(data.get('Message') or data.get('ErrorCode') or 'Init failed')
+        return str(data['PaymentId']), data['PaymentURL']
+
+
+PROVIDERS = {'yookassa': YooKassaProvider, 'tbank': TBankProvider}
+
+
+class ProviderClient:
+    def __init__(self, provider, breaker=None, max_retries=MAX_RETRIES):
+        self.provider = provider
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, payload, idempotence_key):
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f'{self.provider.name}: предохранитель разомкнут')
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(_backoff(attempt - 1))
+            try:
+                response = self.session.request(
+                    method, self.provider.base_url + path, json=payload,
+                    headers=self.provider.headers(idempotence_key), auth=self.provider.auth(),
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+                )
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                last_error = exc
+                continue
+            if response.status_code in RETRY_STATUSES:
+                last_error = ProviderError(f'HTTP {response.status_code}')
+                continue
+            self.breaker.record_success()
+            if response.status_code >= 400:
+                raise ProviderError(f'{self.provider.name}: HTTP {response.status_code} {response.text[:200]}')
+            return response.json()
+        self.breaker.record_failure()
+        raise ProviderUnavailable(f'{self.provider.name}: {last_error}')
+
+    def create_payment(self, payment, return_url, idempotence_key=None):
+        """Возвращает (внешний id, URL подтверждения)."""
+        method, path, payload = self.provider.create_request(payment, return_url)
+        data = self.request(method, path, payload, idempotence_key or payment_idempotence_key(payment))
+        return self.provider.parse_created(data)
+
+
+class AsyncProviderClient:
+    def __init__(self, provider, breaker=None, max_retries=MAX_RETRIES):
+        if httpx is None:
+            raise ImproperlyConfigured('Для асинхронного клиента нужен пакет httpx')
+        self.provider = provider
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.client = httpx.AsyncClient(
+            base_url=provider.base_url,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            auth=provider.auth()
+        )
+
+    async def request(self, method, path, payload, idempotence_key):
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f'{self.provider.name}: предохранитель разомкнут')
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(_backoff(attempt - 1))
+            try:
+                response = await self.client.request(
+                    method, path, json=payload, headers=self.provider.headers(idempotence_key)
+                )
+            except httpx.TransportError as exc:
+                last_error = exc
+                continue
+            if response.status_code in RETRY_STATUSES:
+                last_error = ProviderError(f'HTTP {response.status_code}')
+                continue
+            self.breaker.record_success()
+            if response.status_code >= 400:
+                raise ProviderError(f'{self.provider.name}: HTTP {response.status_code} {response.text[:200]}')
+            return response.json()
+        self.breaker.record_failure()
+        raise ProviderUnavailable(f'{self.provider.name}: {last_error}')
+
+    async def create_payment(self, payment, return_url, idempotence_key=None):
+        method, path, payload = self.provider.create_request(payment, return_url)
+        data = await self.request(method, path, payload, idempotence_key or payment_idempotence_key(payment))
+        return self.provider.parse_created(data)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def payment_idempotence_key(payment):
+    # Стабилен для платежа: повторная отправка того же Payment не создаст второй платеж у провайдера
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f'payment:{payment.pk}'))
+
+
+def get_provider(name):
+    config = getattr(settings, 'PAYMENT_PROVIDERS', {}).get(name)
+    if name not in PROVIDERS or config is None:
+        raise ProviderError(f'Неизвестная платежная система: {name}')
+    return PROVIDERS[name](config)
+
+
+# Сессии и предохранители живут на уровне процесса, по одному на провайдера
+_clients = {}
+_breakers = {}
+_clients_lock = threading.Lock()
+
+
+def _breaker(name):
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker()
+    return _breakers[name]
+
+
+def get_client(name):
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = ProviderClient(get_provider(name), breaker=_breaker(name))
+        return _clients[name]
+
+
+def reset_clients():
+    """Закрывает сессии и сбрасывает предохранители; следующий get_client читает настройки заново."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
+        _breakers.clear()
+
+
+@receiver(setting_changed)
+def _payment_providers_changed(sender, setting, **kwargs):
+    # override_settings(PAYMENT_PROVIDERS=...) в тестах направляет клиентов на новый base_url
+    if setting == 'PAYMENT_PROVIDERS':
+        reset_clients()
+
+
+def get_async_client(name):
+    # httpx.AsyncClient привязан к циклу событий — клиент создает и закрывает вызывающий код,
+    # предохранитель общий с синхронным клиентом
+    with _clients_lock:
+        breaker = _breaker(name)
+    return AsyncProviderClient(get_provider(name), breaker=breaker)
@@ -0,0 +1,174 @@
+"""
+Плановое истечение и продление подписок.
+
+Проход (run_once) делает две вещи:
+
+* за RENEWAL_LEAD до end_date создает платеж продления (Payment в статусе
+  pending) для подписок с auto_renew; после оплаты callback продлевает
+  подписку от текущей end_date (webhooks.activate_subscription);
+* снимает is_active с подписок, у которых end_date прошла.
+
+Подписки перебираются по ключу (end_date, id) пачками по BATCH_SIZE, каждая
+пачка — в своей короткой транзакции с SELECT ... FOR UPDATE SKIP LOCKED,
+поэтому миллион подписок не держит одну длинную транзакцию, а параллельные
+запуски не обрабатывают строку дважды. Уведомления рассылаются сигналами
+после фиксации пачки.
+
+Запуск только явный: manage.py process_subscriptions --interval N или
+start_scheduler(N) в выделенном процессе. Из AppConfig.ready() планировщик
+не стартует — иначе он работал бы в каждом воркере, в migrate и в тестах.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import entitlements
+from .models import Payment
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'SUBSCRIPTION_BATCH_SIZE', 1000)
+RENEWAL_LEAD = timezone.timedelta(hours=getattr(settings, 'SUBSCRIPTION_RENEWAL_LEAD_HOURS', 24))
+
+# user_ids — пользователи, чьи подписки истекли
+subscriptions_expired = Signal()
+# payments — созданные платежи продления
+renewals_created = Signal()
+
+
+def _scan(queryset, batch_size):
+    """Пачки id по возрастанию (end_date, id) — курсор по индексу, без OFFSET."""
+    cursor = None
+    while True:
+        page = queryset
+        if cursor is not None:
+            end_date, pk = cursor
+            page = page.filter(Q(end_date__gt=end_date) | Q(end_date=end_date, id__gt=pk))
+        rows = list(page.order_by('end_date', 'id').values_list('end_date', 'id')[:batch_size])
+        if not rows:
+            return
+        cursor = rows[-1]
+        yield [pk for _, pk in rows]
+
+
+def expire_due(now=None, batch_size=BATCH_SIZE):
+    """Деактивирует истекшие подписки; возвращает их число."""
+    from users.models import UserSubscription
+
+    now = now or timezone.now()
+    due = UserSubscription.objects.filter(is_active=True, end_date__lt=now)
+    total = 0
+    for ids in _scan(due, batch_size):
+        with transaction.atomic():
+            rows = list(
+                due.select_for_update(skip_locked=True).filter(id__in=ids).values_list('id', 'user_id')
+            )
+            UserSubscription.objects.filter(id__in=[pk for pk, _ in rows]).update(is_active=False)
+        user_ids = [user_id for _, user_id in rows]
+        # update() не шлет post_save — кэш прав сбрасываем сами
+        entitlements.invalidate_many(user_ids)
+        if user_ids:
+            subscriptions_expired.send(sender=UserSubscription, user_ids=user_ids)
+        total += len(rows)
+    return total
+
+
+def _renewal_payment(subscription):
+    previous = subscription.payment
+    period = previous.metadata.get('period', 'monthly') if previous else 'monthly'
+    plan = subscription.plan
+    return Payment(
+        user_id=subscription.user_id,
+        subscription_plan=plan,
+        amount=plan.price_yearly if period == 'yearly' else plan.price_monthly,
+        payment_method=previous.payment_method if previous else '',
+        description=f"Продление подписки {plan.name} ({period})",
+        metadata={
+            'period': period,
+            'plan_type': plan.plan_type,
+            'user_type': plan.user_type
+        },
+        renewal_of=subscription
+    )
+
+
+def create_renewals(now=None, batch_size=BATCH_SIZE):
+    """Создает платежи продления для подписок с auto_renew; возвращает их число."""
+    from users.models import UserSubscription
+
+    now = now or timezone.now()
+    due = UserSubscription.objects.filter(
+        is_active=True, auto_renew=True, end_date__gte=now, end_date__lte=now + RENEWAL_LEAD
+    )
+    total = 0
+    for ids in _scan(due, batch_size):
+        with transaction.atomic():
+            subscriptions = list(
+                due.select_for_update(skip_locked=True, of=('self',)).filter(id__in=ids)
+                .select_related('plan', 'payment')
+            )
+            # Платеж продления, созданный в окне RENEWAL_LEAD, относится к текущему периоду
+            renewed = set(
+                Payment.objects.filter(
+                    renewal_of__in=[subscription.id for subscription in subscriptions],
+                    created_at__gte=now - RENEWAL_LEAD
+                ).values_list('renewal_of_id', flat=True)
+            )
+            payments = Payment.objects.bulk_create([
+                _renewal_payment(subscription) for subscription in subscriptions
+                if subscription.id not in renewed
+            ])
+        if payments:
+            renewals_created.send(sender=Payment, payments=payments)
+        total += len(payments)
+    return total
+
+
+def run_once(now=None, batch_size=BATCH_SIZE):
+    now = now or timezone.now()
+    return create_renewals(now, batch_size), expire_due(now, batch_size)
+
+
+class Scheduler(threading.Thread):
+    """Планировщик в процессе: run_once каждые interval секунд в фоновом потоке."""
+
+    def __init__(self, interval, batch_size=BATCH_SIZE):
+        super().__init__(name='subscription-scheduler', daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stopped = threading.Event()
+
+    def run(self):
+        from django.db import connection
+
+        while not self.stopped.wait(self.interval):
+            try:
+                run_once(batch_size=self.batch_size)
+            except Exception:
+                logger.exception('Ошибка планового прохода по подпискам')
+            finally:
+                connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler(interval):
+    """Запускает планировщик один раз на процесс; вызывается явно из выделенного процесса."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(interval)
+            _scheduler.start()
+        return _scheduler
@@ -15,7 +15,7 @@ class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = '__all__'
-        read_only_fields = ('user', 'status', 'external_id', 'created_at', 
+        read_only_fields = ('user', 'status', 'external_id', 'confirmation_url', 'created_at', 
                           'updated_at', 'completed_at')
 
 class UserSubscriptionSerializer(serializers.ModelSerializer):
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import UserSubscription
+from notifications import push
+from . import entitlements, renewals
+from .models import Payment
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def subscription_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    # Сбрасываем после фиксации: иначе параллельный запрос успеет закэшировать старые права
+    transaction.on_commit(lambda: entitlements.invalidate(user_id))
+
+
+@receiver(renewals.subscriptions_expired)
+def notify_expired(sender, user_ids, **kwargs):
+    push.notify({
+        user_id: {'event': 'subscription_expired', 'message': 'Срок действия подписки истек'}
+        for user_id in user_ids
+    })
+
+
+@receiver(renewals.renewals_created)
+def notify_renewal(sender, payments, **kwargs):
+    push.notify({
+        payment.user_id: {
+            'event': 'subscription_renewal',
+            'message': payment.description,
+            'payment_id': payment.id,
+            'amount': str(payment.amount)
+        }
+        for payment in payments
+    })
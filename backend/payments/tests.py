@@ -1,3 +1,393 @@
-from django.test import TestCase
+import hashlib
+import threading
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from users.models import CustomUser, UserSubscription
+from . import checkout, entitlements, providers, renewals, webhooks
+from .fake_provider import FakeProviderServer
+from .models import Payment, PaymentWebhook, SubscriptionPlan
+from .views import PaymentCallbackView
+from .webhooks import activate_subscription
+
+
+class PaymentsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='investor', password='pass', user_type='investor')
+        self.plan = SubscriptionPlan.objects.create(
+            name='Pro', plan_type='pro', price_monthly=Decimal('990.00'), price_yearly=Decimal('9900.00'),
+            features={'advanced_search': True, 'export': False}
+        )
+
+    def subscribe(self, user=None, days=30, **values):
+        now = timezone.now()
+        values.setdefault('features', self.plan.features)
+        return UserSubscription.objects.create(
+            user=user or self.user, plan=self.plan, start_date=now,
+            end_date=now + timezone.timedelta(days=days), **values
+        )
+
+    def fresh_user(self):
+        # Новый объект пользователя — без памяти прошлого запроса
+        return CustomUser.objects.get(pk=self.user.pk)
+
+
+class EntitlementTests(PaymentsTestCase):
+    def test_has_feature(self):
+        self.subscribe()
+        user = self.fresh_user()
+        self.assertTrue(entitlements.has_feature(user, 'advanced_search'))
+        self.assertFalse(entitlements.has_feature(user, 'export'))
+        self.assertFalse(entitlements.has_feature(user, 'unknown'))
+        self.assertFalse(entitlements.has_feature(AnonymousUser(), 'advanced_search'))
+
+    def test_without_subscription(self):
+        self.assertFalse(entitlements.has_feature(self.fresh_user(), 'advanced_search'))
+
+    def test_resolved_once_and_cached(self):
+        self.subscribe()
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            entitlements.has_feature(user, 'advanced_search')
+            entitlements.has_feature(user, 'export')
+        # Другой запрос того же пользователя читает кэш
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(entitlements.has_feature(user, 'advanced_search'))
+
+    def test_invalidated_after_commit(self):
+        subscription = self.subscribe()
+        entitlements.get_entitlements(self.fresh_user())
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            subscription.features = {'advanced_search': False, 'export': True}
+            subscription.save()
+            # До фиксации в кэше остаются прежние права
+            self.assertTrue(entitlements.has_feature(self.fresh_user(), 'advanced_search'))
+        for callback in callbacks:
+            callback()
+
+        user = self.fresh_user()
+        self.assertFalse(entitlements.has_feature(user, 'advanced_search'))
+        self.assertTrue(entitlements.has_feature(user, 'export'))
+
+    def test_cancelled_subscription_is_invalidated(self):
+        subscription = self.subscribe()
+        entitlements.get_entitlements(self.fresh_user())
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertFalse(entitlements.has_feature(self.fresh_user(), 'advanced_search'))
+
+    def test_expires_at_end_date_without_writes(self):
+        subscription = self.subscribe(days=1)
+        self.assertTrue(entitlements.has_feature(self.fresh_user(), 'advanced_search'))
+
+        later = subscription.end_date + timezone.timedelta(seconds=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertFalse(entitlements.has_feature(self.fresh_user(), 'advanced_search'))
+
+        subscription.refresh_from_db()
+        self.assertTrue(subscription.is_active)
+
+    def test_feature_required_permission(self):
+        self.subscribe()
+        request = mock.Mock(user=self.fresh_user())
+        self.assertTrue(entitlements.feature_required('advanced_search')().has_permission(request, None))
+        self.assertFalse(entitlements.feature_required('export')().has_permission(request, None))
+
+
+class RenewalTests(PaymentsTestCase):
+    """Плановый проход payments.renewals: истечение, продление, повторный запуск."""
+
+    def payment(self, user=None, **values):
+        return Payment.objects.create(
+            user=user or self.user, subscription_plan=self.plan, amount=self.plan.price_monthly,
+            payment_method='tbank', status='completed', metadata={'period': 'monthly'}, **values
+        )
+
+    def test_expired_subscriptions_are_deactivated(self):
+        expired = self.subscribe(days=-1)
+        other = CustomUser.objects.create_user(username='other', password='pass', user_type='startup')
+        active = self.subscribe(user=other, days=10)
+        entitlements.get_entitlements(self.fresh_user())
+
+        self.assertEqual(renewals.expire_due(batch_size=1), 1)
+        expired.refresh_from_db()
+        active.refresh_from_db()
+        self.assertFalse(expired.is_active)
+        self.assertTrue(active.is_active)
+        # Кэш прав сброшен, хотя update() не шлет post_save
+        self.assertIsNone(cache.get(entitlements._key(self.user.pk)))
+        self.assertEqual(renewals.expire_due(), 0)
+
+    def test_renewal_payment_is_created_once(self):
+        subscription = self.subscribe(days=0.5, payment=self.payment())
+
+        self.assertEqual(renewals.create_renewals(batch_size=1), 1)
+        renewal = Payment.objects.get(renewal_of=subscription)
+        self.assertEqual(renewal.status, 'pending')
+        self.assertEqual(renewal.amount, self.plan.price_monthly)
+        self.assertEqual(renewal.payment_method, 'tbank')
+
+        # Повторный проход в том же окне дублей не создает
+        self.assertEqual(renewals.create_renewals(), 0)
+        self.assertEqual(Payment.objects.filter(renewal_of=subscription).count(), 1)
+
+    def test_renewal_skips_subscriptions_outside_window_or_without_auto_renew(self):
+        self.subscribe(days=0.5, auto_renew=False)
+        other = CustomUser.objects.create_user(username='other', password='pass', user_type='startup')
+        self.subscribe(user=other, days=10)
+
+        self.assertEqual(renewals.create_renewals(), 0)
+        self.assertFalse(Payment.objects.filter(renewal_of__isnull=False).exists())
+
+    def test_paid_renewal_extends_from_end_date(self):
+        subscription = self.subscribe(days=0.5, payment=self.payment())
+        renewals.create_renewals()
+        renewal = Payment.objects.get(renewal_of=subscription)
+
+        end_date = subscription.end_date
+        activate_subscription(renewal)
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.start_date, end_date)
+        self.assertEqual(subscription.end_date, end_date + timezone.timedelta(days=30))
+        self.assertEqual(subscription.payment_id, renewal.pk)
+
+
+class CheckoutTests(PaymentsTestCase):
+    """Воркер payments.checkout создает платежи у провайдера через фейковый сервер."""
+
+    def setUp(self):
+        super().setUp()
+        # Повторы без пауз
+        patcher = mock.patch.object(providers, 'BACKOFF', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve(self, **options):
+        server = FakeProviderServer(**options).start()
+        self.addCleanup(server.stop)
+        overridden = override_settings(PAYMENT_PROVIDERS={
+            'yookassa': {'base_url': server.url, 'shop_id': 'shop', 'secret_key': 'secret'},
+            'tbank': {'base_url': server.url, 'terminal_key': 'terminal', 'password': 'password'},
+        })
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        return server
+
+    def payment(self, payment_method='yookassa'):
+        return Payment.objects.create(
+            user=self.user, subscription_plan=self.plan, amount=self.plan.price_monthly,
+            payment_method=payment_method, description='Подписка Pro (monthly)', metadata={'period': 'monthly'}
+        )
+
+    def test_pending_payments_are_created_at_provider(self):
+        server = self.serve()
+        yookassa, tbank = self.payment(), self.payment('tbank')
+        card = self.payment('card')
+
+        self.assertEqual(checkout.process_batch(), 2)
+        for payment in (yookassa, tbank):
+            payment.refresh_from_db()
+            self.assertEqual(payment.status, 'pending')
+            self.assertTrue(payment.external_id)
+            self.assertTrue(payment.confirmation_url.startswith(f'{server.url}/confirm/'))
+        self.assertEqual(server.state.requests, 2)
+        # Карта к провайдеру не ходит, созданные платежи из очереди ушли
+        self.assertEqual(checkout.process_batch(), 0)
+        self.assertFalse(checkout.pending().filter(pk=card.pk).exists())
+
+    def test_retries_reuse_idempotence_key(self):
+        server = self.serve(fail_first=2)
+        payment = self.payment()
+
+        self.assertEqual(checkout.process_batch(), 1)
+        payment.refresh_from_db()
+        self.assertEqual(server.state.requests, 3)
+        self.assertEqual(len(server.state.created), 1)
+
+        # Повторная отправка того же платежа возвращает тот же платеж провайдера
+        external_id = payment.external_id
+        Payment.objects.filter(pk=payment.pk).update(external_id='', confirmation_url='')
+        checkout.process_batch()
+        payment.refresh_from_db()
+        self.assertEqual(payment.external_id, external_id)
+        self.assertEqual(len(server.state.created), 1)
+
+    def test_unavailable_provider_leaves_payment_queued(self):
+        self.serve(fail_first=100)
+        payment = self.payment()
+
+        with self.assertLogs('payments.checkout', 'WARNING'):
+            self.assertEqual(checkout.process_batch(), 0)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
+        self.assertEqual(payment.confirmation_url, '')
+        self.assertTrue(checkout.pending().filter(pk=payment.pk).exists())
+
+    def test_rejected_payment_is_failed(self):
+        self.serve()
+        payment = self.payment()
+        declined = providers.ProviderError('declined')
+        with mock.patch.object(providers.YooKassaProvider, 'parse_created', side_effect=declined):
+            self.assertEqual(checkout.process_batch(), 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(payment.metadata['provider_error'], 'declined')
+
+    def test_demo_mode_without_credentials(self):
+        unconfigured = {'yookassa': {'base_url': 'http://127.0.0.1:9'}}
+        with override_settings(PAYMENT_PROVIDERS=unconfigured, FRONTEND_URL='http://front'):
+            payment = self.payment()
+            self.assertEqual(checkout.process_batch(), 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.confirmation_url, f'http://front/payment/demo/{payment.pk}')
+
+    def test_changed_settings_reset_cached_clients(self):
+        first = self.serve()
+        self.assertEqual(providers.get_client('yookassa').provider.base_url, first.url)
+        second = self.serve()
+        self.assertEqual(providers.get_client('yookassa').provider.base_url, second.url)
+
+
+class WebhookTestMixin:
+    def payment(self, **values):
+        return Payment.objects.create(
+            user=self.user, subscription_plan=self.plan, amount=self.plan.price_monthly,
+            payment_method='yookassa', metadata={'period': 'monthly'}, **values
+        )
+
+    def callback(self, payment_id, external_id='ext-1', status='succeeded'):
+        return {
+            'event': f'payment.{status}',
+            'object': {'id': external_id, 'status': status, 'metadata': {'payment_id': str(payment_id)}}
+        }
+
+
+class WebhookProcessingTests(WebhookTestMixin, PaymentsTestCase):
+    """Воркер callback-ов: повтор не активирует подписку дважды, ошибки ждут паузу."""
+
+    def test_duplicate_callbacks_activate_subscription_once(self):
+        payment = self.payment()
+        first = webhooks.ingest(self.callback(payment.pk), provider='yookassa')
+        duplicate = webhooks.ingest(self.callback(payment.pk), provider='yookassa')
+
+        self.assertEqual(webhooks.process_batch(), 2)
+        first.refresh_from_db()
+        duplicate.refresh_from_db()
+        self.assertEqual((first.status, duplicate.status), ('processed', 'ignored'))
+
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.external_id), ('completed', 'ext-1'))
+        subscription = UserSubscription.objects.get(user=self.user)
+        end_date = subscription.end_date
+
+        # Поздний повтор после обработки тоже ничего не меняет
+        webhooks.ingest(self.callback(payment.pk), provider='yookassa')
+        webhooks.process_batch()
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.end_date, end_date)
+        self.assertEqual(UserSubscription.objects.count(), 1)
+
+    def test_failed_callback_is_retried_with_backoff(self):
+        webhook = webhooks.ingest(self.callback(999999), provider='yookassa')
+
+        for attempt in range(1, webhooks.MAX_ATTEMPTS + 1):
+            started = timezone.now()
+            self.assertEqual(webhooks.process_batch(), 1)
+            # До next_attempt_at воркер запись не берет
+            self.assertEqual(webhooks.process_batch(), 0)
+
+            webhook.refresh_from_db()
+            self.assertEqual(webhook.attempts, attempt)
+            if attempt < webhooks.MAX_ATTEMPTS:
+                self.assertEqual(webhook.status, 'pending')
+                self.assertGreaterEqual(webhook.next_attempt_at, started + webhooks.retry_delay(attempt))
+                PaymentWebhook.objects.filter(pk=webhook.pk).update(next_attempt_at=timezone.now())
+
+        self.assertEqual(webhook.status, 'failed')
+        self.assertIsNone(webhook.next_attempt_at)
+        self.assertEqual(webhooks.retry_delay(2), webhooks.retry_delay(1) * 2)
+
+
+@override_settings(PAYMENT_PROVIDERS={
+    'yookassa': {'base_url': 'http://localhost', 'shop_id': 'shop', 'secret_key': 'secret'},
+    'tbank': {'base_url': 'http://localhost', 'terminal_key': 'terminal', 'password': 'password'},
+})
+class CallbackSignatureTests(WebhookTestMixin, PaymentsTestCase):
+    """Callback сохраняется только после проверки подлинности."""
+
+    def post(self, payload, provider='yookassa', remote_addr='185.71.76.1'):
+        request = APIRequestFactory().post(
+            f'/api/payments/callback/?provider={provider}', payload, format='json', REMOTE_ADDR=remote_addr
+        )
+        return PaymentCallbackView.as_view()(request)
+
+    def test_yookassa_callback_from_known_address_is_ingested(self):
+        response = self.post(self.callback(self.payment().pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PaymentWebhook.objects.get().provider, 'yookassa')
+
+    def test_forged_callbacks_are_rejected(self):
+        payload = self.callback(self.payment().pk)
+        self.assertEqual(self.post(payload, remote_addr='203.0.113.5').status_code, 403)
+        self.assertEqual(self.post({**payload, 'Token': 'forged'}, provider='tbank').status_code, 403)
+        self.assertEqual(self.post(payload, provider='unknown').status_code, 400)
+        self.assertFalse(PaymentWebhook.objects.exists())
+
+    def test_tbank_token(self):
+        provider = providers.get_provider('tbank')
+        payload = {'TerminalKey': 'terminal', 'OrderId': '7', 'Success': True, 'Status': 'CONFIRMED', 'Amount': 99000}
+        # Булевы значения подписываются как в JSON
+        joined = '99000' + '7' + 'password' + 'CONFIRMED' + 'true' + 'terminal'
+        payload['Token'] = hashlib.sha256(joined.encode()).hexdigest()
+
+        self.assertTrue(provider.verify_callback(payload, None))
+        self.assertFalse(provider.verify_callback({**payload, 'Amount': 1}, None))
+        self.assertFalse(provider.verify_callback({**payload, 'TerminalKey': 'other'}, None))
+
+
+class WebhookSkipLockedTests(WebhookTestMixin, TransactionTestCase):
+    """Запись, заблокированную другим воркером, пачка пропускает, а не ждет."""
+
+    def setUp(self):
+        PaymentsTestCase.setUp(self)
+
+    @skipUnless(connection.vendor == 'postgresql', 'SELECT ... FOR UPDATE SKIP LOCKED')
+    def test_locked_webhooks_are_skipped(self):
+        payments = [self.payment() for _ in range(3)]
+        hooks = [
+            webhooks.ingest(self.callback(payment.pk, external_id=f'ext-{payment.pk}'), provider='yookassa')
+            for payment in payments
+        ]
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_first():
+            try:
+                with transaction.atomic():
+                    PaymentWebhook.objects.select_for_update().get(pk=hooks[0].pk)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_first)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual(webhooks.process_batch(), 2)
+        finally:
+            release.set()
+            thread.join()
+
+        statuses = dict(PaymentWebhook.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {hooks[0].pk: 'pending', hooks[1].pk: 'processed', hooks[2].pk: 'processed'})
+        self.assertEqual(webhooks.process_batch(), 1)
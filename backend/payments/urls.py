@@ -5,6 +5,7 @@ urlpatterns = [
     path('plans/', views.SubscriptionPlanListView.as_view(), name='plan-list'),
     path('create/', views.CreatePaymentView.as_view(), name='payment-create'),
     path('callback/', views.PaymentCallbackView.as_view(), name='payment-callback'),
+    path('<int:pk>/', views.PaymentStatusView.as_view(), name='payment-status'),
     path('history/', views.PaymentHistoryView.as_view(), name='payment-history'),
     path('subscription/', views.UserSubscriptionView.as_view(), name='user-subscription'),
     path('subscription/cancel/', views.cancel_subscription, name='cancel-subscription'),
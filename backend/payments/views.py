@@ -2,17 +2,15 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
-from django.utils import timezone
 from django.conf import settings
-import requests
 import json
 from .models import SubscriptionPlan, Payment
+from . import checkout, entitlements, providers, webhooks
 from users.models import UserSubscription
 from .serializers import (
     SubscriptionPlanSerializer, PaymentSerializer,
     UserSubscriptionSerializer, CreatePaymentSerializer, PaymentCallbackSerializer
 )
-from users.models import User
 
 class SubscriptionPlanListView(generics.ListAPIView):
     serializer_class = SubscriptionPlanSerializer
@@ -66,9 +64,19 @@ class CreatePaymentView(APIView):
             
             # Создаем платеж во внешней системе
             payment_url = self.create_external_payment(payment, request)
+            if payment_url is None:
+                # Платеж у провайдера создает воркер (payments.checkout),
+                # ссылку клиент получает опросом PaymentStatusView
+                return Response({
+                    'payment_id': payment.id,
+                    'status': payment.status,
+                    'payment_url': None,
+                    'amount': float(payment.amount)
+                }, status=status.HTTP_202_ACCEPTED)
             
             return Response({
                 'payment_id': payment.id,
+                'status': payment.status,
                 'payment_url': payment_url,
                 'amount': float(payment.amount)
             })
@@ -80,12 +88,9 @@ class CreatePaymentView(APIView):
             )
     
     def create_external_payment(self, payment, request):
-        # Интеграция с ЮKassa
-        if payment.payment_method == 'yookassa':
-            return self.create_yookassa_payment(payment, request)
-        # Интеграция с Т-Банком
-        elif payment.payment_method == 'tbank':
-            return self.create_tbank_payment(payment, request)
+        # Интеграция с ЮKassa и Т-Банком
+        if payment.payment_method in ('yookassa', 'tbank'):
+            return self.create_provider_payment(payment)
         # Для карт возвращаем URL для фронтенда
         elif payment.payment_method == 'card':
             return f"{settings.FRONTEND_URL}/payment/process/{payment.id}"
@@ -93,127 +98,56 @@ class CreatePaymentView(APIView):
             # Обработка неизвестного метода оплаты
             raise ValueError(f"Unknown payment method: {payment.payment_method}")
 
-    def create_yookassa_payment(self, payment, request):
-        # TODO: Реализовать интеграцию с ЮKassa
-        yookassa_url = "https://api.yookassa.ru/v3/payments"
-        
-        payload = {
-            "amount": {
-                "value": str(payment.amount),
-                "currency": "RUB"
-            },
-            "confirmation": {
-                "type": "redirect",
-                "return_url": f"{settings.FRONTEND_URL}/payment/success"
-            },
-            "description": payment.description,
-            "metadata": {
-                "payment_id": payment.id,
-                "user_id": payment.user.id
-            }
-        }
-        
-        # headers = {
-        #     "Authorization": f"Basic {settings.YOOKASSA_SHOP_ID}:{settings.YOOKASSA_SECRET_KEY}",
-        #     "Idempotence-Key": str(payment.id)
-        # }
-        
-        # response = requests.post(yookassa_url, json=payload, headers=headers)
-        # data = response.json()
-        
-        # return data['confirmation']['confirmation_url']
-        
-        # Заглушка для демонстрации
-        return f"{settings.FRONTEND_URL}/payment/demo/{payment.id}"
+    def create_provider_payment(self, payment):
+        provider = providers.get_provider(payment.payment_method)
+        if not provider.configured:
+            # Ключи провайдера не заданы — демо-режим для разработки, без сетевого вызова
+            checkout.create_at_provider(payment)
+            return payment.confirmation_url
+        
+        # Вызов провайдера с таймаутами и повторами — в воркере process_provider_payments
+        return None
 
-    def create_tbank_payment(self, payment, request):
-        # TODO: Реализовать интеграцию с Т-Банком
-        # Заглушка для демонстрации
-        return f"{settings.FRONTEND_URL}/payment/demo/{payment.id}"
+class PaymentStatusView(APIView):
+    """Статус платежа и ссылка на оплату, когда воркер создал платеж у провайдера."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk):
+        payment = Payment.objects.filter(pk=pk, user=request.user).only(
+            'id', 'status', 'confirmation_url', 'metadata'
+        ).first()
+        if payment is None:
+            return Response({'detail': 'Платеж не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'payment_id': payment.id,
+            'status': payment.status,
+            'payment_url': payment.confirmation_url or None,
+            'error': payment.metadata.get('provider_error')
+        })
 
 class PaymentCallbackView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
+        # Подлинность проверяется до всего остального: payment_id и статус из
+        # неподтвержденного payload воркер применил бы к чужому платежу
+        provider_name = request.query_params.get('provider', '')
+        try:
+            provider = providers.get_provider(provider_name)
+        except providers.ProviderError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not provider.verify_callback(request.data, request.META.get('REMOTE_ADDR')):
+            return Response({'error': 'Подпись callback не прошла проверку'}, status=status.HTTP_403_FORBIDDEN)
+        
         # Валидация входящих данных
         serializer = PaymentCallbackSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        payment_data = serializer.validated_data
-        
-        # Обработка callback от платежной системы
-        # TODO: Реализовать проверку подписи и обработку разных платежных систем
-        
-        payment_id = payment_data.get('metadata', {}).get('payment_id')
-        if not payment_id:
-            # Попробуем найти по ID из платежной системы
-            external_id = payment_data.get('id')
-            if external_id:
-                try:
-                    payment = Payment.objects.get(external_id=external_id)
-                    payment_id = payment.id
-                except Payment.DoesNotExist:
-                    return Response({'error': 'Payment not found by external ID'}, status=status.HTTP_404_NOT_FOUND)
-            else:
-                return Response({'error': 'Payment ID not found'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            payment = Payment.objects.get(id=payment_id)
-        except Payment.DoesNotExist:
-            return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Обновляем статус платежа
-        payment_status = payment_data.get('status')
-        if payment_status == 'succeeded':
-            payment.status = 'completed'
-        elif payment_status in ['canceled', 'failed']:
-            payment.status = 'failed'
-        elif payment_status == 'waiting_for_capture':
-            payment.status = 'pending'
-        
-        payment.external_id = payment_data.get('id', payment.external_id)
-        payment.completed_at = timezone.now() if payment.status == 'completed' else None
-        payment.metadata['callback_data'] = payment_data
-        payment.save()
-        
-        # Если платеж успешен, активируем подписку
-        if payment.status == 'completed':
-            self.activate_subscription(payment)
-        
+        # Только сохраняем callback и сразу отвечаем; платеж и подписку
+        # обновляет воркер process_payment_webhooks
+        webhooks.ingest(request.data, provider=provider_name)
         return Response({'status': 'ok'})
-    
-    def activate_subscription(self, payment):
-        user = payment.user
-        plan = payment.subscription_plan
-        period = payment.metadata.get('period', 'monthly')
-        
-        # Определяем длительность подписки
-        if period == 'yearly':
-            end_date = timezone.now() + timezone.timedelta(days=365)
-        else:
-            end_date = timezone.now() + timezone.timedelta(days=30)
-        
-        # Создаем или обновляем подписку пользователя
-        subscription, created = UserSubscription.objects.get_or_create(
-            user=user,
-            defaults={
-                'plan': plan,
-                'start_date': timezone.now(),
-                'end_date': end_date,
-                'payment': payment,
-                'features': plan.features
-            }
-        )
-        
-        if not created:
-            subscription.plan = plan
-            subscription.start_date = timezone.now()
-            subscription.end_date = end_date
-            subscription.payment = payment
-            subscription.features = plan.features
-            subscription.is_active = True
-            subscription.save()
 
 class UserSubscriptionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -252,23 +186,9 @@ def cancel_subscription(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def check_subscription_features(request):
-    try:
-        subscription = UserSubscription.objects.get(user=request.user, is_active=True)
-        
-        if subscription.end_date < timezone.now():
-            subscription.is_active = False
-            subscription.save()
-            return Response({
-                'has_active_subscription': False,
-                'features': {}
-            })
-        
-        return Response({
-            'has_active_subscription': True,
-            'features': subscription.features
-        })
-    except UserSubscription.DoesNotExist:
-        return Response({
-            'has_active_subscription': False,
-            'features': {}
-        })
\ No newline at end of file
+    # Истечение подписки снимает плановая чистка (expire_subscriptions), чтение ничего не пишет
+    result = entitlements.get_entitlements(request.user)
+    return Response({
+        'has_active_subscription': result['has_active_subscription'],
+        'features': result['features']
+    })
\ No newline at end of file
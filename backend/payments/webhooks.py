@@ -0,0 +1,191 @@
+"""
+Прием и обработка callback'ов платежных систем.
+
+Представление только сохраняет callback в PaymentWebhook и сразу отвечает
+200 — провайдер не ждет ни поиска платежа, ни активации подписки.
+Воркер (process_payment_webhooks) забирает пачку необработанных записей
+с SELECT ... FOR UPDATE SKIP LOCKED, блокирует нужные платежи и применяет
+переходы статуса. Повторный или параллельный callback по тому же платежу
+ничего не меняет: завершенный платеж не откатывается, подписка
+активируется только при переходе в completed. Запись с ошибкой
+откладывается до next_attempt_at с экспоненциальной паузой
+(RETRY_BACKOFF * 2^(attempts-1), не больше RETRY_BACKOFF_MAX) и после
+MAX_ATTEMPTS попыток помечается failed.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Payment, PaymentWebhook
+
+
+BATCH_SIZE = getattr(settings, 'PAYMENT_WEBHOOK_BATCH_SIZE', 100)
+MAX_ATTEMPTS = getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 5)
+RETRY_BACKOFF = getattr(settings, 'PAYMENT_WEBHOOK_RETRY_BACKOFF', 30)
+RETRY_BACKOFF_MAX = getattr(settings, 'PAYMENT_WEBHOOK_RETRY_BACKOFF_MAX', 3600)
+
+STATUS_MAP = {
+    'succeeded': 'completed',
+    'completed': 'completed',
+    'canceled': 'failed',
+    'failed': 'failed',
+    'waiting_for_capture': 'pending',
+    'pending': 'pending',
+}
+FINAL_STATUSES = ('completed', 'failed')
+
+
+def _payment_object(payload):
+    # ЮKassa присылает {'event': ..., 'object': {...}}, остальные — плоский объект
+    obj = payload.get('object')
+    return obj if isinstance(obj, dict) else payload
+
+
+def parse(payload):
+    """(внутренний id платежа | None, внешний id, статус провайдера)."""
+    obj = _payment_object(payload)
+    metadata = obj.get('metadata') or payload.get('metadata') or {}
+    payment_id = metadata.get('payment_id') or payload.get('payment_id')
+    try:
+        payment_id = int(payment_id) if payment_id not in (None, '') else None
+    except (TypeError, ValueError):
+        payment_id = None
+    return payment_id, str(obj.get('id') or payload.get('id') or ''), obj.get('status') or payload.get('status')
+
+
+def ingest(payload, provider=''):
+    _, external_id, _ = parse(payload)
+    event = payload.get('event') or payload.get('type') or ''
+    return PaymentWebhook.objects.create(
+        provider=provider, external_id=external_id, event=event, payload=payload
+    )
+
+
+def _lock_payments(webhooks):
+    ids, external_ids = set(), set()
+    for webhook in webhooks:
+        payment_id, external_id, _ = parse(webhook.payload)
+        if payment_id:
+            ids.add(payment_id)
+        if external_id:
+            external_ids.add(external_id)
+    if not ids and not external_ids:
+        return {}, {}
+    # Блокируем в порядке id, чтобы параллельные воркеры не взаимоблокировались
+    payments = list(
+        Payment.objects.select_for_update()
+        .filter(Q(id__in=ids) | Q(external_id__in=external_ids))
+        .select_related('user', 'subscription_plan')
+        .order_by('id')
+    )
+    return (
+        {payment.id: payment for payment in payments},
+        {payment.external_id: payment for payment in payments if payment.external_id}
+    )
+
+
+def apply(webhook, payment):
+    """Применяет callback к заблокированному платежу, возвращает итоговый статус записи."""
+    _, external_id, provider_status = parse(webhook.payload)
+    new_status = STATUS_MAP.get(provider_status)
+    if new_status is None:
+        return 'ignored'
+
+    # Идемпотентность: повтор того же статуса и откат из завершенного — без изменений
+    if payment.status == new_status or payment.status == 'completed':
+        return 'ignored'
+    if payment.status in FINAL_STATUSES and new_status == 'pending':
+        return 'ignored'
+    if payment.external_id and external_id and payment.external_id != external_id:
+        raise ValueError(f'external_id {external_id} не совпадает с платежом {payment.pk}')
+
+    payment.status = new_status
+    payment.external_id = external_id or payment.external_id
+    payment.completed_at = timezone.now() if new_status == 'completed' else None
+    payment.metadata['callback_data'] = webhook.payload
+    payment.save(update_fields=['status', 'external_id', 'completed_at', 'metadata', 'updated_at'])
+
+    if new_status == 'completed':
+        activate_subscription(payment)
+    return 'processed'
+
+
+def activate_subscription(payment):
+    from users.models import UserSubscription
+
+    plan = payment.subscription_plan
+    period = payment.metadata.get('period', 'monthly')
+    now = timezone.now()
+    subscription = UserSubscription.objects.select_for_update().filter(user=payment.user).first()
+
+    # Продление, оплаченное до окончания периода, начинается с текущей end_date
+    start_date = now
+    if subscription is not None and payment.renewal_of_id == subscription.id \
+            and subscription.is_active and subscription.end_date and subscription.end_date > now:
+        start_date = subscription.end_date
+    values = {
+        'plan': plan,
+        'start_date': start_date,
+        'end_date': start_date + timezone.timedelta(days=365 if period == 'yearly' else 30),
+        'payment': payment,
+        'features': plan.features,
+        'is_active': True
+    }
+
+    if subscription is None:
+        UserSubscription.objects.create(user=payment.user, **values)
+        return
+    for attr, value in values.items():
+        setattr(subscription, attr, value)
+    subscription.save()
+
+
+def retry_delay(attempts):
+    return timezone.timedelta(seconds=min(RETRY_BACKOFF * 2 ** (attempts - 1), RETRY_BACKOFF_MAX))
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Обрабатывает одну пачку; возвращает число обработанных записей."""
+    now = timezone.now()
+    with transaction.atomic():
+        webhooks = list(
+            PaymentWebhook.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .order_by('received_at', 'id')[:batch_size]
+        )
+        if not webhooks:
+            return 0
+        by_id, by_external_id = _lock_payments(webhooks)
+
+        for webhook in webhooks:
+            payment_id, external_id, _ = parse(webhook.payload)
+            payment = by_id.get(payment_id) or by_external_id.get(external_id)
+            webhook.attempts += 1
+            try:
+                if payment is None:
+                    raise LookupError('Платеж не найден')
+                # Точка сохранения: ошибка одного callback не откатывает всю пачку
+                with transaction.atomic():
+                    webhook.status = apply(webhook, payment)
+                webhook.error = ''
+                webhook.next_attempt_at = None
+            except Exception as exc:
+                if payment is not None:
+                    # Изменения в памяти откатились вместе с точкой сохранения
+                    payment.refresh_from_db()
+                webhook.error = str(exc)
+                if webhook.attempts >= MAX_ATTEMPTS:
+                    webhook.status = 'failed'
+                    webhook.next_attempt_at = None
+                else:
+                    webhook.status = 'pending'
+                    webhook.next_attempt_at = now + retry_delay(webhook.attempts)
+            webhook.processed_at = now
+
+        PaymentWebhook.objects.bulk_update(
+            webhooks, ['status', 'attempts', 'next_attempt_at', 'processed_at', 'error']
+        )
+    return len(webhooks)
@@ -0,0 +1,454 @@
+"""
+Потоковый импорт и экспорт каталога: стартапы, инвесторы, позиции портфеля.
+
+Импорт читает CSV или JSONL построчно, проверяет строки существующими
+сериализаторами пачками по BATCH_SIZE и пишет пачку одним
+bulk_create: строки с id — upsert (ON CONFLICT (id) DO UPDATE), без id —
+вставка. Если upsert создал строки с явными id, последовательность PK
+подтягивается к max(id), чтобы следующие вставки не получили занятый ключ.
+Ошибки копятся по номерам строк и не останавливают импорт; в отчет попадают
+первые MAX_REPORTED_ERRORS, остальные только считаются.
+Экспорт идет через server-side курсор (iterator), поэтому память не
+зависит от размера таблицы.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from itertools import islice
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, renderers, serializers, status
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+
+from startup_platform import search, stats
+from startup_platform.response_cache import invalidate_tags
+
+
+BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+LIST_SEPARATOR = ';'
+MAX_REPORTED_ERRORS = 100
+
+
+class Dataset:
+    """Описание импортируемой сущности."""
+
+    def __init__(self, name, model, serializer_class, owner_field=None, parent_field=None,
+                 parent_owner_field=None, list_fields=(), nested_fields=(), tag=None, detail_tag=None,
+                 stats_key=None, searchable=False, refresh_parents=None):
+        self.name = name
+        self.model = model
+        self.serializer_class = serializer_class
+        self.owner_field = owner_field
+        self.parent_field = parent_field
+        self.parent_owner_field = parent_owner_field
+        self.list_fields = list_fields
+        self.nested_fields = nested_fields
+        self.tag = tag
+        self.detail_tag = detail_tag
+        self.stats_key = stats_key
+        self.searchable = searchable
+        self.refresh_parents = refresh_parents
+
+    @property
+    def parent_model(self):
+        return self.model._meta.get_field(self.parent_field).related_model
+
+    def export_fields(self):
+        return [
+            field for field in self.model._meta.concrete_fields
+            if field.name != search.VECTOR_FIELD
+        ]
+
+    def after_import(self, created_ids, updated_ids, parent_ids):
+        """Замена сигналов post_save, которые bulk_create не отправляет."""
+        ids = list(created_ids) + list(updated_ids)
+        if self.searchable and ids:
+            search.update_search_vector(self.model, {'pk__in': ids})
+        if self.tag:
+            invalidate_tags(self.tag, *(f'{self.detail_tag}:{pk}' for pk in updated_ids))
+        if self.stats_key:
+            stats.invalidate(self.stats_key)
+        if self.refresh_parents and parent_ids:
+            self.refresh_parents(parent_ids)
+
+
+def _refresh_portfolio_owners(investor_ids):
+    from investors.services import update_investor_portfolio_totals
+
+    for investor_id in investor_ids:
+        update_investor_portfolio_totals(investor_id)
+    invalidate_tags('investors', *(f'investor:{pk}' for pk in investor_ids))
+    stats.invalidate(stats.INVESTOR_STATS_KEY)
+
+
+def import_serializer(model, fields):
+    """
+    Плоский сериализатор строки импорта: только собственные поля модели.
+    Владелец, родитель и агрегаты (rating, views_count, ...) из файла не берутся.
+    """
+    meta = type('Meta', (), {'model': model, 'fields': fields})
+    return type(f'{model.__name__}ImportSerializer', (serializers.ModelSerializer,), {'Meta': meta})
+
+
+def get_datasets():
+    from investors.models import Investor, InvestorPortfolio
+    from startups.models import Startup
+
+    return {
+        'startups': Dataset(
+            'startups', Startup, import_serializer(Startup, [
+                'name', 'description', 'stage', 'industry', 'funding_requested', 'founded_year', 'website'
+            ]),
+            owner_field='created_by', nested_fields=('team_members',), tag='startups', detail_tag='startup',
+            stats_key=stats.STARTUP_STATS_KEY, searchable=True
+        ),
+        'investors': Dataset(
+            'investors', Investor, import_serializer(Investor, [
+                'name', 'investor_type', 'preferred_industries', 'preferred_stages',
+                'min_investment_amount', 'max_investment_amount'
+            ]),
+            owner_field='created_by', nested_fields=('portfolio_items',),
+            tag='investors', detail_tag='investor',
+            stats_key=stats.INVESTOR_STATS_KEY, searchable=True
+        ),
+        'portfolio': Dataset(
+            'portfolio', InvestorPortfolio, import_serializer(InvestorPortfolio, [
+                'company_name', 'investment_amount', 'investment_date', 'investment_type'
+            ]),
+            parent_field='investor', parent_owner_field='created_by',
+            refresh_parents=_refresh_portfolio_owners
+        ),
+    }
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        # Плохой файл не должен раздувать ответ: подробности — только по первым строкам
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def read_rows(stream, fmt, dataset):
+    """Генератор (номер строки, dict | None, ошибка | None)."""
+    if fmt == 'csv':
+        # Номер строки — с учетом заголовка
+        for line, row in enumerate(csv.DictReader(stream), start=2):
+            row = {key: value for key, value in row.items() if key and value != ''}
+            for name in dataset.list_fields:
+                if name in row:
+                    row[name] = [value for value in row[name].split(LIST_SEPARATOR) if value]
+            yield line, row, None
+        return
+
+    for line, text in enumerate(stream, start=1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield line, None, {'non_field_errors': [f'Некорректный JSON: {exc}']}
+            continue
+        if not isinstance(row, dict):
+            yield line, None, {'non_field_errors': ['Строка должна быть JSON-объектом']}
+            continue
+        yield line, row, None
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _parse_id(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+
+def import_rows(dataset, rows, owner=None, restrict_to_owner=False, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    rows — результат read_rows. owner становится владельцем новых записей;
+    при restrict_to_owner обновлять можно только свои записи (для API).
+    """
+    report = ImportReport()
+    for batch in _batches(rows, batch_size):
+        valid = _validate_batch(dataset, batch, owner, restrict_to_owner, report)
+        if dry_run or not valid:
+            continue
+        created, updated = _write_batch(dataset, valid, owner)
+        report.created += len(created)
+        report.updated += len(updated)
+        parent_ids = {parent_id for _, _, _, parent_id in valid if parent_id is not None}
+        dataset.after_import(created, updated, parent_ids)
+    return report
+
+
+def _validate_batch(dataset, batch, owner, restrict_to_owner, report):
+    model = dataset.model
+    candidates = []
+    for line, row, error in batch:
+        if error:
+            report.add_error(line, error)
+            continue
+        row = dict(row)
+        try:
+            pk = _parse_id(row.pop('id', None))
+            parent_id = _parse_id(row.pop(dataset.parent_field, None)) if dataset.parent_field else None
+        except (TypeError, ValueError):
+            report.add_error(line, {'id': ['Ожидается целое число']})
+            continue
+        if dataset.parent_field and parent_id is None:
+            report.add_error(line, {dataset.parent_field: ['Обязательное поле']})
+            continue
+        for name in dataset.nested_fields:
+            row.pop(name, None)
+        candidates.append((line, pk, parent_id, dataset.serializer_class(data=row)))
+
+    # Права и существование — одним запросом на пачку, а не на строку
+    pks = [pk for _, pk, _, _ in candidates if pk is not None]
+    allowed_pks = None
+    if restrict_to_owner and pks:
+        owned = model.objects.filter(pk__in=pks)
+        if dataset.owner_field:
+            owned = owned.filter(**{dataset.owner_field: owner})
+        else:
+            owned = owned.filter(**{f'{dataset.parent_field}__{dataset.parent_owner_field}': owner})
+        allowed_pks = set(owned.values_list('pk', flat=True))
+
+    allowed_parents = set()
+    parent_ids = {parent_id for _, _, parent_id, _ in candidates if parent_id is not None}
+    if parent_ids:
+        parents = dataset.parent_model.objects.filter(pk__in=parent_ids)
+        if restrict_to_owner:
+            parents = parents.filter(**{dataset.parent_owner_field: owner})
+        allowed_parents = set(parents.values_list('pk', flat=True))
+
+    valid = []
+    for line, pk, parent_id, serializer in candidates:
+        if allowed_pks is not None and pk is not None and pk not in allowed_pks:
+            report.add_error(line, {'id': ['Запись не найдена']})
+            continue
+        if dataset.parent_field and parent_id not in allowed_parents:
+            report.add_error(line, {dataset.parent_field: ['Запись не найдена']})
+            continue
+        if not serializer.is_valid():
+            report.add_error(line, serializer.errors)
+            continue
+        valid.append((line, pk, dict(serializer.validated_data), parent_id))
+    return valid
+
+
+def _write_batch(dataset, valid, owner):
+    model = dataset.model
+    list_values = {}
+    # Строки с разным набором колонок пишутся отдельно: upsert не должен
+    # затирать значениями по умолчанию поля, которых в строке не было
+    groups = {}
+    for line, pk, data, parent_id in valid:
+        lists = {name: data.pop(name) for name in dataset.list_fields if name in data}
+        obj = model(pk=pk, **data)
+        if dataset.owner_field:
+            # Для существующих строк владелец в update_fields не входит и не меняется
+            setattr(obj, dataset.owner_field, owner)
+        if dataset.parent_field:
+            setattr(obj, f'{dataset.parent_field}_id', parent_id)
+        groups.setdefault((pk is not None, frozenset(data)), []).append(obj)
+        list_values[id(obj)] = (obj, lists)
+
+    pks = [pk for _, pk, _, _ in valid if pk is not None]
+    existing = set(model.objects.filter(pk__in=pks).values_list('pk', flat=True)) if pks else set()
+
+    created, updated = [], []
+    with transaction.atomic():
+        # Сначала строки с явным id и сдвиг последовательности, затем вставки без id:
+        # иначе новая строка может получить id, который upsert ниже перезапишет
+        explicit_created = False
+        for (has_pk, fields), objs in sorted(groups.items(), key=lambda item: not item[0][0]):
+            if not has_pk:
+                if explicit_created:
+                    _reset_sequence(model)
+                    explicit_created = False
+                # Без upsert PostgreSQL возвращает id новых строк
+                model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+                created.extend(obj.pk for obj in objs)
+                continue
+            update_fields = sorted(fields)
+            if dataset.parent_field:
+                update_fields.append(dataset.parent_field)
+            model.objects.bulk_create(
+                objs, batch_size=BATCH_SIZE,
+                update_conflicts=True, unique_fields=['id'], update_fields=update_fields
+            )
+            for obj in objs:
+                if obj.pk in existing:
+                    updated.append(obj.pk)
+                else:
+                    created.append(obj.pk)
+                    explicit_created = True
+        if explicit_created:
+            _reset_sequence(model)
+        _write_lists(model, dataset.list_fields, list_values.values())
+    return created, updated
+
+
+def _reset_sequence(model):
+    """Явные id при вставке не двигают последовательность PK — подтягиваем ее к max(id)."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def _write_lists(model, list_fields, items):
+    for name in list_fields:
+        field = model._meta.get_field(name)
+        through = field.remote_field.through
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        touched = [(obj, lists[name]) for obj, lists in items if name in lists]
+        if not touched:
+            continue
+        through.objects.filter(**{f'{source}_id__in': [obj.pk for obj, _ in touched]}).delete()
+        through.objects.bulk_create([
+            through(**{f'{source}_id': obj.pk, f'{target}_id': int(value)})
+            for obj, values in touched
+            for value in set(values)
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_rows(dataset, fmt, queryset=None):
+    """Генератор текстовых кусков CSV/JSONL; строки читаются курсором по EXPORT_CHUNK_SIZE."""
+    queryset = dataset.model.objects.all() if queryset is None else queryset
+    fields = [field.attname for field in dataset.export_fields()]
+    names = [field.name for field in dataset.export_fields()]
+    annotations = {
+        f'export_{name}': ArrayAgg(name, filter=Q(**{f'{name}__isnull': False}), distinct=True)
+        for name in dataset.list_fields
+    } if connection.vendor == 'postgresql' else {}
+    rows = (
+        queryset.order_by('pk')
+        .annotate(**annotations)
+        .values_list(*fields, *annotations)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    columns = names + [name for name in dataset.list_fields if f'export_{name}' in annotations]
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in rows:
+            values = list(row[:len(fields)])
+            values.extend(LIST_SEPARATOR.join(str(value) for value in (items or [])) for items in row[len(fields):])
+            writer.writerow(['' if value is None else value for value in values])
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    for row in rows:
+        record = dict(zip(columns, row))
+        for name in dataset.list_fields:
+            if name in record:
+                record[name] = record[name] or []
+        yield json.dumps(record, ensure_ascii=False, default=_json_default) + '\n'
+
+
+class ExportRenderer(renderers.BaseRenderer):
+    """
+    Тело экспорта — StreamingHttpResponse, рендерер нужен только DRF: без него
+    ?format=csv|jsonl уходит в согласование формата и дает 404. Ошибки — JSON.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JSONLinesExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+
+def _dataset_or_404(name):
+    return get_datasets().get(name)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def import_view(request, dataset):
+    spec = _dataset_or_404(dataset)
+    if spec is None:
+        return Response({'error': 'Неизвестный набор данных'}, status=status.HTTP_404_NOT_FOUND)
+    upload = request.FILES.get('file')
+    fmt = request.data.get('format') or ('jsonl' if upload and upload.name.endswith('.jsonl') else 'csv')
+    if upload is None or fmt not in FORMATS:
+        return Response(
+            {'error': 'Нужен файл file в формате csv или jsonl'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    report = import_rows(
+        spec, read_rows(stream, fmt, spec),
+        owner=request.user, restrict_to_owner=not request.user.is_staff, dry_run=dry_run
+    )
+    return Response(report.as_dict())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+@renderer_classes([renderers.JSONRenderer, CSVExportRenderer, JSONLinesExportRenderer])
+def export_view(request, dataset):
+    spec = _dataset_or_404(dataset)
+    fmt = request.query_params.get('format', 'csv')
+    if spec is None or fmt not in FORMATS:
+        return Response({'error': 'Неизвестный набор данных или формат'}, status=status.HTTP_404_NOT_FOUND)
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(export_rows(spec, fmt), content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
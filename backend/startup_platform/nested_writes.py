@@ -0,0 +1,75 @@
+"""
+Запись вложенных списков (команда, изображения, портфель) пачками.
+
+Входящий список сравнивается с уже сохраненными строками родителя:
+элементы с id существующей строки обновляются (только измененные поля,
+один bulk_update), элементы без id — создаются одним bulk_create, строки,
+которых нет во входящем списке, удаляются одним DELETE. Число запросов не
+зависит от длины списка.
+"""
+
+from django.db import models, transaction
+
+
+def _assign(obj, data):
+    """Присваивает значения, возвращает имена реально изменившихся полей."""
+    changed = []
+    for name, value in data.items():
+        field = obj._meta.get_field(name)
+        if isinstance(field, models.FileField):
+            setattr(obj, name, value)
+            if not getattr(obj, name)._committed:
+                changed.append(name)
+            continue
+        old = getattr(obj, field.attname)
+        setattr(obj, name, value)
+        if getattr(obj, field.attname) != old:
+            changed.append(name)
+    return changed
+
+
+def write_children(parent, related_name, items):
+    """
+    parent — сохраненный объект, related_name — обратная связь на дочернюю
+    модель, items — validated_data вложенного сериализатора (список словарей,
+    у существующих элементов есть 'id'). Возвращает (создано, обновлено, удалено).
+    """
+    relation = getattr(parent, related_name)
+    model = relation.model
+    fk_name = relation.field.name
+    existing = {obj.pk: obj for obj in relation.all()}
+
+    to_create, to_update, fields = [], [], set()
+    for item in items:
+        item = dict(item)
+        obj = existing.pop(item.pop('id', None), None)
+        if obj is None:
+            to_create.append(model(**{fk_name: parent}, **item))
+            continue
+        changed = _assign(obj, item)
+        if changed:
+            to_update.append(obj)
+            fields.update(changed)
+
+    if to_update:
+        # bulk_update не вызывает pre_save: файлы и auto_now обрабатываем сами
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                fields.add(field.name)
+        update_fields = [model._meta.get_field(name) for name in fields]
+        for obj in to_update:
+            for field in update_fields:
+                setattr(obj, field.attname, field.pre_save(obj, False))
+
+    if not (existing or to_update or to_create):
+        return 0, 0, 0
+
+    with transaction.atomic():
+        if existing:
+            model.objects.filter(pk__in=list(existing)).delete()
+        if to_update:
+            model.objects.bulk_update(to_update, sorted(fields))
+        if to_create:
+            model.objects.bulk_create(to_create)
+
+    return len(to_create), len(to_update), len(existing)
@@ -0,0 +1,188 @@
+"""
+Пагинация каталогов стартапов и инвесторов.
+
+По умолчанию — обычная постраничная (page/page_size). С параметром
+pagination=cursor (или cursor=...) включается keyset-режим: следующая
+страница выбирается сравнением строк (поле, id) < (значение, id), которое
+PostgreSQL ведет как диапазон по составному индексу, без OFFSET, поэтому
+глубокие страницы стоят столько же, сколько первая. Индексы моделей
+объявлены в том же направлении, что и ORDER BY (поле DESC, id DESC);
+восходящая сортировка читает их обратным сканом.
+
+Сортировка по релевантности поиска (-search_rank, FullTextSearchFilter)
+тоже поддерживается: курсор хранит ранг последней строки.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, Expression, F, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RowValueCompare(Expression):
+    """(a, b) < (x, y) — сравнение строк целиком, а не раскрытое в OR по полям."""
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, lhs, op, rhs):
+        super().__init__()
+        self.lhs = list(lhs)
+        self.op = op
+        self.rhs = list(rhs)
+
+    def get_source_expressions(self):
+        return [*self.lhs, *self.rhs]
+
+    def set_source_expressions(self, exprs):
+        self.lhs, self.rhs = exprs[:len(self.lhs)], exprs[len(self.lhs):]
+
+    def as_sql(self, compiler, connection):
+        sides, params = [], []
+        for side in (self.lhs, self.rhs):
+            parts = []
+            for expr in side:
+                sql, part_params = compiler.compile(expr)
+                parts.append(sql)
+                params.extend(part_params)
+            sides.append(f"({', '.join(parts)})")
+        return f'{sides[0]} {self.op} {sides[1]}', params
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    tiebreaker = 'id'
+    # Аннотации, по которым можно листать курсором (FullTextSearchFilter)
+    annotation_orderings = ('search_rank',)
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset, view)
+        if self.field in queryset.query.annotations:
+            self.model_field = queryset.query.annotations[self.field].output_field
+        else:
+            self.model_field = queryset.model._meta.get_field(self.field)
+
+        queryset = queryset.order_by(*self.get_order_by())
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_cursor_filter(*cursor))
+
+        # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset, view):
+        # Первое поле сортировки, выставленной OrderingFilter или view.ordering
+        ordering = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or ['-created_at'])
+        field = ordering[0]
+        if not isinstance(field, str):
+            field = '-created_at'
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+
+        if field in self.annotation_orderings and field in queryset.query.annotations:
+            return field, descending
+
+        allowed = getattr(view, 'ordering_fields', None) or []
+        if field not in allowed and field != 'created_at':
+            field, descending = 'created_at', True
+        return field, descending
+
+    def get_order_by(self):
+        # NULLS LAST указывается только для nullable-полей: для NOT NULL колонок
+        # ORDER BY совпадает с индексом (поле DESC, id DESC) буквально
+        nulls_last = self.model_field.null or None
+        if self.descending:
+            return [F(self.field).desc(nulls_last=nulls_last), F(self.tiebreaker).desc()]
+        return [F(self.field).asc(nulls_last=nulls_last), F(self.tiebreaker).asc()]
+
+    def get_cursor_filter(self, value, pk):
+        op, lookup = ('<', 'lt') if self.descending else ('>', 'gt')
+
+        # NULL-значения идут в конце выдачи в обоих направлениях
+        if value is None:
+            return Q(**{f'{self.field}__isnull': True, f'{self.tiebreaker}__{lookup}': pk})
+
+        condition = Q(RowValueCompare(
+            [F(self.field), F(self.tiebreaker)], op,
+            [Value(value, output_field=self.model_field), Value(pk)]
+        ))
+        if self.model_field.null:
+            condition |= Q(**{f'{self.field}__isnull': True})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value = payload['v']
+            if value is not None:
+                value = self.model_field.to_python(value)
+            return value, int(payload['id'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        payload = {
+            'v': getattr(instance, self.field),
+            'id': getattr(instance, self.tiebreaker),
+        }
+        # default=str сохраняет микросекунды datetime и точность Decimal
+        raw = json.dumps(payload, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        url = replace_query_param(url, 'pagination', 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class CatalogPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        params = request.query_params
+        if params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
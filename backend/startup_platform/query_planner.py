@@ -0,0 +1,96 @@
+"""
+Планировщик запросов для списков DRF.
+
+По полям сериализатора определяет, какие связи нужно подтянуть через
+select_related/prefetch_related, чтобы страница любого размера
+загружалась фиксированным числом запросов.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import relations, serializers
+
+
+_plans = {}
+
+
+def _is_to_many(field):
+    return field.many_to_many or field.one_to_many
+
+
+def _walk(model, serializer, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if isinstance(field, serializers.ListSerializer):
+            target = field.child
+        elif isinstance(field, relations.ManyRelatedField):
+            target = field.child_relation
+        else:
+            target = field
+
+        if field.source == '*':
+            if isinstance(target, serializers.BaseSerializer):
+                _walk(model, target, prefix, in_prefetch, select, prefetch)
+            continue
+
+        current_model = model
+        path = prefix
+        many = in_prefetch
+        attrs = field.source.split('.')
+        for index, attr in enumerate(attrs):
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+
+            is_last = index == len(attrs) - 1
+            # PrimaryKeyRelatedField по FK читает только <fk>_id, запрос не нужен
+            if (is_last and not _is_to_many(model_field)
+                    and isinstance(target, relations.PrimaryKeyRelatedField)):
+                break
+
+            path = f"{path}__{attr}" if path else attr
+            many = many or _is_to_many(model_field)
+            (prefetch if many else select).add(path)
+            current_model = model_field.related_model
+
+            if is_last and isinstance(target, serializers.BaseSerializer):
+                _walk(current_model, target, path, many, select, prefetch)
+
+
+def plan_for(serializer_class, model):
+    """Возвращает (select_related, prefetch_related) для сериализатора."""
+    key = (serializer_class, model)
+    if key not in _plans:
+        select, prefetch = set(), set()
+        _walk(model, serializer_class(), '', False, select, prefetch)
+        # Префетч вложенного пути уже подтягивает родительский
+        prefetch = {
+            path for path in prefetch
+            if not any(other.startswith(path + '__') for other in prefetch)
+        }
+        _plans[key] = (sorted(select), sorted(prefetch))
+    return _plans[key]
+
+
+def plan_queryset(queryset, serializer_class):
+    select, prefetch = plan_for(serializer_class, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class QueryPlannerMixin:
+    """
+    Подмешивается в generic-представления: после фильтрации применяет
+    select_related/prefetch_related, выведенные из serializer_class.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return plan_queryset(queryset, self.get_serializer_class())
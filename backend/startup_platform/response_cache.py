@@ -0,0 +1,122 @@
+"""
+Read-through кэш ответов публичных каталогов для анонимных пользователей.
+
+Ключ строится из пути, нормализованных GET-параметров и текущих версий
+тегов представления. Инвалидация — увеличение версии тега: записи со
+старой версией больше не находятся и вытесняются по TTL, остальные
+не затрагиваются. Ответ хранится уже отрендеренным вместе с ETag, так что
+повторный клиент с If-None-Match получает 304 без обращения к БД.
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+
+
+RESPONSE_CACHE_TTL = getattr(settings, 'RESPONSE_CACHE_TTL', 300)
+
+
+def _tag_key(tag):
+    return f'resp-tag:{tag}'
+
+
+def invalidate_tags(*tags):
+    for tag in tags:
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            cache.set(_tag_key(tag), 1, None)
+
+
+def tag_versions(tags):
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    return [versions.get(key, 0) for key in keys]
+
+
+def normalized_query(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value != ''
+    )
+    return urlencode(params)
+
+
+def make_etag(content):
+    return '"%s"' % hashlib.md5(content).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+class CachedResponseMixin:
+    """
+    Подмешивается в публичные GET-представления. Наследник задает
+    get_cache_tags(); on_cache_hit() вызывается, если ответ отдан из кэша
+    (например, чтобы все равно учесть просмотр).
+    """
+    cache_ttl = RESPONSE_CACHE_TTL
+
+    def get_cache_tags(self):
+        return []
+
+    def on_cache_hit(self, request, *args, **kwargs):
+        pass
+
+    def is_cacheable(self, request):
+        if request.method != 'GET':
+            return False
+        if request.META.get('HTTP_AUTHORIZATION'):
+            return False
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return False
+        # Кэшируем только JSON, не browsable API
+        return 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+
+    def get_cache_key(self, request):
+        tags = self.get_cache_tags()
+        versions = '.'.join(str(version) for version in tag_versions(tags))
+        raw = f'{request.path}?{normalized_query(request)}|{versions}'
+        return 'resp:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+    def dispatch(self, request, *args, **kwargs):
+        self.args, self.kwargs = args, kwargs
+        if not self.is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            etag, content, content_type = entry
+            self.on_cache_hit(request, *args, **kwargs)
+            if etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+
+        response.render()
+        etag = make_etag(response.content)
+        response['ETag'] = etag
+        cache.set(key, (etag, response.content, response['Content-Type']), self.cache_ttl)
+        if etag_matches(request, etag):
+            not_modified = HttpResponseNotModified()
+            not_modified['ETag'] = etag
+            return not_modified
+        return response
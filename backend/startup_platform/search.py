@@ -0,0 +1,89 @@
+"""
+Полнотекстовый поиск по каталогам.
+
+На PostgreSQL модели хранят предвычисленный tsvector (русская и английская
+морфология), покрытый GIN-индексом; поиск ранжируется по релевантности.
+На других СУБД (SQLite в тестах) фильтр откатывается к icontains,
+как обычный filters.SearchFilter.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.db.models.signals import post_save
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+SEARCH_CONFIGS = ('russian', 'english')
+VECTOR_FIELD = 'search_vector'
+
+_registry = {}
+
+
+def build_vector(weights):
+    vector = None
+    for config in SEARCH_CONFIGS:
+        for field, weight in weights.items():
+            part = SearchVector(field, weight=weight, config=config)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vector(model, pk_filter):
+    if connection.vendor != 'postgresql':
+        return
+    model.objects.filter(**pk_filter).update(**{VECTOR_FIELD: build_vector(_registry[model])})
+
+
+def _on_save(sender, instance, update_fields=None, **kwargs):
+    weights = _registry[sender]
+    # Сохранение без текстовых полей (например, счетчиков) вектор не меняет
+    if update_fields is not None and not set(update_fields) & set(weights):
+        return
+    update_search_vector(sender, {'pk': instance.pk})
+
+
+def register(model, weights):
+    """
+    Подключает модель к поиску: weights — {'поле': 'A'|'B'|'C'|'D'}.
+    Модель должна объявлять SearchVectorField с именем search_vector
+    и GinIndex по нему в Meta.indexes.
+    """
+    _registry[model] = weights
+    post_save.connect(_on_save, sender=model, dispatch_uid=f'search_vector_{model._meta.label_lower}')
+
+
+def rebuild(model):
+    update_search_vector(model, {})
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Замена filters.SearchFilter. Ставится в filter_backends после
+    OrderingFilter: без явного ?ordering= выдача сортируется по релевантности.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms or queryset.model not in _registry:
+            return super().filter_queryset(request, queryset, view)
+
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        query = None
+        for config in SEARCH_CONFIGS:
+            part = SearchQuery(terms, config=config, search_type='websearch')
+            query = part if query is None else query | part
+
+        # ts_rank возвращает real; приводим к double precision, чтобы ранг в курсоре
+        # keyset-пагинации без потерь совпадал со значением в запросе
+        queryset = queryset.filter(**{VECTOR_FIELD: query}).annotate(
+            search_rank=Cast(SearchRank(F(VECTOR_FIELD), query), FloatField())
+        )
+
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     #'messaging',
     #'moderation',
     #'payments',
+    #'matching',
 ]
 
 AUTH_USER_MODEL = "users.CustomUser" 
@@ -44,6 +45,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.PresenceMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -126,4 +128,96 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 # Custom User Model
-AUTH_USER_MODEL = 'users.CustomUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'users.CustomUser'
+
+# Redis (если не задан — используются in-process заглушки)
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Cache
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Статистика платформы: TTL кэша в секундах
+STATS_CACHE_TTL = 60
+
+# Кэш ответов публичных каталогов для анонимных пользователей
+RESPONSE_CACHE_TTL = 300
+
+# Буферизованные счетчики просмотров
+VIEW_COUNTERS_FLUSH_INTERVAL = 30
+VIEW_COUNTERS_MODELS = ['startups.Startup', 'investors.Investor']
+
+# Подбор инвесторов: сколько пар хранить для каждого профиля
+MATCHING_TOP_N = 50
+
+
+# Channels: слой для рассылки сообщений чата
+ASGI_APPLICATION = 'startup_platform.asgi.application'
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+# Присутствие онлайн: срок жизни соединения без heartbeat и период сброса last_activity в БД
+PRESENCE_TTL = 60
+PRESENCE_FLUSH_INTERVAL = 30
+
+# Чат: окно group-commit записи сообщений из WebSocket в секундах (0 — писать сразу)
+CHAT_GROUP_COMMIT_WINDOW = 0
+
+# Платежные callback-и: размер пачки воркера, число попыток обработки
+# и пауза перед повтором в секундах (удваивается с каждой попыткой, до _MAX)
+PAYMENT_WEBHOOK_BATCH_SIZE = 100
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = 5
+PAYMENT_WEBHOOK_RETRY_BACKOFF = 30
+PAYMENT_WEBHOOK_RETRY_BACKOFF_MAX = 3600
+
+# Создание платежей у провайдера (manage.py process_provider_payments): размер пачки воркера
+PAYMENT_CHECKOUT_BATCH_SIZE = 20
+
+# Кэш прав по подписке (payments.entitlements), секунды; сбрасывается сигналами
+ENTITLEMENTS_CACHE_TTL = 300
+
+# Продление и истечение подписок (manage.py process_subscriptions --interval N):
+# за сколько часов до end_date создавать платеж продления и размер пачки
+SUBSCRIPTION_RENEWAL_LEAD_HOURS = 24
+SUBSCRIPTION_BATCH_SIZE = 1000
+
+# Очередь модерации: срок аренды взятых модератором элементов, секунды
+MODERATION_CLAIM_LEASE = 300
+
+# Платежные системы: без ключей CreatePaymentView работает в демо-режиме.
+# base_url можно направить на локальный фейковый сервер (manage.py fake_payment_provider)
+PAYMENT_PROVIDERS = {
+    'yookassa': {
+        'base_url': os.environ.get('YOOKASSA_API_URL', 'https://api.yookassa.ru/v3'),
+        'shop_id': os.environ.get('YOOKASSA_SHOP_ID'),
+        'secret_key': os.environ.get('YOOKASSA_SECRET_KEY'),
+    },
+    'tbank': {
+        'base_url': os.environ.get('TBANK_API_URL', 'https://securepay.tinkoff.ru/v2'),
+        'terminal_key': os.environ.get('TBANK_TERMINAL_KEY'),
+        'password': os.environ.get('TBANK_PASSWORD'),
+    },
+}
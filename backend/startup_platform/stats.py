@@ -0,0 +1,164 @@
+"""
+Статистика платформы для публичных виджетов.
+
+Каждый блок считается минимальным числом сгруппированных запросов и
+кэшируется на короткий TTL. После истечения TTL пересчет выполняет только
+один запрос (взявший блокировку в кэше), остальные отдают прежнее значение,
+поэтому истечение кэша не вызывает волну одинаковых COUNT по всей таблице.
+Сигналы изменения моделей помечают блок устаревшим.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+
+STATS_TTL = getattr(settings, 'STATS_CACHE_TTL', 60)
+LOCK_TIMEOUT = 10
+WAIT_STEP = 0.05
+WAIT_STEPS = 20
+
+STARTUP_STATS_KEY = 'stats:startups'
+INVESTOR_STATS_KEY = 'stats:investors'
+MODERATION_STATS_KEY = 'stats:moderation'
+
+
+def get_cached(key, compute, ttl=STATS_TTL):
+    """Значение из кэша; пересчитывает только вызов, взявший блокировку.
+
+    Если блокировку держит другой пересчет, отдает прежнее значение, а при
+    холодном кэше ждет его результата. Не дождавшись (пересчет завис или
+    упал), считает сам, не трогая чужую блокировку.
+    """
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time():
+            return value
+        # Устарело: пересчитывает только владелец блокировки, остальным — прежнее значение
+        if not cache.add(lock_key, token, LOCK_TIMEOUT):
+            return value
+    elif not cache.add(lock_key, token, LOCK_TIMEOUT):
+        # Холодный кэш, но пересчет уже идет — ждем его результата
+        for _ in range(WAIT_STEPS):
+            time.sleep(WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+            # Пересчет завершился без результата — блокировку берет этот вызов
+            if cache.add(lock_key, token, LOCK_TIMEOUT):
+                break
+
+    try:
+        value = compute()
+        # Храним дольше TTL, чтобы было что отдавать во время пересчета
+        cache.set(key, (value, time.time() + ttl), ttl * 10)
+    finally:
+        # Блокировка могла истечь и перейти к другому пересчету — снимаем только свою
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    return value
+
+
+def invalidate(key):
+    entry = cache.get(key)
+    if entry is not None:
+        cache.set(key, (entry[0], 0), STATS_TTL * 10)
+
+
+def compute_startup_stats():
+    from startups.models import Startup
+
+    startups = Startup.objects.all()
+    totals = startups.aggregate(
+        total=Count('id'),
+        verified=Count('id', filter=Q(is_verified=True)),
+        avg_funding=Avg('funding_requested')
+    )
+    return {
+        'total_startups': totals['total'],
+        'verified_startups': totals['verified'],
+        'average_funding': float(totals['avg_funding'] or 0),
+        'by_stage': list(startups.values('stage').annotate(count=Count('id')).order_by('stage')),
+        'by_industry': list(startups.values('industry').annotate(count=Count('id')).order_by('industry'))
+    }
+
+
+def compute_investor_stats():
+    from investors.models import Investor, InvestorPortfolio
+
+    investors = Investor.objects.all()
+    totals = investors.aggregate(
+        total=Count('id'),
+        verified=Count('id', filter=Q(is_verified=True))
+    )
+    portfolio = InvestorPortfolio.objects.aggregate(
+        count=Count('id'),
+        total=Sum('investment_amount')
+    )
+    return {
+        'total_investors': totals['total'],
+        'verified_investors': totals['verified'],
+        'by_type': list(investors.values('investor_type').annotate(count=Count('id')).order_by('investor_type')),
+        'total_investments': portfolio['count'],
+        'total_invested': float(portfolio['total'] or 0)
+    }
+
+
+def compute_moderation_stats():
+    from moderation import queue
+    from moderation.models import ModerationReport, VerificationRequest
+
+    return {
+        'pending_reports': ModerationReport.objects.filter(status='pending').count(),
+        'pending_verifications': VerificationRequest.objects.filter(status='pending').count(),
+        'reports_by_type': list(
+            ModerationReport.objects.values('report_type').annotate(count=Count('id')).order_by('report_type')
+        ),
+        'queues': queue.metrics()
+    }
+
+
+def compute_online_stats():
+    from users.presence import get_presence
+
+    return get_presence().counts()
+
+
+def get_startup_stats():
+    return get_cached(STARTUP_STATS_KEY, compute_startup_stats)
+
+
+def get_investor_stats():
+    return get_cached(INVESTOR_STATS_KEY, compute_investor_stats)
+
+
+def get_moderation_stats():
+    return get_cached(MODERATION_STATS_KEY, compute_moderation_stats)
+
+
+def get_online_stats():
+    # Счетчики presence читаются без запросов к БД, кэшировать нечего
+    return compute_online_stats()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def platform_stats(request):
+    data = {
+        'startups': get_startup_stats(),
+        'investors': get_investor_stats(),
+        'online': get_online_stats()
+    }
+    user = request.user
+    if user.is_authenticated and user.user_type == 'moderator':
+        data['moderation'] = get_moderation_stats()
+    return Response(data)
@@ -0,0 +1,38 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """
+    Хелпер для TestCase: проверяет, что число SQL-запросов на страницу
+    списка не зависит от количества строк в ней (нет N+1).
+
+    fetch — URL (запрашивается self.client) или функция без аргументов,
+    возвращающая ответ, например вызов представления через APIRequestFactory.
+    """
+
+    def assertConstantQueriesPerPage(self, fetch, create_rows, sizes=(1, 5, 20), expected=None, **params):
+        if isinstance(fetch, str):
+            url = fetch
+
+            def fetch():
+                return self.client.get(url, params)
+
+        counts = {}
+        created = 0
+        for size in sizes:
+            create_rows(size - created)
+            created = size
+
+            with CaptureQueriesContext(connection) as context:
+                response = fetch()
+            self.assertEqual(response.status_code, 200)
+            counts[size] = len(context.captured_queries)
+
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"Число запросов зависит от размера страницы: {counts}"
+        )
+        if expected is not None:
+            self.assertEqual(counts[sizes[0]], expected)
+        return counts[sizes[0]]
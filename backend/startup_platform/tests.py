@@ -0,0 +1,312 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import generics, permissions, serializers
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from investors.models import Investor, InvestorPortfolio
+from moderation.models import ModerationReport, VerificationRequest
+from startups.models import Startup, StartupReview, StartupTeam
+from users.models import CustomUser
+from . import stats, view_counters
+from .query_planner import QueryPlannerMixin, plan_for
+from .testing import QueryCountAssertionsMixin
+from .view_counters import LocalBackend, ViewCounter
+
+
+class CatalogTestMixin:
+    def make_user(self, username='owner', user_type='startup'):
+        return CustomUser.objects.create_user(username=username, password='pass', user_type=user_type)
+
+    def make_startup(self, user, name='Startup', **values):
+        values.setdefault('stage', 'idea')
+        values.setdefault('industry', 'fintech')
+        return Startup.objects.create(created_by=user, name=name, description='', **values)
+
+    def make_investor(self, user, name='Fund', **values):
+        values.setdefault('investor_type', 'fund')
+        return Investor.objects.create(created_by=user, name=name, **values)
+
+
+class ViewCounterTests(CatalogTestMixin, TestCase):
+    """Буфер просмотров: инкременты без записи в БД, сброс пачкой, возврат при ошибке."""
+
+    def setUp(self):
+        user = self.make_user()
+        self.first, self.second = self.make_startup(user, 'first'), self.make_startup(user, 'second')
+        self.counter = ViewCounter(Startup, backend=LocalBackend())
+
+    def views(self, startup):
+        startup.refresh_from_db()
+        return startup.views_count
+
+    def test_increment_does_not_write(self):
+        with mock.patch.object(view_counters, 'FLUSH_INTERVAL', 3600), self.assertNumQueries(0):
+            self.counter.increment(self.first.pk)
+            self.counter.increment(self.first.pk)
+        self.assertEqual(self.views(self.first), 0)
+
+    def test_flush_applies_buffered_counts(self):
+        with mock.patch.object(view_counters, 'FLUSH_INTERVAL', 3600):
+            for _ in range(3):
+                self.counter.increment(self.first.pk)
+            self.counter.increment(self.second.pk)
+
+        # Один UPDATE на каждое уникальное значение прироста
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.counter.flush(), 4)
+        updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.views(self.first), 3)
+        self.assertEqual(self.views(self.second), 1)
+        self.assertEqual(self.counter.flush(), 0)
+
+    def test_flush_by_timer_from_increment(self):
+        with mock.patch.object(view_counters, 'FLUSH_INTERVAL', 0):
+            self.counter.increment(self.first.pk)
+        self.assertEqual(self.views(self.first), 1)
+
+    def test_failed_flush_restores_counts(self):
+        with mock.patch.object(view_counters, 'FLUSH_INTERVAL', 3600):
+            self.counter.increment(self.first.pk)
+            self.counter.increment(self.first.pk)
+
+        with mock.patch.object(Startup.objects, 'filter', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                self.counter.flush()
+        self.assertEqual(self.views(self.first), 0)
+
+        self.assertEqual(self.counter.flush(), 2)
+        self.assertEqual(self.views(self.first), 2)
+
+    def test_failed_timer_flush_does_not_fail_request(self):
+        with mock.patch.object(view_counters, 'FLUSH_INTERVAL', 0), \
+                mock.patch.object(Startup.objects, 'filter', side_effect=RuntimeError('db down')), \
+                self.assertLogs('startup_platform.view_counters', 'ERROR'):
+            self.counter.increment(self.first.pk)
+
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.views(self.first), 1)
+
+    def test_flush_all_counted_models(self):
+        investor = self.make_investor(self.make_user('fund', 'investor'))
+        view_counters.get_view_counter(Startup).increment(self.first.pk)
+        view_counters.get_view_counter(Investor).increment(investor.pk)
+
+        flushed = view_counters.flush_all()
+        self.assertEqual(flushed, {'startups.Startup': 1, 'investors.Investor': 1})
+        self.assertEqual(self.views(self.first), 1)
+        investor.refresh_from_db()
+        self.assertEqual(investor.views_count, 1)
+
+
+class TeamMemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StartupTeam
+        fields = ('member_name', 'role')
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    investor_name = serializers.CharField(source='investor.username')
+
+    class Meta:
+        model = StartupReview
+        fields = ('rating', 'investor_name')
+
+
+class PlannedStartupSerializer(serializers.ModelSerializer):
+    owner = serializers.CharField(source='created_by.username')
+    team_members = TeamMemberSerializer(many=True)
+    reviews = ReviewSerializer(many=True)
+
+    class Meta:
+        model = Startup
+        fields = ('id', 'name', 'owner', 'team_members', 'reviews')
+
+
+class PlannedListView(QueryPlannerMixin, generics.ListAPIView):
+    queryset = Startup.objects.order_by('id')
+    serializer_class = PlannedStartupSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+
+class PlannedDetailView(QueryPlannerMixin, generics.RetrieveAPIView):
+    queryset = Startup.objects.all()
+    serializer_class = PlannedStartupSerializer
+    permission_classes = [permissions.AllowAny]
+
+
+class UnplannedListView(generics.ListAPIView):
+    queryset = Startup.objects.order_by('id')
+    serializer_class = PlannedStartupSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+
+class QueryPlannerTests(QueryCountAssertionsMixin, CatalogTestMixin, TestCase):
+    """Число запросов списка и карточки не зависит от числа строк."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.owner = self.make_user()
+        self.created = 0
+
+    def add_startups(self, count):
+        for _ in range(count):
+            self.created += 1
+            startup = self.make_startup(self.make_user(f'owner{self.created}'), f'startup{self.created}')
+            self.add_children(startup, 2)
+
+    def add_children(self, startup, count):
+        for _ in range(count):
+            self.created += 1
+            StartupTeam.objects.create(startup=startup, member_name=f'member{self.created}', role='cto')
+            investor = self.make_user(f'investor{self.created}', 'investor')
+            StartupReview.objects.create(startup=startup, investor=investor, rating=5)
+
+    def fetch_list(self, view_class=PlannedListView):
+        return lambda: view_class.as_view()(self.factory.get('/startups/'))
+
+    def test_plan(self):
+        self.assertEqual(
+            plan_for(PlannedStartupSerializer, Startup),
+            (['created_by'], ['reviews__investor', 'team_members'])
+        )
+
+    def test_list_query_count_is_constant(self):
+        # Строки с владельцем через JOIN, команда, отзывы и их авторы — по запросу на префетч
+        self.assertConstantQueriesPerPage(self.fetch_list(), self.add_startups, expected=4)
+
+    def test_detail_query_count_is_constant(self):
+        startup = self.make_startup(self.owner)
+        request = self.factory.get(f'/startups/{startup.pk}/')
+
+        self.assertConstantQueriesPerPage(
+            lambda: PlannedDetailView.as_view()(request, pk=startup.pk),
+            lambda count: self.add_children(startup, count),
+            expected=4
+        )
+
+    def test_helper_detects_n_plus_one(self):
+        with self.assertRaises(AssertionError):
+            self.assertConstantQueriesPerPage(self.fetch_list(UnplannedListView), self.add_startups)
+
+class StatsCacheTests(TestCase):
+    """Кэш статистики: пересчитывает только владелец блокировки."""
+
+    key = 'stats:test'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_stale_value_is_served_while_locked(self):
+        cache.set(self.key, ({'total': 1}, 0))
+        cache.add(f'{self.key}:lock', 'other')
+        compute = mock.Mock(return_value={'total': 2})
+
+        self.assertEqual(stats.get_cached(self.key, compute), {'total': 1})
+        compute.assert_not_called()
+        # Чужая блокировка остается на месте
+        self.assertEqual(cache.get(f'{self.key}:lock'), 'other')
+
+    def test_cold_cache_waits_for_running_recompute(self):
+        cache.add(f'{self.key}:lock', 'other')
+        compute = mock.Mock(return_value={'total': 2})
+
+        def finished(seconds):
+            cache.set(self.key, ({'total': 1}, time.time() + 60))
+
+        with mock.patch.object(stats.time, 'sleep', side_effect=finished):
+            self.assertEqual(stats.get_cached(self.key, compute), {'total': 1})
+        compute.assert_not_called()
+
+    def test_cold_cache_computes_after_wait_timeout(self):
+        cache.add(f'{self.key}:lock', 'other')
+        compute = mock.Mock(return_value={'total': 2})
+
+        with mock.patch.object(stats, 'WAIT_STEPS', 2), mock.patch.object(stats, 'WAIT_STEP', 0):
+            self.assertEqual(stats.get_cached(self.key, compute), {'total': 2})
+        compute.assert_called_once()
+        self.assertEqual(cache.get(self.key)[0], {'total': 2})
+        # Зависший пересчет держит свою блокировку, ее не снимаем
+        self.assertEqual(cache.get(f'{self.key}:lock'), 'other')
+
+    def test_lock_taken_over_by_another_call_is_kept(self):
+        def compute():
+            # Своя блокировка истекла, ее взял другой пересчет
+            cache.set(f'{self.key}:lock', 'other')
+            return {'total': 2}
+
+        self.assertEqual(stats.get_cached(self.key, compute), {'total': 2})
+        self.assertEqual(cache.get(f'{self.key}:lock'), 'other')
+
+    def test_own_lock_is_released(self):
+        self.assertEqual(stats.get_cached(self.key, lambda: {'total': 2}), {'total': 2})
+        self.assertIsNone(cache.get(f'{self.key}:lock'))
+
+
+class StatsComputeTests(CatalogTestMixin, TestCase):
+    """Блоки статистики считаются по полям, которые есть у моделей."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        owner = self.make_user()
+        self.make_startup(owner, 'first', funding_requested=Decimal('100000'), is_verified=True)
+        self.make_startup(owner, 'second', stage='growth', funding_requested=Decimal('300000'))
+        self.make_startup(owner, 'third', industry='retail')
+        investor = self.make_investor(self.make_user('fund', 'investor'), is_verified=True)
+        self.make_investor(self.make_user('angel', 'investor'), investor_type='individual')
+        InvestorPortfolio.objects.create(
+            investor=investor, company_name='Company', investment_amount=Decimal('2500.50'),
+            investment_date='2023-01-01', investment_type='seed'
+        )
+        self.moderator = self.make_user('moderator', 'moderator')
+        ModerationReport.objects.create(
+            reporter=owner, reported_user=owner, report_type='spam', description=''
+        )
+        VerificationRequest.objects.create(user=owner, verification_type='email')
+
+    def test_startup_stats(self):
+        self.assertEqual(stats.compute_startup_stats(), {
+            'total_startups': 3,
+            'verified_startups': 1,
+            'average_funding': 200000.0,
+            'by_stage': [{'stage': 'growth', 'count': 1}, {'stage': 'idea', 'count': 2}],
+            'by_industry': [{'industry': 'fintech', 'count': 2}, {'industry': 'retail', 'count': 1}]
+        })
+
+    def test_investor_stats(self):
+        self.assertEqual(stats.compute_investor_stats(), {
+            'total_investors': 2,
+            'verified_investors': 1,
+            'by_type': [{'investor_type': 'fund', 'count': 1}, {'investor_type': 'individual', 'count': 1}],
+            'total_investments': 1,
+            'total_invested': 2500.5
+        })
+
+    def test_moderation_stats(self):
+        result = stats.compute_moderation_stats()
+        self.assertEqual(result['pending_reports'], 1)
+        self.assertEqual(result['pending_verifications'], 1)
+        self.assertEqual(result['reports_by_type'], [{'report_type': 'spam', 'count': 1}])
+        self.assertEqual(result['queues']['reports']['depth'], 1)
+
+    def test_platform_stats_endpoint(self):
+        request = APIRequestFactory().get('/api/stats/')
+        response = stats.platform_stats(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['startups']['total_startups'], 3)
+        self.assertEqual(response.data['investors']['total_investors'], 2)
+        self.assertNotIn('moderation', response.data)
+
+        request = APIRequestFactory().get('/api/stats/')
+        force_authenticate(request, self.moderator)
+        self.assertEqual(stats.platform_stats(request).data['moderation']['pending_reports'], 1)
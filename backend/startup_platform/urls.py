@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from startup_platform import bulk_io, stats
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,6 +13,9 @@ urlpatterns = [
     path('api/moderation/', include('moderation.urls')),
     path('api/payments/', include('payments.urls')),
     path('api/industries/', include('startups.urls_industries')),
+    path('api/stats/', stats.platform_stats, name='platform-stats'),
+    path('api/import/<str:dataset>/', bulk_io.import_view, name='catalog-import'),
+    path('api/export/<str:dataset>/', bulk_io.export_view, name='catalog-export'),
 ]
 
 if settings.DEBUG:
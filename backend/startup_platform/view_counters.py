@@ -0,0 +1,154 @@
+"""
+Буферизованные счетчики просмотров профилей.
+
+Просмотры копятся в Redis (или в памяти процесса, если Redis не настроен)
+и периодически сбрасываются в БД пачкой атомарных UPDATE ... F() + n.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'VIEW_COUNTERS_FLUSH_INTERVAL', 30)
+COUNTED_MODELS = getattr(settings, 'VIEW_COUNTERS_MODELS', ['startups.Startup', 'investors.Investor'])
+
+
+class LocalBackend:
+    """Счетчики в памяти процесса — для разработки и тестов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(Counter)
+
+    def incr(self, bucket, pk, amount=1):
+        with self._lock:
+            self._counts[bucket][pk] += amount
+
+    def drain(self, bucket):
+        with self._lock:
+            counts = self._counts.pop(bucket, Counter())
+        return dict(counts)
+
+    def restore(self, bucket, counts):
+        with self._lock:
+            self._counts[bucket].update(counts)
+
+
+class RedisBackend:
+    """Счетчики в хэше Redis: общий буфер для всех воркеров."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, bucket):
+        return f"view_counts:{bucket}"
+
+    def incr(self, bucket, pk, amount=1):
+        self.client.hincrby(self._key(bucket), pk, amount)
+
+    def drain(self, bucket):
+        key = self._key(bucket)
+        flushing_key = f"{key}:flushing:{time.time_ns()}"
+        try:
+            # RENAME атомарен: новые просмотры пойдут уже в свежий хэш
+            self.client.rename(key, flushing_key)
+        except redis.ResponseError:
+            return {}
+        pipe = self.client.pipeline()
+        pipe.hgetall(flushing_key)
+        pipe.delete(flushing_key)
+        raw, _ = pipe.execute()
+        return {int(pk): int(count) for pk, count in raw.items()}
+
+    def restore(self, bucket, counts):
+        pipe = self.client.pipeline()
+        for pk, count in counts.items():
+            pipe.hincrby(self._key(bucket), pk, count)
+        pipe.execute()
+
+
+def _make_backend():
+    redis_url = getattr(settings, 'REDIS_URL', None)
+    if redis_url and redis is not None:
+        return RedisBackend(redis_url)
+    return LocalBackend()
+
+
+class ViewCounter:
+    def __init__(self, model, field='views_count', backend=None):
+        self.model = model
+        self.field = field
+        self.bucket = model._meta.label_lower
+        self.backend = backend or _make_backend()
+        self._last_flush = time.monotonic()
+
+    def increment(self, pk, amount=1):
+        self.backend.incr(self.bucket, pk, amount)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        # Сброс по таймеру прямо из запроса нужен для локального бэкенда:
+        # его буфер не виден management-команде в другом процессе
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            try:
+                self.flush()
+            except Exception:
+                # Счетчики уже возвращены в буфер — запрос просмотра не должен падать
+                logger.exception('Не удалось сбросить счетчики просмотров %s', self.bucket)
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        counts = self.backend.drain(self.bucket)
+        if not counts:
+            return 0
+
+        # Группируем по приросту: один UPDATE на каждое уникальное значение
+        by_amount = defaultdict(list)
+        for pk, amount in counts.items():
+            by_amount[amount].append(pk)
+
+        try:
+            with transaction.atomic():
+                for amount, pks in by_amount.items():
+                    self.model.objects.filter(pk__in=pks).update(
+                        **{self.field: F(self.field) + amount}
+                    )
+        except Exception:
+            self.backend.restore(self.bucket, counts)
+            raise
+
+        return sum(counts.values())
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_view_counter(model):
+    label = model._meta.label_lower
+    with _counters_lock:
+        if label not in _counters:
+            _counters[label] = ViewCounter(model)
+        return _counters[label]
+
+
+def flush_all():
+    flushed = {}
+    for label in COUNTED_MODELS:
+        model = apps.get_model(label)
+        flushed[label] = get_view_counter(model).flush()
+    return flushed
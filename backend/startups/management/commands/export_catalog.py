@@ -0,0 +1,22 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from startup_platform.bulk_io import FORMATS, export_rows, get_datasets
+
+
+class Command(BaseCommand):
+    help = 'Выгружает стартапы, инвесторов или позиции портфеля в CSV/JSONL потоком'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['startups', 'investors', 'portfolio'])
+        parser.add_argument('path', nargs='?', help='Файл для выгрузки (по умолчанию stdout)')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+
+    def handle(self, *args, **options):
+        dataset = get_datasets()[options['dataset']]
+        if options['path']:
+            with open(options['path'], 'w', encoding='utf-8', newline='') as stream:
+                stream.writelines(export_rows(dataset, options['format']))
+        else:
+            sys.stdout.writelines(export_rows(dataset, options['format']))
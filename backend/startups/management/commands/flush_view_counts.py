@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from startup_platform.view_counters import flush_all
+
+
+class Command(BaseCommand):
+    help = 'Сбрасывает накопленные счетчики просмотров стартапов и инвесторов в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Повторять сброс каждые N секунд (0 — выполнить один раз)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            for label, count in flush_all().items():
+                if count:
+                    self.stdout.write(f"{label}: +{count} просмотров")
+            if not interval:
+                break
+            time.sleep(interval)
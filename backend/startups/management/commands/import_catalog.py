@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from startup_platform.bulk_io import BATCH_SIZE, FORMATS, get_datasets, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует стартапы, инвесторов или позиции портфеля из CSV/JSONL (upsert по id)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['startups', 'investors', 'portfolio'])
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='По умолчанию — по расширению файла')
+        parser.add_argument('--owner', help='Имя пользователя-владельца новых записей')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить строки')
+
+    def handle(self, *args, **options):
+        dataset = get_datasets()[options['dataset']]
+        fmt = options['format'] or ('jsonl' if options['path'].endswith('.jsonl') else 'csv')
+
+        owner = None
+        if options['owner']:
+            try:
+                owner = get_user_model().objects.get(username=options['owner'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Пользователь {options['owner']} не найден")
+        elif dataset.owner_field:
+            raise CommandError('Для этого набора нужен --owner')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            report = import_rows(
+                dataset, read_rows(stream, fmt, dataset), owner=owner,
+                batch_size=options['batch_size'], dry_run=options['dry_run']
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"строка {error['line']}: {error['errors']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f'... и еще {report.failed - len(report.errors)} строк с ошибками')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {report.created}, обновлено: {report.updated}, с ошибками: {report.failed}'
+        ))
+        if dataset.searchable and not options['dry_run']:
+            self.stdout.write('Пары подбора не пересчитываются при импорте — запустите rebuild_matches')
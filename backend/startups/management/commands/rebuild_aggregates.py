@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from investors.models import Investor
+from investors.services import update_investor_portfolio_totals, update_investor_rating
+from startups.models import Startup
+from startups.signals import update_startup_rating
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает денормализованные рейтинги и итоги портфеля'
+
+    def handle(self, *args, **options):
+        for startup_id in Startup.objects.values_list('id', flat=True).iterator():
+            update_startup_rating(startup_id)
+
+        for investor_id in Investor.objects.values_list('id', flat=True).iterator():
+            update_investor_rating(investor_id)
+            update_investor_portfolio_totals(investor_id)
+
+        self.stdout.write(self.style.SUCCESS('Агрегаты пересчитаны'))
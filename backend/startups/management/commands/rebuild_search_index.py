@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from investors.models import Investor
+from startup_platform import search
+from startups.models import Startup
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает tsvector полнотекстового поиска для стартапов и инвесторов'
+
+    def handle(self, *args, **options):
+        for model in (Startup, Investor):
+            search.rebuild(model)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересчитан'))
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 import datetime
@@ -26,13 +28,47 @@ class Startup(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_verified = models.BooleanField(default=False)
+    # Денормализованные агрегаты отзывов, поддерживаются сигналами (startups/signals.py)
+    rating = models.FloatField(default=0)
+    total_reviews = models.PositiveIntegerField(default=0)
+    # Просмотры профиля: инкременты копятся в буфере и сбрасываются пачкой (startup_platform/view_counters.py)
+    views_count = models.PositiveIntegerField(default=0)
+    # tsvector для полнотекстового поиска, обновляется сигналом (startup_platform/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Составные индексы (поле DESC, id DESC) для keyset-пагинации каталога — в направлении
+        # ORDER BY по умолчанию; восходящая сортировка читает их обратным сканом
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='startup_created_keyset_idx'),
+            models.Index(fields=['-rating', '-id'], name='startup_rating_keyset_idx'),
+            models.Index(fields=['-views_count', '-id'], name='startup_views_keyset_idx'),
+            GinIndex(fields=['search_vector'], name='startup_search_gin'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+
+class StartupReview(models.Model):
+    startup = models.ForeignKey(Startup, on_delete=models.CASCADE, related_name='reviews')
+    investor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='startup_reviews')
+    rating = models.PositiveSmallIntegerField(validators=[MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    # В rating/total_reviews стартапа учитываются только проверенные отзывы
+    is_verified = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('startup', 'investor')
+
+    def __str__(self):
+        return f"{self.investor} - {self.startup.name}: {self.rating}"
+
 class StartupTeam(models.Model):
-    startup = models.ForeignKey(Startup, on_delete=models.CASCADE)
+    startup = models.ForeignKey(Startup, on_delete=models.CASCADE, related_name='team_members')
     member_name = models.CharField(max_length=100)
     role = models.CharField(max_length=100)
     experience_years = models.IntegerField(default=0)
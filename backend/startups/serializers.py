@@ -1,4 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
+from startup_platform.nested_writes import write_children
 from .models import Industry, Startup, StartupTeamMember, StartupImage, StartupReview
 
 class IndustrySerializer(serializers.ModelSerializer):
@@ -7,12 +9,17 @@ class IndustrySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class StartupTeamMemberSerializer(serializers.ModelSerializer):
+    # id передается при обновлении, чтобы изменить строку, а не пересоздать ее
+    id = serializers.IntegerField(required=False)
+    
     class Meta:
         model = StartupTeamMember
         fields = '__all__'
         read_only_fields = ('startup',)
 
 class StartupImageSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    
     class Meta:
         model = StartupImage
         fields = '__all__'
@@ -35,7 +42,7 @@ class StartupReviewSerializer(serializers.ModelSerializer):
 class StartupListSerializer(serializers.ModelSerializer):
     industry_name = serializers.CharField(source='industry.name', read_only=True)
     rating = serializers.FloatField(read_only=True)
-    reviews_count = serializers.IntegerField(source='reviews.count', read_only=True)
+    reviews_count = serializers.IntegerField(source='total_reviews', read_only=True)
     
     class Meta:
         model = Startup
@@ -52,7 +59,7 @@ class StartupDetailSerializer(serializers.ModelSerializer):
     reviews = StartupReviewSerializer(many=True, read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     rating = serializers.FloatField(read_only=True)
-    reviews_count = serializers.IntegerField(source='reviews.count', read_only=True)
+    reviews_count = serializers.IntegerField(source='total_reviews', read_only=True)
     is_owner = serializers.SerializerMethodField()
     
     class Meta:
@@ -80,13 +87,10 @@ class StartupCreateSerializer(serializers.ModelSerializer):
         team_members_data = validated_data.pop('team_members', [])
         images_data = validated_data.pop('images', [])
         
-        startup = Startup.objects.create(**validated_data)
-        
-        for member_data in team_members_data:
-            StartupTeamMember.objects.create(startup=startup, **member_data)
-        
-        for image_data in images_data:
-            StartupImage.objects.create(startup=startup, **image_data)
+        with transaction.atomic():
+            startup = Startup.objects.create(**validated_data)
+            write_children(startup, 'team_members', team_members_data)
+            write_children(startup, 'images', images_data)
         
         return startup
     
@@ -94,21 +98,16 @@ class StartupCreateSerializer(serializers.ModelSerializer):
         team_members_data = validated_data.pop('team_members', None)
         images_data = validated_data.pop('images', None)
         
-        # Update startup fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update team members if provided
-        if team_members_data is not None:
-            instance.team_members.all().delete()
-            for member_data in team_members_data:
-                StartupTeamMember.objects.create(startup=instance, **member_data)
-        
-        # Update images if provided
-        if images_data is not None:
-            instance.images.all().delete()
-            for image_data in images_data:
-                StartupImage.objects.create(startup=instance, **image_data)
+        with transaction.atomic():
+            # Update startup fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            
+            # Вложенные списки, если переданы: изменения применяются пачками
+            if team_members_data is not None:
+                write_children(instance, 'team_members', team_members_data)
+            if images_data is not None:
+                write_children(instance, 'images', images_data)
         
         return instance
\ No newline at end of file
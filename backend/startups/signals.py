@@ -0,0 +1,37 @@
+from django.db.models import Avg, Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from startup_platform import search, stats
+from startup_platform.response_cache import invalidate_tags
+
+from .models import Startup, StartupReview
+
+
+def update_startup_rating(startup_id):
+    # Пересчитываем агрегаты только для затронутого стартапа (индекс по startup_id)
+    totals = StartupReview.objects.filter(startup_id=startup_id, is_verified=True).aggregate(
+        rating=Avg('rating'),
+        total_reviews=Count('id')
+    )
+    Startup.objects.filter(id=startup_id).update(
+        rating=totals['rating'] or 0,
+        total_reviews=totals['total_reviews']
+    )
+
+
+@receiver(post_save, sender=Startup)
+@receiver(post_delete, sender=Startup)
+def startup_changed(sender, instance, **kwargs):
+    stats.invalidate(stats.STARTUP_STATS_KEY)
+    invalidate_tags('startups', f'startup:{instance.pk}')
+
+
+@receiver(post_save, sender=StartupReview)
+@receiver(post_delete, sender=StartupReview)
+def startup_review_changed(sender, instance, **kwargs):
+    update_startup_rating(instance.startup_id)
+    invalidate_tags('startups', f'startup:{instance.startup_id}')
+
+
+search.register(Startup, {'name': 'A', 'industry': 'B', 'description': 'C'})
@@ -1,3 +1,326 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from investors.models import Investor, InvestorPortfolio
+from startup_platform import bulk_io
+from startup_platform.bulk_io import get_datasets, import_rows
+from startup_platform.nested_writes import write_children
+from startup_platform.pagination import KeysetPagination
+from startup_platform.search import FullTextSearchFilter
+from users.models import CustomUser
+from .models import Startup, StartupReview
+
+
+class TeamBulkWriteTests(TestCase):
+    """Запись команды стартапа: число запросов не зависит от размера команды."""
+
+    def make_startup(self, name):
+        user = CustomUser.objects.create_user(username=name, password='pass', user_type='startup')
+        return Startup.objects.create(
+            name=name, description='', stage='idea', industry='fintech', created_by=user
+        )
+
+    def members(self, count):
+        return [
+            {'member_name': f'Member {index}', 'role': 'Engineer', 'experience_years': index}
+            for index in range(count)
+        ]
+
+    def count_queries(self, startup, items):
+        with CaptureQueriesContext(connection) as context:
+            result = write_children(startup, 'team_members', items)
+        return len(context.captured_queries), result
+
+    def edited(self, startup):
+        # Половину участников меняем, одного удаляем, двух добавляем
+        rows = list(startup.team_members.order_by('id').values('id', 'member_name', 'role', 'experience_years'))
+        for row in rows[::2]:
+            row['role'] = 'CTO'
+        return rows[1:] + self.members(2)
+
+    def test_query_count_is_constant(self):
+        small, large = self.make_startup('small'), self.make_startup('large')
+
+        small_queries, _ = self.count_queries(small, self.members(3))
+        large_queries, _ = self.count_queries(large, self.members(30))
+        self.assertEqual(small_queries, large_queries)
+
+        small_queries, _ = self.count_queries(small, self.edited(small))
+        large_queries, result = self.count_queries(large, self.edited(large))
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(result, (2, 14, 1))
+
+        self.assertEqual(large.team_members.count(), 31)
+        self.assertEqual(large.team_members.filter(role='CTO').count(), 14)
+
+    def test_unchanged_items_are_not_written(self):
+        startup = self.make_startup('same')
+        write_children(startup, 'team_members', self.members(5))
+        rows = list(startup.team_members.values('id', 'member_name', 'role', 'experience_years'))
+
+        queries, result = self.count_queries(startup, rows)
+        self.assertEqual(result, (0, 0, 0))
+        # Только чтение текущих строк
+        self.assertEqual(queries, 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """Keyset-пагинация каталога: сравнение строк по индексу и курсор по рангу поиска."""
+    view = SimpleNamespace(ordering_fields=['rating', 'created_at'], ordering=['-created_at'])
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='owner', password='pass', user_type='startup')
+        self.startups = [
+            Startup.objects.create(
+                name=f'Startup {index}', description='fintech ' * (index % 3 + 1), stage='idea',
+                industry='fintech', created_by=user, rating=index % 2
+            )
+            for index in range(7)
+        ]
+
+    def walk(self, queryset, view=None, **params):
+        pages, cursor = [], None
+        for _ in range(len(self.startups)):
+            query = {'pagination': 'cursor', 'page_size': 2, **params}
+            if cursor:
+                query['cursor'] = cursor
+            paginator = KeysetPagination()
+            request = Request(APIRequestFactory().get('/startups/', query))
+            page = paginator.paginate_queryset(queryset, request, view or self.view)
+            pages.append([startup.pk for startup in page])
+            if not paginator.has_next:
+                return pages
+            cursor = paginator.encode_cursor(page[-1])
+        self.fail('Курсор не продвигается')
+
+    def test_pages_follow_ordering_with_ties(self):
+        pages = self.walk(Startup.objects.order_by('-rating'))
+        expected = list(Startup.objects.order_by('-rating', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(len(pages), 4)
+
+    def test_views_count_ordering(self):
+        for index, startup in enumerate(self.startups):
+            Startup.objects.filter(pk=startup.pk).update(views_count=index % 3)
+        view = SimpleNamespace(ordering_fields=['views_count'], ordering=['-views_count'])
+        pages = self.walk(Startup.objects.order_by('-views_count'), view)
+        expected = list(Startup.objects.order_by('-views_count', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_cursor_uses_row_value_comparison(self):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get('/startups/', {'pagination': 'cursor'}))
+        paginator.paginate_queryset(Startup.objects.order_by('-rating'), request, self.view)
+        queryset = Startup.objects.order_by(*paginator.get_order_by()).filter(
+            paginator.get_cursor_filter(1.0, self.startups[3].pk)
+        )
+        sql = str(queryset.query)
+        self.assertIn('("startups_startup"."rating", "startups_startup"."id") < (1.0, ', sql)
+        self.assertIn('ORDER BY "startups_startup"."rating" DESC, "startups_startup"."id" DESC', sql)
+
+    @skipUnless(connection.vendor == 'postgresql', 'план запроса PostgreSQL')
+    def test_index_serves_order_without_sort(self):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get('/startups/', {'pagination': 'cursor'}))
+        paginator.paginate_queryset(Startup.objects.all(), request, self.view)
+        queryset = Startup.objects.order_by(*paginator.get_order_by()).filter(
+            paginator.get_cursor_filter(self.startups[3].created_at, self.startups[3].pk)
+        )[:20]
+        with connection.cursor() as cursor:
+            # На семи строках планировщик иначе выберет seq scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            plan = queryset.explain()
+        self.assertIn('startup_created_keyset_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'GIN-индекс PostgreSQL')
+    def test_search_vector_has_gin_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Startup._meta.db_table)
+        self.assertEqual(constraints['startup_search_gin']['columns'], ['search_vector'])
+        self.assertEqual(constraints['startup_search_gin']['type'], 'gin')
+
+    @skipUnless(connection.vendor == 'postgresql', 'полнотекстовый поиск PostgreSQL')
+    def test_search_rank_cursor(self):
+        request = Request(APIRequestFactory().get('/startups/', {'search': 'fintech'}))
+        queryset = FullTextSearchFilter().filter_queryset(
+            request, Startup.objects.order_by('-created_at'), self.view
+        )
+
+        pages = self.walk(queryset, search='fintech')
+        expected = list(queryset.order_by('-search_rank', '-id').values_list('id', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(len(expected), len(self.startups))
+        # Выдача по рангу, а не по дате создания
+        by_date = list(Startup.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertNotEqual(expected, by_date)
+
+
+class ImportSequenceTests(TestCase):
+    """Импорт строк с явными id сдвигает последовательность PK."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='owner', password='pass', user_type='startup')
+        self.dataset = get_datasets()['startups']
+
+    def row(self, line, name, pk=''):
+        return line, {'id': pk, 'name': name, 'description': name, 'stage': 'idea', 'industry': 'fintech'}, None
+
+    def test_explicit_ids_advance_sequence(self):
+        top = Startup.objects.create(
+            name='Existing', description='', stage='idea', industry='fintech', created_by=self.user
+        )
+        explicit = top.pk + 100
+        rows = [self.row(1, 'Без id'), self.row(2, 'С id', explicit), self.row(3, 'Обновление', top.pk)]
+
+        report = import_rows(self.dataset, rows, owner=self.user)
+        self.assertEqual((report.created, report.updated, report.errors), (2, 1, []))
+        self.assertEqual(Startup.objects.get(pk=explicit).name, 'С id')
+        # Строка без id вставлена после сдвига и не заняла явный ключ
+        self.assertGreater(Startup.objects.get(name='Без id').pk, explicit)
+
+        created = Startup.objects.create(
+            name='Next', description='', stage='idea', industry='fintech', created_by=self.user
+        )
+        self.assertGreater(created.pk, explicit)
+
+
+class CatalogImportTests(TestCase):
+    """Наборы get_datasets(): владелец, родитель, API и команды импорта/экспорта."""
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(username='owner', password='pass', user_type='investor')
+        self.other = CustomUser.objects.create_user(username='other', password='pass', user_type='investor')
+        self.admin = CustomUser.objects.create_user(
+            username='admin', password='pass', user_type='investor', is_staff=True
+        )
+        self.investor = Investor.objects.create(name='Own fund', investor_type='fund', created_by=self.owner)
+        self.foreign = Investor.objects.create(name='Other fund', investor_type='fund', created_by=self.other)
+
+    def upload(self, dataset, content, user, name='rows.csv'):
+        request = APIRequestFactory().post(
+            f'/api/import/{dataset}/', {'file': SimpleUploadedFile(name, content.encode())}, format='multipart'
+        )
+        force_authenticate(request, user)
+        return bulk_io.import_view(request, dataset=dataset)
+
+    def test_api_import_sets_owner_and_checks_parent_owner(self):
+        response = self.upload('startups', 'name,description,stage,industry\nNew,Desc,idea,fintech\n', self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Startup.objects.get(name='New').created_by, self.owner)
+
+        rows = (
+            'investor,company_name,investment_amount,investment_date,investment_type\n'
+            f'{self.investor.pk},Acme,1000,2024-01-01,seed\n'
+            f'{self.foreign.pk},Foreign,500,2024-01-01,seed\n'
+        )
+        response = self.upload('portfolio', rows, self.owner)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['errors'], {'investor': ['Запись не найдена']})
+        self.investor.refresh_from_db()
+        self.assertEqual((self.investor.total_investments, self.investor.total_amount_invested), (1, 1000))
+
+    def test_update_restricted_to_own_records(self):
+        rows = (
+            'id,name,investor_type\n'
+            f'{self.investor.pk},Renamed,fund\n'
+            f'{self.foreign.pk},Hijacked,fund\n'
+        )
+        response = self.upload('investors', rows, self.owner)
+        self.assertEqual((response.data['updated'], response.data['failed']), (1, 1))
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.name, 'Other fund')
+        self.assertEqual(self.foreign.created_by, self.other)
+
+    def test_error_list_is_capped(self):
+        rows = 'name\n' + 'x\n' * (bulk_io.MAX_REPORTED_ERRORS + 20)
+        response = self.upload('investors', rows, self.owner)
+        self.assertEqual(response.data['failed'], bulk_io.MAX_REPORTED_ERRORS + 20)
+        self.assertEqual(len(response.data['errors']), bulk_io.MAX_REPORTED_ERRORS)
+        self.assertTrue(response.data['errors_truncated'])
+
+    def test_commands_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'investors.jsonl')
+            call_command('export_catalog', 'investors', path, format='jsonl')
+            with open(path, encoding='utf-8') as stream:
+                records = [json.loads(line) for line in stream]
+            self.assertEqual(sorted(record['name'] for record in records), ['Other fund', 'Own fund'])
+
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.write(json.dumps({'name': 'Imported', 'investor_type': 'individual'}) + '\n')
+            call_command('import_catalog', 'investors', path, owner='admin', stdout=StringIO())
+        self.assertEqual(Investor.objects.get(name='Imported').created_by, self.admin)
+
+    def test_api_export_streams_rows(self):
+        request = APIRequestFactory().get('/api/export/portfolio/', {'format': 'csv'})
+        force_authenticate(request, self.admin)
+        InvestorPortfolio.objects.create(
+            investor=self.investor, company_name='Acme', investment_amount=10,
+            investment_date='2024-01-01', investment_type='seed'
+        )
+        response = bulk_io.export_view(request, dataset='portfolio')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('company_name', content.splitlines()[0])
+        self.assertIn('Acme', content)
+
+        request = APIRequestFactory().get('/api/export/portfolio/', {'format': 'xml'})
+        force_authenticate(request, self.admin)
+        self.assertEqual(bulk_io.export_view(request, dataset='portfolio').status_code, 404)
+
+
+class RatingAggregateTests(TestCase):
+    """rating и total_reviews стартапа следуют за проверенными отзывами."""
+
+    def setUp(self):
+        owner = CustomUser.objects.create_user(username='owner', password='pass', user_type='startup')
+        self.startup = Startup.objects.create(
+            created_by=owner, name='Startup', description='', stage='idea', industry='fintech'
+        )
+        self.investors = [
+            CustomUser.objects.create_user(username=f'investor{index}', password='pass', user_type='investor')
+            for index in range(3)
+        ]
+
+    def review(self, investor, rating, is_verified=True):
+        return StartupReview.objects.create(
+            startup=self.startup, investor=investor, rating=rating, is_verified=is_verified
+        )
+
+    def totals(self):
+        self.startup.refresh_from_db()
+        return self.startup.rating, self.startup.total_reviews
+
+    def test_verified_reviews_update_rating(self):
+        first = self.review(self.investors[0], 5)
+        self.review(self.investors[1], 2)
+        self.review(self.investors[2], 1, is_verified=False)
+        self.assertEqual(self.totals(), (3.5, 2))
+
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.totals(), (2.5, 2))
+
+        first.delete()
+        self.assertEqual(self.totals(), (2, 1))
+
+    def test_rebuild_aggregates(self):
+        self.review(self.investors[0], 4)
+        Startup.objects.filter(pk=self.startup.pk).update(rating=0, total_reviews=0)
 
-# Create your tests here.
+        call_command('rebuild_aggregates', stdout=StringIO())
+        self.assertEqual(self.totals(), (4, 1))
@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from matching.views import StartupMatchesView
 
 urlpatterns = [
     path('', views.StartupListView.as_view(), name='startup-list'),
@@ -8,6 +9,7 @@ urlpatterns = [
     path('<int:pk>/', views.StartupDetailView.as_view(), name='startup-detail'),
     path('<int:pk>/update/', views.StartupUpdateView.as_view(), name='startup-update'),
     path('<int:pk>/delete/', views.StartupDeleteView.as_view(), name='startup-delete'),
+    path('<int:pk>/matches/', StartupMatchesView.as_view(), name='startup-matches'),
     path('<int:startup_id>/reviews/', views.StartupReviewCreateView.as_view(), name='startup-review-create'),
     path('stats/', views.startup_stats, name='startup-stats'),
 ]
\ No newline at end of file
@@ -5,6 +5,12 @@ from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Avg
 from django.utils import timezone
+from startup_platform.pagination import CatalogPagination
+from startup_platform.query_planner import QueryPlannerMixin
+from startup_platform.response_cache import CachedResponseMixin
+from startup_platform import stats
+from startup_platform.search import FullTextSearchFilter
+from startup_platform.view_counters import get_view_counter
 from .models import Industry, Startup, StartupReview
 from .serializers import (
     IndustrySerializer, StartupListSerializer,
@@ -12,26 +18,31 @@ from .serializers import (
     StartupReviewSerializer
 )
 
-class IndustryListView(generics.ListAPIView):
+class IndustryListView(CachedResponseMixin, generics.ListAPIView):
     queryset = Industry.objects.all()
     serializer_class = IndustrySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    
+    def get_cache_tags(self):
+        return ['industries']
 
-class StartupListView(generics.ListAPIView):
+class StartupListView(CachedResponseMixin, QueryPlannerMixin, generics.ListAPIView):
     serializer_class = StartupListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['stage', 'industry', 'location', 'has_mvp', 'is_verified']
-    search_fields = ['name', 'description', 'short_description']
-    ordering_fields = ['rating', 'created_at', 'funding_amount', 'views_count']
+    search_fields = ['name', 'description', 'industry']
+    ordering_fields = ['rating', 'created_at', 'views_count']
     ordering = ['-created_at']
+    pagination_class = CatalogPagination
+    
+    def get_cache_tags(self):
+        return ['startups', 'industries']
     
     def get_queryset(self):
-        queryset = Startup.objects.filter(is_active=True).annotate(
-            rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews')
-        )
+        # rating и total_reviews — денормализованные колонки, без JOIN по отзывам
+        queryset = Startup.objects.filter(is_active=True)
         
         # Фильтрация по диапазону сумм
         min_funding = self.request.query_params.get('min_funding')
@@ -53,22 +64,26 @@ class StartupListView(generics.ListAPIView):
         
         return queryset
 
-class StartupDetailView(generics.RetrieveAPIView):
+class StartupDetailView(CachedResponseMixin, QueryPlannerMixin, generics.RetrieveAPIView):
     serializer_class = StartupDetailSerializer
     permission_classes = [permissions.AllowAny]
     
+    def get_cache_tags(self):
+        return [f"startup:{self.kwargs['pk']}", 'industries']
+    
+    def on_cache_hit(self, request, *args, **kwargs):
+        # Ответ из кэша — просмотр все равно учитываем
+        get_view_counter(Startup).increment(kwargs['pk'])
+    
     def get_queryset(self):
-        return Startup.objects.filter(is_active=True).annotate(
-            rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews')
-        )
+        return Startup.objects.filter(is_active=True)
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
-        # Увеличиваем счетчик просмотров
-        instance.views_count += 1
-        instance.save()
+        # Увеличиваем счетчик просмотров: инкремент копится в буфере
+        # и сбрасывается в БД пачкой, строка профиля здесь не пишется
+        get_view_counter(Startup).increment(instance.pk)
         
         serializer = self.get_serializer(instance, context={'request': request})
         return Response(serializer.data)
@@ -109,41 +124,21 @@ class StartupReviewCreateView(generics.CreateAPIView):
         if StartupReview.objects.filter(startup=startup, investor=self.request.user).exists():
             raise serializers.ValidationError('Вы уже оставляли отзыв для этого стартапа')
         
+        # Рейтинг стартапа пересчитывают сигналы сохранения и удаления отзыва (startups/signals.py)
         serializer.save(investor=self.request.user, startup=startup)
-        
-        # Обновляем рейтинг стартапа
-        self.update_startup_rating(startup)
-    
-    def update_startup_rating(self, startup):
-        reviews = startup.reviews.filter(is_verified=True)
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-        startup.rating = avg_rating
-        startup.total_reviews = reviews.count()
-        startup.save()
 
-class UserStartupsView(generics.ListAPIView):
+class UserStartupsView(QueryPlannerMixin, generics.ListAPIView):
     serializer_class = StartupListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['rating', 'created_at', 'views_count']
+    ordering = ['-created_at']
+    pagination_class = CatalogPagination
     
     def get_queryset(self):
-        return Startup.objects.filter(user=self.request.user, is_active=True).annotate(
-            rating=Avg('reviews__rating'),
-            reviews_count=Count('reviews')
-        )
+        return Startup.objects.filter(user=self.request.user, is_active=True)
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def startup_stats(request):
-    total_startups = Startup.objects.filter(is_active=True).count()
-    verified_startups = Startup.objects.filter(is_active=True, is_verified=True).count()
-    avg_funding = Startup.objects.filter(is_active=True).aggregate(Avg('funding_amount'))['funding_amount__avg'] or 0
-    by_stage = Startup.objects.filter(is_active=True).values('stage').annotate(count=Count('id'))
-    by_industry = Startup.objects.filter(is_active=True).values('industry__name').annotate(count=Count('id'))
-    
-    return Response({
-        'total_startups': total_startups,
-        'verified_startups': verified_startups,
-        'average_funding': float(avg_funding),
-        'by_stage': list(by_stage),
-        'by_industry': list(by_industry)
-    })
\ No newline at end of file
+    return Response(stats.get_startup_stats())
\ No newline at end of file
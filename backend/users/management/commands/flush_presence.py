@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.presence import FLUSH_INTERVAL, get_presence
+
+
+class Command(BaseCommand):
+    help = 'Сбрасывает накопленную активность пользователей (last_activity) в UserActivity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help=f'Повторять сброс каждые N секунд (0 — выполнить один раз, обычно {FLUSH_INTERVAL})'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        presence = get_presence()
+        while True:
+            count = presence.flush()
+            if count:
+                self.stdout.write(f"Активность сохранена: {count} пользователей")
+            if not interval:
+                break
+            time.sleep(interval)
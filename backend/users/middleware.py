@@ -0,0 +1,19 @@
+from .presence import get_presence
+
+
+class PresenceMiddleware:
+    """
+    Серверный heartbeat HTTP-присутствия: любой аутентифицированный запрос
+    продлевает соединение, открытое в LoginView. Пользователь проверяется
+    после ответа — к этому моменту DRF уже аутентифицировал запрос по токену.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            get_presence().refresh_http(user)
+        return response
@@ -25,6 +25,17 @@ class UserProfile(models.Model):
         return f"Profile of {self.user.username}"
 
 
+class UserActivity(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='activities')
+    is_online = models.BooleanField(default=False)
+    last_activity = models.DateTimeField(null=True, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Activity of {self.user.username}"
+
+
 class Subscription(models.Model):
     SUBSCRIPTION_TYPES = [
         ('basic', 'Basic'),
@@ -40,6 +51,34 @@ class Subscription(models.Model):
         return f"{self.user.username} - {self.subscription_type}"
 
 
+class UserSubscription(models.Model):
+    """Оплаченная подписка пользователя (payments); features копируются из тарифа при активации."""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
+    plan = models.ForeignKey('payments.SubscriptionPlan', on_delete=models.PROTECT, related_name='subscriptions')
+    payment = models.ForeignKey(
+        'payments.Payment', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    features = models.JSONField(default=dict, blank=True)
+    is_active = models.BooleanField(default=True)
+    auto_renew = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Плановый проход payments.renewals: активные подписки по (end_date, id)
+            models.Index(
+                fields=['end_date', 'id'], condition=models.Q(is_active=True),
+                name='subscription_active_end_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.plan} до {self.end_date:%Y-%m-%d}"
+
+
 class Payment(models.Model):
     PAYMENT_METHODS = [
         ('yoomoney', 'YooMoney'),
@@ -0,0 +1,304 @@
+"""
+Присутствие пользователей онлайн.
+
+Онлайн-статус хранится не в БД, а в Redis (или в памяти процесса, если
+Redis не настроен). У каждого пользователя — набор активных соединений
+(вкладки, WebSocket, HTTP-сессия) со сроком жизни: соединение продлевается
+heartbeat'ом и само истекает через PRESENCE_TTL, поэтому закрытие одной
+вкладки не делает пользователя офлайн, а «зависшие» соединения не держат
+его онлайн вечно. Счетчики по типам пользователей — отсортированные по
+сроку истечения множества, подсчет онлайн — один ZCOUNT.
+
+Heartbeat'ы шлет сервер, а не клиент: WebSocket-потребитель продлевает свое
+соединение по таймеру, HTTP-соединение продлевает PresenceMiddleware на
+каждом аутентифицированном запросе (не чаще раза в HEARTBEAT_INTERVAL).
+
+В БД (UserActivity) пишется только last_activity и данные входа, пачкой
+раз в PRESENCE_FLUSH_INTERVAL секунд.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+PRESENCE_TTL = getattr(settings, 'PRESENCE_TTL', 60)
+FLUSH_INTERVAL = getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 30)
+# Продлеваем соединение трижды за TTL, чтобы одна задержка не роняла статус
+HEARTBEAT_INTERVAL = PRESENCE_TTL / 3
+USER_TYPES = ('startup', 'investor')
+HTTP_CONNECTION = 'http'
+FLUSH_BATCH = 1000
+
+
+class LocalBackend:
+    """Присутствие в памяти процесса — для разработки и тестов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = defaultdict(dict)   # user_id -> {connection: expires_at}
+        self._online = defaultdict(dict)        # user_type -> {user_id: expires_at}
+        self._seen = {}
+        self._pending = defaultdict(dict)
+
+    def touch(self, user_id, user_type, connection, expires_at, seen_at, details):
+        with self._lock:
+            self._connections[user_id][connection] = expires_at
+            self._online[user_type or ''][user_id] = max(self._connections[user_id].values())
+            self._seen[user_id] = seen_at
+            self._pending[user_id].update(details, last_activity=seen_at)
+
+    def release(self, user_id, user_type, connection, now, seen_at):
+        with self._lock:
+            connections = self._connections.get(user_id, {})
+            connections.pop(connection, None)
+            alive = [expires for expires in connections.values() if expires > now]
+            if alive:
+                self._online[user_type or ''][user_id] = max(alive)
+            else:
+                self._connections.pop(user_id, None)
+                self._online[user_type or ''].pop(user_id, None)
+            self._seen[user_id] = seen_at
+            self._pending[user_id]['last_activity'] = seen_at
+
+    def statuses(self, user_ids, now):
+        with self._lock:
+            return {
+                user_id: (
+                    any(expires > now for expires in self._connections.get(user_id, {}).values()),
+                    self._seen.get(user_id)
+                )
+                for user_id in user_ids
+            }
+
+    def counts(self, now):
+        with self._lock:
+            return {
+                user_type: sum(1 for expires in self._online[user_type].values() if expires > now)
+                for user_type in USER_TYPES
+            }
+
+    def drain(self, limit):
+        with self._lock:
+            user_ids = list(self._pending)[:limit]
+            return {user_id: self._pending.pop(user_id) for user_id in user_ids}
+
+    def restore(self, pending):
+        with self._lock:
+            for user_id, fields in pending.items():
+                self._pending[user_id] = {**fields, **self._pending.get(user_id, {})}
+
+
+class RedisBackend:
+    """
+    presence:conn:<id>  — ZSET соединений пользователя (score — срок истечения)
+    presence:online:<type> — ZSET пользователей типа (score — срок истечения)
+    presence:seen       — HASH user_id -> время последней активности
+    presence:pending:<id>, presence:dirty — данные для сброса в БД
+    """
+
+    # Снятие соединения и пересчет онлайна одним скриптом: touch из другой
+    # вкладки не может вклиниться между ZRANGE и записью в presence:online
+    RELEASE_SCRIPT = """
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+        local latest = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+        if #latest > 0 then
+            redis.call('ZADD', KEYS[2], latest[2], ARGV[3])
+        else
+            redis.call('ZREM', KEYS[2], ARGV[3])
+        end
+        redis.call('HSET', KEYS[3], ARGV[3], ARGV[4])
+        redis.call('HSET', KEYS[4], 'last_activity', ARGV[4])
+        redis.call('SADD', KEYS[5], ARGV[3])
+    """
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def touch(self, user_id, user_type, connection, expires_at, seen_at, details):
+        pipe = self.client.pipeline()
+        pipe.zadd(f'presence:conn:{user_id}', {connection: expires_at})
+        pipe.expire(f'presence:conn:{user_id}', int(PRESENCE_TTL * 2))
+        pipe.zadd(f'presence:online:{user_type or ""}', {user_id: expires_at}, gt=True)
+        pipe.hset('presence:seen', user_id, seen_at)
+        pipe.hset(f'presence:pending:{user_id}', mapping={**details, 'last_activity': seen_at})
+        pipe.sadd('presence:dirty', user_id)
+        pipe.execute()
+
+    def release(self, user_id, user_type, connection, now, seen_at):
+        self._release(
+            keys=[
+                f'presence:conn:{user_id}',
+                f'presence:online:{user_type or ""}',
+                'presence:seen',
+                f'presence:pending:{user_id}',
+                'presence:dirty',
+            ],
+            args=[connection, now, user_id, seen_at]
+        )
+
+    def statuses(self, user_ids, now):
+        pipe = self.client.pipeline()
+        for user_id in user_ids:
+            pipe.zcount(f'presence:conn:{user_id}', f'({now}', '+inf')
+        pipe.hmget('presence:seen', list(user_ids))
+        *alive, seen = pipe.execute()
+        return {
+            user_id: (bool(count), float(last) if last else None)
+            for user_id, count, last in zip(user_ids, alive, seen)
+        }
+
+    def counts(self, now):
+        pipe = self.client.pipeline()
+        for user_type in USER_TYPES:
+            # Заодно вычищаем истекшие записи, чтобы множества не росли
+            pipe.zremrangebyscore(f'presence:online:{user_type}', '-inf', now)
+            pipe.zcard(f'presence:online:{user_type}')
+        results = pipe.execute()
+        return dict(zip(USER_TYPES, results[1::2]))
+
+    def drain(self, limit):
+        user_ids = self.client.spop('presence:dirty', limit) or []
+        if not user_ids:
+            return {}
+        pipe = self.client.pipeline()
+        for user_id in user_ids:
+            pipe.hgetall(f'presence:pending:{user_id}')
+            pipe.delete(f'presence:pending:{user_id}')
+        results = pipe.execute()
+        return {int(user_id): fields for user_id, fields in zip(user_ids, results[::2]) if fields}
+
+    def restore(self, pending):
+        pipe = self.client.pipeline()
+        for user_id, fields in pending.items():
+            for field, value in fields.items():
+                pipe.hsetnx(f'presence:pending:{user_id}', field, value)
+            pipe.sadd('presence:dirty', user_id)
+        pipe.execute()
+
+
+def _make_backend():
+    redis_url = getattr(settings, 'REDIS_URL', None)
+    if redis_url and redis is not None:
+        return RedisBackend(redis_url)
+    return LocalBackend()
+
+
+class Presence:
+    def __init__(self, backend=None):
+        self.backend = backend or _make_backend()
+        self._last_flush = time.monotonic()
+
+    def connect(self, user, connection=HTTP_CONNECTION, **details):
+        """Открыть или продлить соединение (вход, WebSocket, heartbeat)."""
+        now = time.time()
+        self.backend.touch(user.id, user.user_type, connection, now + PRESENCE_TTL, now, details)
+        self.maybe_flush()
+
+    heartbeat = connect
+
+    def refresh_http(self, user):
+        """
+        Продлевает HTTP-соединение, открытое при входе. Вызывается на каждом
+        запросе, поэтому не чаще раза в HEARTBEAT_INTERVAL на пользователя
+        (отметка в общем кеше — одна на все воркеры).
+        """
+        if cache.add(f'presence:http:{user.id}', 1, HEARTBEAT_INTERVAL):
+            self.heartbeat(user)
+
+    def disconnect(self, user, connection=HTTP_CONNECTION):
+        if connection == HTTP_CONNECTION:
+            cache.delete(f'presence:http:{user.id}')
+        now = time.time()
+        self.backend.release(user.id, user.user_type, connection, now, now)
+        self.maybe_flush()
+
+    def statuses(self, user_ids):
+        """{user_id: (is_online, last_activity)} для любого числа пользователей."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        result = {}
+        for user_id, (is_online, seen) in self.backend.statuses(user_ids, time.time()).items():
+            result[user_id] = (is_online, _as_datetime(seen) if seen else None)
+        return result
+
+    def counts(self):
+        counts = self.backend.counts(time.time())
+        return {
+            'total_online': sum(counts.values()),
+            'startups_online': counts.get('startup', 0),
+            'investors_online': counts.get('investor', 0)
+        }
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает накопленную активность в UserActivity пачками."""
+        self._last_flush = time.monotonic()
+        flushed = 0
+        while True:
+            pending = self.backend.drain(FLUSH_BATCH)
+            if not pending:
+                return flushed
+            try:
+                _persist(pending, self.statuses(pending))
+            except Exception:
+                self.backend.restore(pending)
+                raise
+            flushed += len(pending)
+
+
+def _as_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+
+
+def _persist(pending, statuses):
+    from .models import UserActivity
+
+    existing = {}
+    for activity in UserActivity.objects.filter(user_id__in=list(pending)).order_by('id'):
+        existing.setdefault(activity.user_id, activity)
+
+    to_update, to_create = [], []
+    for user_id, fields in pending.items():
+        activity = existing.get(user_id) or UserActivity(user_id=user_id)
+        activity.last_activity = _as_datetime(fields['last_activity'])
+        activity.is_online = statuses.get(user_id, (False, None))[0]
+        if fields.get('ip_address'):
+            activity.ip_address = fields['ip_address']
+        if fields.get('user_agent'):
+            activity.user_agent = fields['user_agent']
+        (to_update if activity.pk else to_create).append(activity)
+
+    with transaction.atomic():
+        UserActivity.objects.bulk_update(
+            to_update, ['last_activity', 'is_online', 'ip_address', 'user_agent'], batch_size=FLUSH_BATCH
+        )
+        UserActivity.objects.bulk_create(to_create, batch_size=FLUSH_BATCH)
+
+
+_presence = None
+_presence_lock = threading.Lock()
+
+
+def get_presence():
+    global _presence
+    with _presence_lock:
+        if _presence is None:
+            _presence = Presence()
+        return _presence
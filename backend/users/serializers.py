@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import User, UserProfile, UserActivity, UserSubscription
+from .models import CustomUser as User, UserProfile, UserActivity, UserSubscription
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -43,6 +43,18 @@ class UserSerializer(serializers.ModelSerializer):
             return UserActivitySerializer(activity).data
         return None
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    Краткая карточка пользователя для списков (без активности и подписки).
+    Аватар хранится в UserProfile: queryset должен подтягивать userprofile.
+    """
+    avatar = serializers.ImageField(source='userprofile.avatar', read_only=True)
+    
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'avatar', 'user_type', 'is_verified')
+        read_only_fields = fields
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password_confirm = serializers.CharField(write_only=True)
@@ -1,3 +1,150 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from messaging.consumers import ChatConsumer
+from . import presence
+from .middleware import PresenceMiddleware
+from .models import CustomUser, UserActivity
+from .presence import PRESENCE_TTL, LocalBackend, Presence, RedisBackend
+
+
+class PresenceTests(TestCase):
+    """Соединения с TTL: вкладки, истечение, heartbeat и сброс в UserActivity."""
+
+    def setUp(self):
+        cache.clear()
+        self.presence = Presence(LocalBackend())
+        self.startup = CustomUser.objects.create_user(username='startup', password='pass', user_type='startup')
+        self.investor = CustomUser.objects.create_user(username='investor', password='pass', user_type='investor')
+        self.now = 1_000_000.0
+        clock = mock.patch.object(presence.time, 'time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def is_online(self, user):
+        return self.presence.statuses([user.id])[user.id][0]
+
+    def test_closing_one_tab_keeps_user_online(self):
+        self.presence.connect(self.startup, 'tab-1')
+        self.presence.connect(self.startup, 'tab-2')
+
+        self.presence.disconnect(self.startup, 'tab-1')
+        self.assertTrue(self.is_online(self.startup))
+        self.assertEqual(self.presence.counts()['startups_online'], 1)
+
+        self.presence.disconnect(self.startup, 'tab-2')
+        self.assertFalse(self.is_online(self.startup))
+        self.assertEqual(self.presence.counts()['startups_online'], 0)
+
+    def test_connection_expires_without_heartbeat(self):
+        self.presence.connect(self.investor, 'socket')
+        self.now += PRESENCE_TTL + 1
+
+        self.assertFalse(self.is_online(self.investor))
+        self.assertEqual(self.presence.counts()['total_online'], 0)
+
+    def test_heartbeat_extends_connection(self):
+        self.presence.connect(self.investor, 'socket')
+        for _ in range(3):
+            self.now += PRESENCE_TTL / 2
+            self.presence.heartbeat(self.investor, 'socket')
+
+        self.now += PRESENCE_TTL / 2
+        self.assertTrue(self.is_online(self.investor))
+        self.assertEqual(self.presence.counts(), {
+            'total_online': 1, 'startups_online': 0, 'investors_online': 1
+        })
+
+    def test_flush_writes_activity(self):
+        self.presence.connect(self.startup, ip_address='10.0.0.1', user_agent='test')
+        self.presence.flush()
+
+        activity = UserActivity.objects.get(user=self.startup)
+        self.assertTrue(activity.is_online)
+        self.assertEqual(activity.ip_address, '10.0.0.1')
+        self.assertEqual(self.presence.flush(), 0)
+
+    def test_http_refresh_is_throttled(self):
+        with mock.patch.object(self.presence, 'heartbeat') as heartbeat:
+            self.presence.refresh_http(self.startup)
+            self.presence.refresh_http(self.startup)
+            self.assertEqual(heartbeat.call_count, 1)
+
+            # После выхода следующий запрос снова открывает HTTP-соединение
+            self.presence.disconnect(self.startup)
+            self.presence.refresh_http(self.startup)
+            self.assertEqual(heartbeat.call_count, 2)
+
+
+class PresenceMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='member', password='pass', user_type='startup')
+
+        class ProfileView(APIView):
+            def get(self, request):
+                return Response({'id': request.user.id})
+
+        self.view = ProfileView.as_view()
+
+    def call(self, authenticate):
+        request = APIRequestFactory().get('/api/profile/')
+        if authenticate:
+            force_authenticate(request, self.user)
+        with mock.patch('users.middleware.get_presence') as get_presence:
+            PresenceMiddleware(self.view)(request)
+        return get_presence.return_value.refresh_http
+
+    def test_authenticated_request_refreshes_http_presence(self):
+        # Пользователь известен только после аутентификации в DRF
+        self.call(authenticate=True).assert_called_once_with(self.user)
+
+    def test_anonymous_request_is_ignored(self):
+        self.call(authenticate=False).assert_not_called()
+
+
+class ConsumerHeartbeatTests(SimpleTestCase):
+    def test_keep_alive_refreshes_socket_presence(self):
+        consumer = ChatConsumer()
+        consumer.user = mock.Mock(id=1)
+        consumer.channel_name = 'channel-1'
+
+        async def run():
+            task = asyncio.create_task(consumer.keep_alive())
+            await asyncio.sleep(0.2)
+            task.cancel()
+
+        with mock.patch('messaging.consumers.HEARTBEAT_INTERVAL', 0.02), \
+                mock.patch('messaging.consumers.get_presence') as get_presence:
+            async_to_sync(run)()
+
+        heartbeat = get_presence.return_value.heartbeat
+        self.assertGreaterEqual(heartbeat.call_count, 2)
+        heartbeat.assert_called_with(consumer.user, 'channel-1')
+
+
+class RedisReleaseTests(SimpleTestCase):
+    def test_release_is_a_single_script_call(self):
+        with mock.patch.object(presence.redis.Redis, 'from_url') as from_url:
+            backend = RedisBackend('redis://localhost')
+        client = from_url.return_value
+        script = client.register_script.return_value
+
+        backend.release(7, 'investor', 'tab-1', 100.0, 100.0)
+
+        script.assert_called_once_with(
+            keys=[
+                'presence:conn:7', 'presence:online:investor', 'presence:seen',
+                'presence:pending:7', 'presence:dirty'
+            ],
+            args=['tab-1', 100.0, 7, 100.0]
+        )
+        client.pipeline.assert_not_called()
+        client.zadd.assert_not_called()
+        client.zrem.assert_not_called()
@@ -7,7 +7,9 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from startup_platform import stats
 from .models import User, UserProfile, UserActivity, UserSubscription
+from .presence import get_presence
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer,
     ChangePasswordSerializer, UserUpdateSerializer,
@@ -64,12 +66,12 @@ class LoginView(APIView):
         if serializer.is_valid():
             user = serializer.validated_data
             
-            # Update user activity
-            activity, created = UserActivity.objects.get_or_create(user=user)
-            activity.ip_address = self.get_client_ip(request)
-            activity.user_agent = request.META.get('HTTP_USER_AGENT', '')
-            activity.is_online = True
-            activity.save()
+            # Онлайн-статус — в presence, в UserActivity попадет при пакетном сбросе
+            get_presence().connect(
+                user,
+                ip_address=self.get_client_ip(request) or '',
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
+            )
             
             login(request, user)
             token, created = Token.objects.get_or_create(user=user)
@@ -93,11 +95,8 @@ class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
-        # Update user activity
-        activity = UserActivity.objects.filter(user=request.user).first()
-        if activity:
-            activity.is_online = False
-            activity.save()
+        # Закрываем только HTTP-сессию: открытые вкладки с WebSocket остаются онлайн
+        get_presence().disconnect(request.user)
         
         logout(request)
         return Response({'detail': 'Successfully logged out'})
@@ -173,42 +172,60 @@ class VerifyPhoneView(APIView):
 class UserOnlineStatusView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    max_user_ids = 200
+    
     def get(self, request):
         user_id = request.query_params.get('user_id')
+        raw_ids = request.query_params.get('user_ids')
+        
+        if raw_ids:
+            # ?user_ids=1,2,3 — статусы списка собеседников одним запросом
+            try:
+                user_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+            except ValueError:
+                return Response(
+                    {'error': 'user_ids должен быть списком чисел через запятую'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            user_ids = list(dict.fromkeys(user_ids))[:self.max_user_ids]
+            return Response({
+                str(pk): data for pk, data in self.get_statuses(user_ids).items()
+            })
+        
         if user_id:
             try:
-                user = User.objects.get(id=user_id)
-                activity = UserActivity.objects.filter(user=user).first()
-                return Response({
-                    'is_online': activity.is_online if activity else False,
-                    'last_activity': activity.last_activity if activity else None
-                })
-            except User.DoesNotExist:
+                user_id = int(user_id)
+            except ValueError:
+                user_id = None
+            if user_id is None or not User.objects.filter(id=user_id).exists():
                 return Response(
                     {'error': 'Пользователь не найден'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            return Response(self.get_statuses([user_id])[user_id])
         
         return Response(
             {'error': 'user_id параметр обязателен'},
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    def get_statuses(self, user_ids):
+        statuses = get_presence().statuses(user_ids)
+        # Для давно неактивных last_activity есть только в БД — один запрос на всех
+        missing = [pk for pk, (_, seen) in statuses.items() if seen is None]
+        persisted = dict(
+            UserActivity.objects.filter(user_id__in=missing)
+            .values_list('user_id', 'last_activity')
+        ) if missing else {}
+        return {
+            pk: {
+                'is_online': is_online,
+                'last_activity': seen or persisted.get(pk)
+            }
+            for pk, (is_online, seen) in statuses.items()
+        }
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def online_users_count(request):
-    online_count = UserActivity.objects.filter(is_online=True).count()
-    startups_online = UserActivity.objects.filter(
-        is_online=True, 
-        user__user_type='startup'
-    ).count()
-    investors_online = UserActivity.objects.filter(
-        is_online=True, 
-        user__user_type='investor'
-    ).count()
-    
-    return Response({
-        'total_online': online_count,
-        'startups_online': startups_online,
-        'investors_online': investors_online
-    })
\ No newline at end of file
+    return Response(stats.get_online_stats())
\ No newline at end of file